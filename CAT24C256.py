@@ -2,24 +2,165 @@ from machine import I2C, Pin
 import re
 import cryptolib
 import ujson
+import ustruct
 import time
 
+class WriteCompletion(object):
+    """
+    Estrategia base para esperar a que la EEPROM termine su ciclo de escritura (tWR).
+    Lleva estadisticas del tiempo que tarda cada escritura en completarse.
+    """
+
+    def __init__(self):
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+        self.last_us = 0
+
+    def record(self, elapsed_us):
+        if self.count == 0 or elapsed_us < self.min_us:
+            self.min_us = elapsed_us
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+        self.last_us = elapsed_us
+        self.total_us += elapsed_us
+        self.count += 1
+
+    def stats(self):
+        """Regresa un diccionario con las estadisticas de completado de escrituras"""
+        return {
+            'count': self.count,
+            'timeouts': self.timeouts,
+            'last_us': self.last_us,
+            'min_us': self.min_us,
+            'max_us': self.max_us,
+            'avg_us': self.total_us // self.count if self.count else 0,
+        }
+
+    def wait(self, chip):
+        raise NotImplementedError
+
+
+class SleepCompletion(WriteCompletion):
+    """
+    Espera fija del tWR maximo de la hoja de datos, contada desde que se mando la
+    escritura (si el chip ya estuvo ocupado en otra cosa solo se espera lo que falta).
+    """
+
+    def __init__(self, t_wr_ms=5):
+        self.t_wr_ms = t_wr_ms
+        WriteCompletion.__init__(self)
+
+    def wait(self, chip):
+        remaining = self.t_wr_ms * 1000 - time.ticks_diff(time.ticks_us(), chip.write_start)
+        if remaining > 0:
+            time.sleep_us(remaining)
+        self.record(time.ticks_diff(time.ticks_us(), chip.write_start))
+
+
+class AckPollCompletion(WriteCompletion):
+    """
+    Sondea la direccion del dispositivo hasta que responde con ACK.
+    Mientras dura el ciclo interno de escritura la EEPROM no reconoce su direccion.
+    Si no responde dentro de timeout_ms se espera fallback_ms como ultimo recurso.
+    """
+
+    def __init__(self, timeout_ms=10, fallback_ms=5):
+        self.timeout_ms = timeout_ms
+        self.fallback_ms = fallback_ms
+        WriteCompletion.__init__(self)
+
+    def wait(self, chip):
+        start = chip.write_start
+        while True:
+            try:
+                chip.i2c.writeto(chip.i2c_addr, b'')
+                self.record(time.ticks_diff(time.ticks_us(), start))
+                return
+            except OSError:
+                if time.ticks_diff(time.ticks_us(), start) >= self.timeout_ms * 1000:
+                    break
+        time.sleep_ms(self.fallback_ms)
+        self.timeouts += 1
+        self.record(time.ticks_diff(time.ticks_us(), start))
+
+
+# Perfiles de las EEPROM soportadas: geometria y estrategia de fin de escritura.
+# El 24LC512 tiene paginas fisicas de 128 bytes; se maneja en paginas de 64 bytes
+# alineadas, que nunca cruzan el limite de una pagina fisica.
+CHIP_PROFILES = {
+    'CAT24C256': {'pages': 512, 'bpp': 64, 'completion': lambda: AckPollCompletion(10, 5)},
+    '24LC256': {'pages': 512, 'bpp': 64, 'completion': lambda: AckPollCompletion(10, 5)},
+    '24LC512': {'pages': 1024, 'bpp': 64, 'completion': lambda: AckPollCompletion(10, 5)},
+    'generic': {'pages': 512, 'bpp': 64, 'completion': lambda: SleepCompletion(5)},
+}
+
+
 class CAT24C256(object):
 
-    def __init__(self, i2c, i2c_addr, pages=512, bpp=64):
+    def __init__(self, i2c, i2c_addr, pages=512, bpp=64, completion=None, deferred=False):
+        """
+        Con deferred=True no se espera el fin de cada escritura al mandarla, sino
+        antes del siguiente acceso a este mismo chip (ver CompositeEEPROM).
+        """
         self.i2c = i2c
         self.i2c_addr = i2c_addr
         self.pages = pages
         self.bpp = bpp # bytes per page
+        if completion is None:
+            completion = SleepCompletion()
+        self.completion = completion
+        self.deferred = deferred
+        self.busy = False  # Hay un ciclo de escritura interno en curso
+        self.write_start = 0
+
+    @classmethod
+    def from_profile(cls, i2c, i2c_addr, profile='CAT24C256'):
+        """Crea el controlador usando uno de los perfiles de CHIP_PROFILES"""
+        conf = CHIP_PROFILES[profile]
+        return cls(i2c, i2c_addr, conf['pages'], conf['bpp'], conf['completion']())
+
+    def write_stats(self):
+        """Estadisticas del tiempo de completado de las escrituras"""
+        return self.completion.stats()
 
     def capacity(self):
         """Capacidad de almacenamiento en bytes"""
         return self.pages * self.bpp
 
+    def sync(self):
+        """Espera a que termine la escritura pendiente, si la hay"""
+        if self.busy:
+            self.completion.wait(self)
+            self.busy = False
+
+    def write_order(self, pages):
+        """Orden en que conviene escribir las paginas sucias de la cache"""
+        return pages
+
     def read(self, addr, nbytes):
         """Leer uno o mas bytes the la eeprom EEPROM empezando por una direccion especifica"""
+        self.sync()
         return self.i2c.readfrom_mem(self.i2c_addr, addr, nbytes, addrsize=16)
 
+    def read_into(self, addr, buf):
+        """Leer len(buf) bytes secuenciales desde addr en un buffer ya reservado"""
+        self.sync()
+        self.i2c.readfrom_mem_into(self.i2c_addr, addr, buf, addrsize=16)
+
+    def _write_page(self, addr, buf):
+        self.sync()
+        self.i2c.writeto_mem(self.i2c_addr, addr, buf, addrsize=16)
+        self.write_start = time.ticks_us()
+        self.busy = True
+        if not self.deferred:
+            self.sync()
+
     def write(self, addr, buf):
         """Escribir uno o mas bytes the la eeprom EEPROM empezando por una direccion especifica"""
         offset = addr % self.bpp
@@ -28,14 +169,12 @@ class CAT24C256(object):
         # partial page write
         if offset > 0:
             partial = self.bpp - offset
-            self.i2c.writeto_mem(self.i2c_addr, addr, buf[0:partial], addrsize=16)
-            time.sleep_ms(5)
+            self._write_page(addr, buf[0:partial])
             addr += partial
         
         # full page write
         for i in range(partial, len(buf), self.bpp):
-            self.i2c.writeto_mem(self.i2c_addr, addr+i-partial, buf[i:i+self.bpp], addrsize=16)
-            time.sleep_ms(5)
+            self._write_page(addr+i-partial, buf[i:i+self.bpp])
     
     def wipe(self):
         """Borra toda la eeprom"""
@@ -44,23 +183,422 @@ class CAT24C256(object):
             self.write(i*self.bpp, buf)
 
 
+class CompositeEEPROM(object):
+    """
+    Varias EEPROM iguales en el mismo bus (direcciones 0x50-0x57) vistas como un
+    solo espacio lineal de paginas, con la misma interfaz que CAT24C256.
+
+    - Concatenado (stripe=False): las paginas de cada chip van una tras otra.
+    - Intercalado (stripe=True): la pagina p vive en el chip p % n, asi que las
+      paginas consecutivas caen en chips distintos.
+
+    Cada chip espera su ciclo de escritura hasta el siguiente acceso a ese mismo
+    chip, de modo que mientras uno escribe se puede leer o escribir en otro.
+    """
+
+    def __init__(self, chips, stripe=False):
+        if not chips:
+            raise ValueError("Se necesita al menos una EEPROM")
+        for chip in chips:
+            if chip.pages != chips[0].pages or chip.bpp != chips[0].bpp:
+                raise ValueError("Todas las EEPROM deben tener la misma geometria")
+            chip.deferred = True
+        self.chips = chips
+        self.stripe = stripe
+        self.bpp = chips[0].bpp
+        self.chip_pages = chips[0].pages
+        self.pages = self.chip_pages * len(chips)
+
+    @classmethod
+    def from_profile(cls, i2c, addrs, profile='CAT24C256', stripe=False):
+        """Crea un chip por direccion usando uno de los perfiles de CHIP_PROFILES"""
+        return cls([CAT24C256.from_profile(i2c, addr, profile) for addr in addrs], stripe)
+
+    def capacity(self):
+        """Capacidad de almacenamiento en bytes"""
+        return self.pages * self.bpp
+
+    def write_stats(self):
+        """Estadisticas de completado de escrituras de cada chip"""
+        return [chip.write_stats() for chip in self.chips]
+
+    def locate(self, page):
+        """Regresa (chip, pagina dentro del chip) de una pagina logica"""
+        if self.stripe:
+            return self.chips[page % len(self.chips)], page // len(self.chips)
+        return self.chips[page // self.chip_pages], page % self.chip_pages
+
+    def sync(self):
+        """Espera a que terminen las escrituras pendientes de todos los chips"""
+        for chip in self.chips:
+            chip.sync()
+
+    def write_order(self, pages):
+        """Alterna entre chips para que el ciclo de escritura de uno se traslape con el siguiente"""
+        queues = {}
+        for page in pages:
+            chip = self.locate(page)[0]
+            queues.setdefault(chip.i2c_addr, []).append(page)
+        order = []
+        queues = list(queues.values())
+        for i in range(max(len(q) for q in queues) if queues else 0):
+            for q in queues:
+                if i < len(q):
+                    order.append(q[i])
+        return order
+
+    def read(self, addr, nbytes):
+        buf = bytearray(nbytes)
+        self.read_into(addr, buf)
+        return bytes(buf)
+
+    def read_into(self, addr, buf):
+        """Lee len(buf) bytes; se hace una lectura por cada tramo contiguo dentro de un chip"""
+        view = memoryview(buf)
+        done = 0
+        while done < len(buf):
+            page, offset = divmod(addr + done, self.bpp)
+            chip, local = self.locate(page)
+            if self.stripe:
+                n = self.bpp - offset
+            else:
+                n = (self.chip_pages - local) * self.bpp - offset
+            n = min(n, len(buf) - done)
+            chip.read_into(local * self.bpp + offset, view[done:done + n])
+            done += n
+
+    def write(self, addr, buf):
+        done = 0
+        while done < len(buf):
+            page, offset = divmod(addr + done, self.bpp)
+            chip, local = self.locate(page)
+            n = min(self.bpp - offset, len(buf) - done)
+            chip.write(local * self.bpp + offset, buf[done:done + n])
+            done += n
+
+    def wipe(self):
+        """Borra todas las EEPROM"""
+        buf = b'0' * self.bpp
+        for page in self.write_order(list(range(self.pages))):
+            self.write(page * self.bpp, buf)
+
+
+def utf8_prefix(buf, start=0, end=None):
+    """
+    Fin del prefijo de buf[start:end] que es UTF-8 valido (sin crear objetos).
+    Rechaza las secuencias demasiado largas (overlong), los sustitutos (D800-DFFF)
+    y lo que pasa de U+10FFFF, que el decodificador de MicroPython deja pasar.
+    """
+    if end is None:
+        end = len(buf)
+    i = start
+    while i < end:
+        b = buf[i]
+        if b < 0x80:
+            i += 1
+            continue
+        # Rango permitido para el segundo byte segun el primero (RFC 3629)
+        lo, hi = 0x80, 0xBF
+        if 0xC2 <= b < 0xE0:
+            n = 1
+        elif 0xE0 <= b < 0xF0:
+            n = 2
+            if b == 0xE0:
+                lo = 0xA0
+            elif b == 0xED:
+                hi = 0x9F
+        elif 0xF0 <= b < 0xF5:
+            n = 3
+            if b == 0xF0:
+                lo = 0x90
+            elif b == 0xF4:
+                hi = 0x8F
+        else:
+            break
+        if i + n >= end:
+            break
+        c = buf[i + 1]
+        if c < lo or c > hi:
+            break
+        for k in range(2, n + 1):
+            if buf[i + k] & 0xC0 != 0x80:
+                return i
+        i += n + 1
+    return i
+
+
+def decode_text(buf, start=0, end=None):
+    """
+    Decodifica buf[start:end] como UTF-8 de una sola vez. Si hay un byte invalido se
+    regresa el texto hasta ese byte (lo mismo que hacia la decodificacion byte por byte).
+    La validacion la hace utf8_prefix porque str() de MicroPython no revisa los rangos.
+    """
+    if end is None:
+        end = len(buf)
+    return str(buf[start:utf8_prefix(buf, start, end)], 'utf-8')
+
+
+def parse_digits(buf, start, end):
+    """Entero escrito en ASCII en buf[start:end] (los bytes que no son digitos cuentan como 0)"""
+    value = 0
+    for i in range(start, end):
+        d = buf[i] - 48
+        value = value * 10 + (d if 0 <= d <= 9 else 0)
+    return value
+
+
+class PageCache:
+    """
+    Cache en RAM de paginas de la EEPROM con bits de sucio y desalojo LRU.
+
+    Fuera de un bloque `with` las escrituras se envian de inmediato a la EEPROM.
+    Dentro de un bloque `with` se acumulan en RAM y se escriben al salir (o con
+    flush()), de modo que varias actualizaciones a la misma pagina cuestan una
+    sola escritura fisica.
+
+    Dentro de una transaccion (ver transaction()) las paginas sucias no se
+    desalojan y al salir se escriben todas juntas a traves del journal, si hay uno.
+
+    Si tiene una tabla de CRC (ver scrubber.CrcTable), cada escritura a una pagina
+    protegida actualiza tambien la pagina de la tabla con su CRC.
+    """
+
+    def __init__(self, control, budget=512):
+        """
+        Parameters:
+        - control: Objeto CAT24C256 que realiza las transacciones I2C.
+        - budget: Bytes de RAM que puede ocupar la cache.
+        """
+        self.control = control
+        self.bpp = control.bpp
+        self.max_pages = max(1, budget // self.bpp)
+        self.pages = {}  # pagina -> bytearray con el contenido
+        self.dirty = set()
+        self.lru = []  # La pagina usada mas recientemente va al final
+        self.depth = 0
+        self.atomic = 0  # Profundidad de transacciones abiertas
+        self.journal = None  # Objeto Journal para escribir transacciones de forma atomica
+        self.crc = None  # Objeto CrcTable con el CRC de las paginas protegidas
+
+    def transaction(self):
+        """Bloque `with` cuyas escrituras se aplican todas o ninguna (requiere journal)"""
+        return Transaction(self)
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if exc_type is not None:
+            # El bloque fallo a la mitad: no se escribe nada de lo que dejo pendiente
+            self.discard()
+        elif self.depth == 0:
+            self.flush()
+        return False
+
+    def discard(self):
+        """Descarta los cambios pendientes; la EEPROM se queda como estaba"""
+        crc = self.crc
+        for page in list(self.dirty):
+            self.invalidate(page)
+            if crc is not None and crc.start_page <= page < crc.start_page + crc.n_pages:
+                crc.reload(page)  # Los CRC en RAM vuelven a los que tiene la EEPROM
+
+    def _touch(self, page):
+        if page in self.pages:
+            self.lru.remove(page)
+        self.lru.append(page)
+
+    def _evict(self, keep=None):
+        # `keep` es la pagina que se acaba de cargar y todavia se va a usar.
+        # En una transaccion solo se desalojan paginas limpias; si no hay, la cache
+        # crece por encima del presupuesto hasta el commit.
+        holding = self._holding()
+        while len(self.pages) > self.max_pages:
+            victim = None
+            for page in self.lru:
+                if page != keep and not (holding and page in self.dirty):
+                    victim = page
+                    break
+            if victim is None:
+                return
+            self.lru.remove(victim)
+            if victim in self.dirty:
+                self._write_back(victim)
+            del self.pages[victim]
+
+    def _holding(self):
+        # Las paginas sucias de una transaccion se retienen mientras quepan en el journal
+        return self.atomic and self.journal is not None and len(self.dirty) <= self.journal.capacity
+
+    def _write_back(self, page):
+        self.control.write(page * self.bpp, self.pages[page])
+        self.dirty.discard(page)
+
+    def read(self, page):
+        """Regresa el contenido de la pagina (bytearray), leyendolo de la EEPROM si no esta en cache."""
+        buf = self.pages.get(page)
+        if buf is None:
+            buf = bytearray(self.control.read(page * self.bpp, self.bpp))
+            self._touch(page)
+            self.pages[page] = buf
+            self._evict(keep=page)
+        else:
+            self._touch(page)
+        return buf
+
+    def write(self, page, offset, data):
+        """
+        Actualiza parte de una pagina en la cache y la marca como sucia.
+        Si la escritura cubre la pagina completa no se lee la EEPROM.
+        """
+        self._store(page, offset, data)
+        pages = [page]
+        if self.crc is not None and self.crc.covers(page):
+            for crc_page in self.crc.update(page, self.pages[page]):
+                self._store(crc_page, 0, self.crc.image(crc_page))
+                pages.append(crc_page)
+        if self.depth == 0:
+            for p in pages:
+                self._write_back(p)
+        self._evict()
+
+    def _store(self, page, offset, data):
+        if offset == 0 and len(data) == self.bpp:
+            self._touch(page)
+            self.pages[page] = bytearray(data)
+            self._evict(keep=page)
+        else:
+            self.read(page)[offset:offset + len(data)] = data
+        self.dirty.add(page)
+
+    def flush(self):
+        """Escribe en la EEPROM todas las paginas sucias."""
+        pages = self.control.write_order(sorted(self.dirty))
+        if len(pages) > 1 and self._holding():
+            self.journal.commit(pages, self.pages)
+            self.dirty = set()
+            self._evict()
+            return
+        if len(pages) > 1 and self.atomic and self.journal is not None:
+            print(f"Cache: la transaccion ({len(pages)} paginas) no cabe en el journal")
+        for page in pages:
+            self._write_back(page)
+
+    def invalidate(self, page=None):
+        """Descarta una pagina (o toda la cache) sin escribirla."""
+        if page is None:
+            self.pages = {}
+            self.dirty = set()
+            self.lru = []
+        elif page in self.pages:
+            del self.pages[page]
+            self.dirty.discard(page)
+            self.lru.remove(page)
+
+
+class Transaction:
+    """Contexto de PageCache.transaction()"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __enter__(self):
+        self.cache.atomic += 1
+        self.cache.__enter__()
+        return self.cache
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.cache.__exit__(exc_type, exc, tb)
+        finally:
+            self.cache.atomic -= 1
+        return False
+
+
 class EEPROMManager:
     """
     Clase para manejar la EEPROM con funciones de cifrado y descifrado.
     """
 
-    def __init__(self, addr, size, i2c_number, pin_scl, pin_sda):
+    def __init__(self, addr, size, i2c_number, pin_scl, pin_sda, i2c=None, cache_budget=512, profile='CAT24C256', stripe=False):
         """
         Inicializa el objeto EEPROMManager.
+        Se puede pasar un objeto `i2c` ya creado (por ejemplo, un dispositivo simulado)
+        y el nombre del perfil de la EEPROM (ver CHIP_PROFILES).
+        Si `addr` es una lista de direcciones se usan todas las EEPROM como un solo
+        espacio de paginas (ver CompositeEEPROM).
         """
         self.I2C_ADDR = addr
         self.EEPROM_SIZE = size
-        self.i2c = I2C(i2c_number, scl=Pin(pin_scl), sda=Pin(pin_sda), freq=800000)
-        self.control = CAT24C256(self.i2c,self.I2C_ADDR)
+        if i2c is None:
+            i2c = I2C(i2c_number, scl=Pin(pin_scl), sda=Pin(pin_sda), freq=800000)
+        self.i2c = i2c
+        if isinstance(addr, (list, tuple)):
+            self.control = CompositeEEPROM.from_profile(self.i2c, addr, profile, stripe)
+        else:
+            self.control = CAT24C256.from_profile(self.i2c, self.I2C_ADDR, profile)
+        self.cache = PageCache(self.control, cache_budget)
+        self.range_buf = bytearray(0)  # Buffer reutilizable para read_range
+        self.crypt_buf = bytearray(self.control.bpp)  # Buffer reutilizable para cifrar segmentos
     
     def wipe_all(self):
+        self.cache.invalidate()
+        if self.cache.crc is not None:
+            self.cache.crc.reset()
         self.control.wipe()
 
+    def flush(self):
+        """Escribe en la EEPROM los cambios pendientes de la cache."""
+        self.cache.flush()
+
+    def transaction(self):
+        """
+        Agrupa varias escrituras en una transaccion atomica:
+        `with eeprom.transaction(): ...`
+        """
+        return self.cache.transaction()
+
+    def attach_journal(self, journal):
+        """
+        Usa `journal` para las transacciones y aplica la que haya quedado pendiente.
+        
+        Returns:
+        - Paginas que se reescribieron al recuperar
+        """
+        self.cache.journal = journal
+        if journal is None:
+            return []
+        pages = journal.recover()
+        for page in pages:
+            self.cache.invalidate(page)
+        return pages
+
+    def attach_crc(self, crc):
+        """Mantiene el CRC de las paginas protegidas por `crc` (CrcTable, o None) al escribirlas"""
+        self.cache.crc = crc
+
+    def read_range(self, start_page, n_pages):
+        """
+        Lee n_pages paginas consecutivas en una sola transaccion I2C.
+
+        Regresa un memoryview sobre un buffer interno que se reutiliza, por lo que
+        solo es valido hasta la siguiente llamada a read_range. Las paginas con
+        cambios pendientes en la cache se sobreponen a lo leido de la EEPROM.
+        """
+        bpp = self.control.bpp
+        nbytes = n_pages * bpp
+        if len(self.range_buf) < nbytes:
+            self.range_buf = bytearray(nbytes)
+        view = memoryview(self.range_buf)[:nbytes]
+        self.control.read_into(start_page * bpp, view)
+        for page in self.cache.dirty:
+            if start_page <= page < start_page + n_pages:
+                offset = (page - start_page) * bpp
+                view[offset:offset + bpp] = self.cache.pages[page]
+        return view
+
     def pad_block(self, block, block_size=16, pad_byte=b' '):
         """
         Rellena un bloque de datos hasta block_size bytes con el byte dado.
@@ -103,22 +641,9 @@ class EEPROMManager:
             print(f"len bytes: {offset + data_length}")
             raise ValueError("Datos exceden el limite de bytes")
 
-        current_data = self.read(page, 1)
-        if debug == 1:
-            print(f"PD: Data-{data}")
-            print(f"current data: {current_data}")
-        
-        updated_data = bytearray(current_data) 
-        if debug == 1:
-            print(f"byte data: {updated_data}")
-    
-        updated_data[offset:offset + data_length] = data
-        updated_data = bytes(updated_data)
+        self.cache.write(page, offset, data)
         if debug == 1:
-            print(f"Updated data: {updated_data}")
-        
-        print("Entrando a funcion self.save")
-        self.save(updated_data, page)
+            print(f"Updated data: {bytes(self.cache.read(page))}")
 
     def secure_save(self, keys, data, page, debug=0):
         """
@@ -127,40 +652,41 @@ class EEPROMManager:
         
         keys: Lista de diccionarios que contienen:
             - 'key': la llave de encriptación
-            - 'start': índice de inicio de datos para esta llave
-            - 'end': índice de fin de datos para esta llave
+            - 'start': offset en la página donde empieza el segmento
+            - 'end': offset en la página donde termina el segmento
+        Los datos se reparten entre los segmentos en orden: el primero toma los
+        primeros end - start bytes, el siguiente los que siguen, etc. Cada segmento se
+        cifra completo de una vez y todos se escriben en una sola escritura de página.
         """
-        data = bytes(data, 'utf-8')
-        
+        if isinstance(data, str):
+            data = data.encode('utf-8')
         
         if debug == 1:
             print(f"Datos a guardar: {data}")
-            
-        encrypted_buffer = b''
         
-        for segment in keys:
-            key = segment['key']
-            start = segment['start']
-            end = segment['end']
-        
-            if isinstance(key, str):  # Si la clave es una cadena, conviértela a bytes
-                key = key.encode('utf-8')
-        
-            aes = cryptolib.aes(key, 1)
-            segment_data = data[start:end]
-            encrypted_data = bytearray()
+        buf = self.crypt_buf
+        consumed = 0
+        with self.cache:
+            for segment in keys:
+                key = segment['key']
+                start = segment['start'] % self.control.bpp
+                length = segment['end'] - segment['start']
+                length += -length % 16  # Bloques completos de 16 bytes
             
-            for i in range(0, len(segment_data), 16):
-                block = segment_data[i:i + 16]
-                if len(block) < 16:
-                    block += b'\x00' * (16 - len(block))
-                encrypted_data.extend(aes.encrypt(block))
-            segment_offset = start % self.control.bpp
+                if isinstance(key, str):  # Si la clave es una cadena, conviértela a bytes
+                    key = key.encode('utf-8')
             
-        if debug == 1:
-             print(f"Guardando en la pagina {page}, desde el offset {segment_offset} datos encriptados: {encrypted_data}")
-        
-        self.partial_data(page, segment_offset, encrypted_data, debug)
+                chunk = data[consumed:consumed + length]
+                consumed += length
+                buf[:len(chunk)] = chunk
+                buf[len(chunk):length] = bytes(length - len(chunk))  # Relleno con ceros
+                view = memoryview(buf)[:length]
+                cryptolib.aes(key, 1).encrypt(view, view)
+                
+                if debug == 1:
+                    print(f"Guardando en la pagina {page}, desde el offset {start} datos encriptados: {bytes(view)}")
+                
+                self.partial_data(page, start, bytes(view), debug)
 
     def secure_read(self, keys, page, debug=0):
         """
@@ -172,40 +698,46 @@ class EEPROMManager:
             - 'start': índice de inicio en la página para este segmento
             - 'end': índice de fin en la página para este segmento
         """
-        page_address = page * 64
-        decrypted_data = b''
+        return self.secure_decode(keys, self.cache.read(page), debug)
 
+    def secure_decode(self, keys, page_data, debug=0):
+        """
+        Descifra los segmentos de una pagina ya leida (por ejemplo, con read_range).
+        Recibe los mismos `keys` que secure_read.
+        
+        Cada segmento se descifra completo en una sola llamada sobre un buffer
+        reutilizable. Si el texto no es UTF-8 valido (llave incorrecta o datos dañados)
+        se descartan los bloques invalidos, igual que antes.
+        """
+        decrypted_data = bytearray()
+        buf = self.crypt_buf
+        
         for segment in keys:
             key = segment['key']
             start = segment['start']
-            end = segment['end']
+            length = segment['end'] - start
+            length -= length % 16  # Solo bloques completos de 16 bytes
         
             if isinstance(key, str):  # Si la clave es una cadena, conviértela a bytes
                 key = key.encode('utf-8')
-        
-            # Inicialización del cifrado AES en modo ECB
-            aes_decrypt = cryptolib.aes(key, 1)  # 1 representa el modo ECB
-            segment_data = b''
-        
-            for i in range(start, end, 16):  # Leer en bloques de 16 bytes
-                try:
-                    encrypted_read = self.control.read(page_address + i, 16)  # Leer 16 bytes desde la EEPROM
-                    decrypted_block = aes_decrypt.decrypt(encrypted_read)  # Descifrar el bloque
+            
+            view = memoryview(buf)[:length]
+            view[:] = page_data[start:start + length]
+            # Inicialización del cifrado AES en modo ECB (1); descifra todo el segmento
+            cryptolib.aes(key, 1).decrypt(view, view)
+            plain = bytes(view)
+            try:
+                plain.decode('utf-8')
+                decrypted_data += plain
+            except:
+                for i in range(0, length, 16):
+                    block = bytes(view[i:i + 16])
                     try:
-                        decrypted_block.decode('utf-8')  # Intentar decodificar el bloque
-                        segment_data += decrypted_block  # Agregar solo si la decodificación es exitosa
+                        block.decode('utf-8')
+                        decrypted_data += block  # Agregar solo si la decodificación es exitosa
                     except:
                         if debug == 1:
-                            print(f"Bloque descifrado contiene datos no válidos: {decrypted_block}")
-                        pass
-        
-                except Exception as e:
-                    if debug == 1:
-                        print(f"Error al leer segmento: {e}")
-                    break
-        
-            # Agregar el segmento descifrado al buffer general
-            decrypted_data += segment_data
+                            print(f"Bloque descifrado contiene datos no válidos: {block}")
 
         # Decodificar el resultado completo
         if decrypted_data:
@@ -233,43 +765,39 @@ class EEPROMManager:
         if debug == 1:
             print(f"Datos a guardar: {data}")
         
-        extra_space = 0
-        page = page * 64
-        self.control.write(page, data)  # Guardar en la EEPROM
+        bpp = self.control.bpp
+        for i in range(0, len(data), bpp):
+            self.cache.write(page + i // bpp, 0, data[i:i + bpp])  # Guardar en la EEPROM
         
         if debug == 1:
             print(f"Guardado en página {page} Dato: {data}")
     
+    def read_view(self, page):
+        """
+        Regresa un memoryview sobre la pagina en la cache, sin copiarla.
+        Solo es valido hasta la siguiente escritura o lectura de otra pagina.
+        """
+        return memoryview(self.cache.read(page))
+
+    def read_fields(self, page, fmt, offset=0):
+        """Desempaca campos de la pagina con ustruct (por ejemplo '>16s16s' en el offset 32)"""
+        return ustruct.unpack_from(fmt, self.cache.read(page), offset)
+
     def read(self, page, raw=0, debug=0):
         """
         Lee datos desde la EEPROM.
+        Con raw=1 regresa los bytes de la pagina; si no, el texto UTF-8 que contiene.
         """
-        page = page * 64
-        raw_data=self.control.read(page, 64)
+        buf = self.cache.read(page)
         
         if debug == 1:
-            print(f"Datos en crudo: {raw_data}")
+            print(f"Datos en crudo: {bytes(buf)}")
         
-        # Decodificar el resultado dependiendo del tipo de dato original
-        if raw_data:  # Asegúrate de que no esté vacío
-            if raw == 1:
-                return raw_data
-            decoded_string = ''
-            temp_data = b''
-            for byte in raw_data:
-                temp_data += bytes([byte])  # Agregar el byte actual a temp_data
-                try:
-                    # Intentar decodificar el bloque hasta el momento
-                    decoded_string += temp_data.decode('utf-8')
-                    temp_data = b''  # Reiniciar el temporal si la decodificación fue exitosa
-                except Exception as e:
-                    if debug == 1:
-                        print(f"read -- temp_data:{temp_data} -- Exception found: {e}")
-                    pass
-
-            if debug == 1:
-                print(f"Resultado plano: {decoded_string}")
-
-            return decoded_string if decoded_string else None
-        else:
-            return None
\ No newline at end of file
+        if raw == 1:
+            return bytes(buf)
+        decoded_string = decode_text(buf)
+        
+        if debug == 1:
+            print(f"Resultado plano: {decoded_string}")
+        
+        return decoded_string if decoded_string else None
@@ -1,22 +1,126 @@
 import CAT24C256
+from CAT24C256 import decode_text, parse_digits
+import cryptolib
+import hashlib
+import ustruct
 import rtc_config
-from reed_solomon import ReedSolomonSimple
+from log_ring import LogRing, LOG_MESSAGES, message_code
+from reed_solomon import ReedSolomonSimple, ReedSolomonError
+from storage_layout import StorageLayout
+from journal import Journal
+from scrubber import CrcTable, Scrubber
+from key_manager import KeyManager
+
+class IndexTransaction:
+    """
+    Contexto de DatabaseManager.transaction(): una transaccion de la EEPROM que ademas
+    regresa el indice de credenciales en RAM a como estaba si el bloque falla.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.saved = None
+
+    def __enter__(self):
+        db = self.db
+        self.saved = (list(db.admin_tags), list(db.user_tags), list(db.card_hashes),
+                      bytes(db.user_slots), db.num_usr, db.admins)
+        self.eeprom = db.eeprom.transaction()
+        self.eeprom.__enter__()
+        return db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.eeprom.__exit__(exc_type, exc, tb)
+        except BaseException:
+            self.restore()
+            raise
+        if exc_type is not None:
+            self.restore()
+        return False
+
+    def restore(self):
+        db = self.db
+        admin_tags, user_tags, card_hashes, user_slots, num_usr, admins = self.saved
+        db.admin_tags[:] = admin_tags
+        db.user_tags[:] = user_tags
+        db.card_hashes[:] = card_hashes
+        db.user_slots[:] = user_slots
+        db.num_usr = num_usr
+        db.admins = admins
+        db.rebuild_card_map()
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, eeprom_addr=0x50, stripe=False):
         """
         Valores inciales para la base de datos
+        
+        Parameters:
+        -eeprom_addr: Direccion I2C de la EEPROM, o lista de direcciones (0x50-0x57)
+         para usar varias como un solo espacio de paginas
+        -stripe: Intercalar las paginas entre las EEPROM en lugar de concatenarlas
         """
-        self.eeprom = CAT24C256.EEPROMManager(0x50, 256, 1, 19, 18)
-        self.max_pages = 256  # Total de páginas de la EEPROM
-        self.gral_start_page = 0  # Primera página donde inician la informacion general
-        self.admin_start_page = 1  # Primera página donde inician los datos del admin
-        self.usr_start_page = 2  # Primera página donde inicia la informacion de usuarios
-        self.tel_start_page = 7  # Primera página donde inicia los telefonos de los usuarios
-        self.api_key_page = 10 # Página donde se almacenan las apikeys de los administradores
-        self.log_start_page = 11  # Primera página donde inician los logs
+        self.eeprom = CAT24C256.EEPROMManager(eeprom_addr, 256, 1, 19, 18, stripe=stripe)
         self.buffer = None
+        self.legacy_card_key = False
+        self.log_cursor = None  # Cursor para continuar la ultima consulta de logs
+        self.mst_key = None
+        self.keys = KeyManager()  # Llave de los logs ya decodificada y sus cifradores
+        # Tabla de asignacion guardada en la ultima pagina, o el acomodo fijo anterior
+        layout = StorageLayout.load(self.eeprom)
+        if layout is None:
+            layout = StorageLayout.legacy(self.eeprom.control.pages)
+        self.apply_layout(layout)
+
+    def apply_layout(self, layout):
+        """
+        Toma las paginas de inicio y capacidades de la tabla de asignacion
+        
+        Parameters:
+        -layout: Objeto StorageLayout
+        """
+        self.layout = layout
+        self.gral_start_page = layout.gral.start  # Informacion general
+        self.admin_start_page = layout.admin.start  # Contraseñas de admin
+        self.usr_start_page = layout.users.start  # Una pagina por usuario
+        self.tel_start_page = layout.phones.start  # Telefonos, 3 por pagina
+        self.api_key_page = layout.api.start  # Apikeys de los administradores
+        self.log_index_page = layout.log_index.start  # Indice de logs por tipo
+        self.cred_index_page = layout.cred_index.start  # Indice de credenciales (hashes)
+        self.log_start_page = layout.logs.start  # Primera página de la bitacora
+        self.max_pages = layout.logs.end  # Pagina siguiente a la ultima de la bitacora
+        self.max_users = layout.max_users
+        self.max_admins = layout.max_admins
+        self.admin_tags = [0] * self.max_admins  # 0 = sin hash conocido
+        self.user_tags = [0] * self.max_users
+        self.card_hashes = [0] * self.max_users  # Hash con sal del UID de cada usuario
+        self.card_map = {}  # hash de UID -> slot
+        self.card_filter = bytearray(max(8, self.max_users))  # Filtro de pertenencia de UIDs inscritos
+        self.user_slots = bytearray((self.max_users + 7) // 8)  # Mapa de bits de slots ocupados
+        self.cred_index_loaded = False
+        # Journal para las altas y bajas; si quedo una transaccion a medias se termina aqui
+        journal = None
+        if layout.journal.pages:
+            journal = Journal(self.eeprom.control, layout.journal.start, layout.journal.pages)
+        self.eeprom.attach_journal(journal)
+        # CRC de las paginas de datos (no de la bitacora, que tiene su propia validacion)
+        crc = None
+        self.scrubber = None
+        if layout.crc.pages:
+            crc = CrcTable(self.eeprom, layout.crc, [layout.gral, layout.admin, layout.api,
+                                                     layout.users, layout.phones, layout.cred_index])
+            self.scrubber = Scrubber(self.eeprom, crc, on_bad=self.report_bad_page)
+        self.eeprom.attach_crc(crc)
+        self.log_ring = LogRing(self.eeprom, self.log_start_page, self.max_pages, self.log_cipher, self.log_index_page)
       
+    def transaction(self):
+        """
+        Bloque `with` cuyas escrituras se aplican todas o ninguna; si falla, el indice
+        de credenciales en RAM (slots, hashes, tarjetas y conteos) tambien se regresa.
+        """
+        return IndexTransaction(self)
+
     def pad_data(self, data: str, length: int) -> str:
         data_bytes = data.encode('utf-8')
         if len(data_bytes) >= length:
@@ -28,28 +132,113 @@ class DatabaseManager:
         """
         Leer toda la informacion basica de la cerradura.
         """
-        raw_data=self.eeprom.read(self.gral_start_page,1)
-        self.depto_info=raw_data[0:10].decode("utf-8")
+        raw_data=self.eeprom.read_view(self.gral_start_page)
+        self.depto_info=decode_text(raw_data, 0, 10)
         print(f"Depto: {self.depto_info}")
-        self.num_usr=int(raw_data[10:11].decode("utf-8"))
+        # Un digito para versiones anteriores; el conteo completo va en los bytes 16-18
+        self.num_usr=max(parse_digits(raw_data, 10, 11), parse_digits(raw_data, 16, 19))
         print(f"Num Usuarios: {self.num_usr}")
-        self.num_logs=int(raw_data[11:14].decode("utf-8"))
+        self.num_logs=parse_digits(raw_data, 11, 14)
         print(f"Num Logs: {self.num_logs}")
-        self.flags=raw_data[14:65]
-        print(f"flags: {self.flags}")
-        self.admins=int(raw_data[15:16].decode("utf-8"))
+        self.admins=parse_digits(raw_data, 15, 16)
         print(f"Num Admins: {self.admins}")
-        self.mst_key=raw_data[32:65]
+        self.flags, mst_key = self.eeprom.read_fields(self.gral_start_page, '18s32s', 14)
+        print(f"flags: {self.flags}")
+        if mst_key != self.mst_key:
+            self.keys.invalidate()
+        self.mst_key=mst_key
         print(f"mst_key:{self.mst_key}")
+        if not self.log_ring.recovered:
+            self.log_ring.recover()
+        self.num_logs = self.log_ring.count()
+        if not self.cred_index_loaded:
+            if self.scrubber is not None:
+                # Validacion de arranque con los CRC: solo las paginas que se consultan siempre
+                layout = self.layout
+                pages = [layout.gral.start] + list(range(layout.admin.start, layout.admin.end)) + \
+                    list(range(layout.cred_index.start, layout.cred_index.end))
+                self.scrubber.verify(pages)
+            self.load_credential_index()
+        if not self.layout.stored and raw_data[14:15] == b'1':
+            self.migrate_layout()
+    
+    def migrate_layout(self):
+        """
+        Pasa una cerradura con el acomodo fijo anterior a una tabla de asignacion.
+        Los usuarios, telefonos e indice de credenciales se copian a las paginas que no se
+        usaban; la bitacora no se mueve. La tabla se guarda al final, asi que si se corta
+        la energia a la mitad la migracion se repite en el siguiente arranque.
+        
+        Returns:
+        - True si se migro
+        """
+        old = self.layout
+        try:
+            new = StorageLayout.migrated(old.total_pages)
+        except ValueError as e:
+            print(f"No se migra el acomodo: {e}")
+            return False
+        print(f"Migrando acomodo: usuarios {old.max_users} -> {new.max_users}")
+        admin_tags, user_tags, card_hashes = self.admin_tags, self.user_tags, self.card_hashes
+        user_slots = self.user_slots
+        with self.eeprom.cache:
+            for i in range(old.users.pages):
+                self.eeprom.save(bytes(self.eeprom.read_view(old.users.start + i)), new.users.start + i)
+            phones = bytearray(self.eeprom.read_range(old.phones.start, old.phones.pages))
+            # El formato anterior guardaba el telefono del usuario 0 en el segundo lugar de su pagina
+            if phones[64:84] == b'0' * 20:
+                phones[64:84] = phones[84:104]
+                phones[84:104] = b'0' * 20
+            self.eeprom.save(bytes(phones), new.phones.start)
+            self.apply_layout(new)
+            self.admin_tags[:len(admin_tags)] = admin_tags
+            self.user_tags[:len(user_tags)] = user_tags
+            self.card_hashes[:len(card_hashes)] = card_hashes
+            self.user_slots[:len(user_slots)] = user_slots
+            self.rebuild_card_map()
+            self.cred_index_loaded = True
+            self.save_credential_index()
+        new.save(self.eeprom)
+        # Borrar las copias anteriores de los datos de usuario
+        with self.eeprom.cache:
+            for region in (old.users, old.phones, old.cred_index):
+                for page in range(region.start, region.end):
+                    self.eeprom.save(b'0' * 64, page)
+        self.update_gral_info()
+        return True
+    
+    def report_bad_page(self, page):
+        """El scrubber encontro una pagina que no pudo corregir"""
+        print(f"EEPROM: pagina {page} dañada")
+        self.save_log("EEPROM: pagina dañada", 2, page)
+    
+    def log_key(self):
+        """
+        Regresa la llave AES de los logs a partir de la llave maestra.
+        Se decodifica una sola vez; el KeyManager la guarda hasta que cambie la llave maestra.
+        """
+        return self.keys.secret('log', lambda: ReedSolomonSimple.pseudo_decrypt_bytes(self.mst_key))
+    
+    def log_cipher(self, decrypt=False):
+        """Objeto AES de los logs, para cifrar o para descifrar"""
+        return self.keys.cipher(self.log_key(), decrypt)
+    
+    def end_admin_session(self):
+        """Borra de la RAM las llaves decodificadas al terminar el modo admin"""
+        self.keys.wipe()
     
     def update_gral_info(self):
         """
         Actualiza la informacion basica de la cerradura
         """
-        str_num_logs = str(self.num_logs)
+        # El conteo real lo lleva la bitacora circular; aqui solo cabe en 3 digitos
+        str_num_logs = str(min(int(self.num_logs), 999))
         while len(str_num_logs) < 3:
             str_num_logs = "0" + str_num_logs
-        raw_data=(self.depto_info + str(self.num_usr) + str_num_logs + "1" + str(self.admins) + ("0" * 16)).encode() + self.mst_key
+        str_num_usr = str(self.num_usr)
+        while len(str_num_usr) < 3:
+            str_num_usr = "0" + str_num_usr
+        raw_data=(self.depto_info + str(min(int(self.num_usr), 9)) + str_num_logs + "1" + str(self.admins) + str_num_usr + ("0" * 13)).encode() + self.mst_key
         self.eeprom.save(raw_data,self.gral_start_page,1)
         self.read_general_info()
     
@@ -66,25 +255,48 @@ class DatabaseManager:
         Returns:
         - None
         """
+        if not self.layout.stored:
+            # Cerradura nueva: las regiones se reparten en toda la EEPROM
+            layout = StorageLayout.build(self.eeprom.control.pages)
+            layout.save(self.eeprom)
+            self.apply_layout(layout)
         self.depto_info=depto_info
         self.num_usr="0"
+        self.cred_index_loaded = True  # El indice se reinicia abajo
         self.num_logs="000"
         self.mst_key=master_key
+        self.keys.invalidate()
         self.update_gral_info()
+        # La sal de los hashes cambio: se recalculan en el siguiente acceso de cada quien
+        self.admin_tags = [0] * self.max_admins
+        self.user_tags = [0] * self.max_users
+        self.card_hashes = [0] * self.max_users
+        self.user_slots = bytearray(len(self.user_slots))
+        self.rebuild_card_map()
+        self.save_credential_index()
+        # Con una llave nueva los logs anteriores ya no se pueden leer
+        self.log_ring.recover()
+        self.num_logs = self.log_ring.count()
     
-    def save_user_info(self, password, card, name):
+    def save_user_info(self, password, card, name, slot=None):
         """
-        Guarda la informacion de un usuario
+        Guarda la informacion de un usuario en un slot libre (o en el indicado)
         
         Parameters:
         -key: Contraseña de administrador
         -password:Contraseña del usuario
         -card:Identificador de tarjeta
         -name: Nombre del usuario
+        -slot: Slot donde guardarlo; por defecto el primero libre
         
         Returns:
-        - None
+        - True si se guardo
         """
+        if slot is None:
+            slot = self.free_slot()
+        if slot is None or self.slot_used(slot):
+            print("Ya no hay espacio para mas usuarios")
+            return False
         guard = [
             {'key': password, 'start': 0, 'end': 32}
         ]
@@ -93,13 +305,21 @@ class DatabaseManager:
         card_key = self.buffer
         del self.buffer
         data=password+card
-        page = self.usr_start_page+self.num_usr
-        self.eeprom.secure_save(guard,data,page)
-        self.eeprom.partial_data(page, 32, card_key)
-        self.save_api(name, page)
-        self.num_usr += 1
-        self.update_gral_info()
+        page = self.usr_start_page+slot
+        # Todas las escrituras del alta se aplican juntas (o ninguna) al salir del bloque
+        with self.transaction():
+            self.eeprom.secure_save(guard,data,page)
+            self.eeprom.partial_data(page, 32, card_key)
+            self.save_api(name, page)
+            self.user_tags[slot] = self.pin_tag(password)
+            self.card_hashes[slot] = self.card_hash(card)
+            self.set_slot(slot, True)
+            self.rebuild_card_map()
+            self.save_credential_index(user=slot)
+            self.num_usr = self.count_users()
+            self.update_gral_info()
         del data
+        return True
         
     def read_user_info(self, key, page):
         """
@@ -118,10 +338,219 @@ class DatabaseManager:
         raw_data=self.eeprom.secure_read(guard,page)
         self.usr_pswd = raw_data[0:15]
         self.usr_card = raw_data[16:32]
-        raw_data=self.eeprom.read(page,1)
-        self.usr_pswd_card = raw_data[33:48]
+        self.usr_pswd_card = self.eeprom.read_fields(page, '15s', 33)[0]
     
-    #TODO Agregar is_user
+    def pin_tag(self, key):
+        """
+        Hash corto (16 bits) con sal de una contraseña, para el indice de credenciales.
+        La sal es la llave maestra, propia de cada cerradura. Nunca regresa 0.
+        """
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        digest = hashlib.sha256(bytes(self.mst_key) + key).digest()
+        return (digest[0] << 8 | digest[1]) or 1
+
+    def load_credential_index(self):
+        """
+        Carga el indice de credenciales. Si la pagina no tiene indice (formato anterior)
+        los hashes quedan desconocidos y se completan conforme cada quien accede.
+        """
+        self.cred_index_loaded = True
+        raw_data = self.eeprom.read_range(self.cred_index_page, self.layout.cred_index.pages)
+        magic = bytes(raw_data[0:4])
+        if magic not in (b'CIDX', b'CID2'):
+            self.admin_tags = [0] * self.max_admins
+            self.user_tags = [0] * self.max_users
+            self.card_hashes = [0] * self.max_users
+        else:
+            n_tags = self.max_admins + self.max_users
+            tags = ustruct.unpack_from('>' + 'H' * n_tags, raw_data, 4)
+            self.admin_tags = list(tags[:self.max_admins])
+            self.user_tags = list(tags[self.max_admins:])
+            offset = StorageLayout.cred_hash_offset(self.max_admins, self.max_users)
+            self.card_hashes = list(ustruct.unpack_from('>' + 'I' * self.max_users, raw_data, offset))
+        if magic == b'CID2':
+            offset = StorageLayout.cred_slots_offset(self.max_admins, self.max_users)
+            self.user_slots[:] = raw_data[offset:offset + len(self.user_slots)]
+            self.num_usr = self.count_users()
+        else:
+            # Sin mapa de slots los usuarios siempre estaban compactados al inicio
+            self.user_slots = bytearray(len(self.user_slots))
+            for slot in range(min(int(self.num_usr), self.max_users)):
+                self.set_slot(slot, True)
+            self.save_credential_index()
+        self.rebuild_card_map()
+
+    def save_credential_index(self, user=None, admin=None):
+        """
+        Guarda el indice de credenciales. Si se indica un usuario o admin solo se
+        actualizan sus entradas (una o dos paginas), sin reescribir todo el indice.
+        """
+        hash_offset = StorageLayout.cred_hash_offset(self.max_admins, self.max_users)
+        if user is None and admin is None:
+            raw_data = bytearray(b'0' * (self.layout.cred_index.pages * 64))
+            raw_data[0:4] = b'CID2'
+            n_tags = self.max_admins + self.max_users
+            ustruct.pack_into('>' + 'H' * n_tags, raw_data, 4,
+                              *(self.admin_tags + self.user_tags))
+            ustruct.pack_into('>' + 'I' * self.max_users, raw_data, hash_offset,
+                              *self.card_hashes)
+            slots_offset = StorageLayout.cred_slots_offset(self.max_admins, self.max_users)
+            raw_data[slots_offset:slots_offset + len(self.user_slots)] = self.user_slots
+            self.eeprom.save(bytes(raw_data), self.cred_index_page)
+            return
+        entries = []
+        if admin is not None:
+            entries.append((4 + 2 * admin, ustruct.pack('>H', self.admin_tags[admin])))
+        if user is not None:
+            entries.append((4 + 2 * (self.max_admins + user), ustruct.pack('>H', self.user_tags[user])))
+            entries.append((hash_offset + 4 * user, ustruct.pack('>I', self.card_hashes[user])))
+            slots_offset = StorageLayout.cred_slots_offset(self.max_admins, self.max_users)
+            entries.append((slots_offset + user // 8, bytes([self.user_slots[user // 8]])))
+        with self.eeprom.cache:
+            for offset, data in entries:
+                self.eeprom.partial_data(self.cred_index_page + offset // 64, offset % 64, data)
+
+    def slot_used(self, slot):
+        """True si el slot de usuario esta ocupado"""
+        return bool(self.user_slots[slot >> 3] & (1 << (slot & 7)))
+
+    def set_slot(self, slot, used):
+        if used:
+            self.user_slots[slot >> 3] |= 1 << (slot & 7)
+        else:
+            self.user_slots[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def used_slots(self):
+        """Slots de usuario ocupados, en orden"""
+        return [slot for slot in range(self.max_users) if self.slot_used(slot)]
+
+    def free_slot(self):
+        """Primer slot de usuario libre (los de usuarios borrados se reutilizan), o None"""
+        for i in range(len(self.user_slots)):
+            if self.user_slots[i] != 0xFF:
+                for slot in range(i * 8, min(i * 8 + 8, self.max_users)):
+                    if not self.slot_used(slot):
+                        return slot
+        return None
+
+    def count_users(self):
+        return sum(bin(byte).count('1') for byte in self.user_slots)
+
+    def card_hash(self, uid):
+        """
+        Hash con sal (32 bits) del UID de una tarjeta, ya rellenado a 16 caracteres.
+        Nunca regresa 0.
+        """
+        if isinstance(uid, str):
+            uid = uid.encode('utf-8')
+        digest = hashlib.sha256(bytes(self.mst_key) + b'uid' + uid).digest()
+        return ustruct.unpack_from('>I', digest, 0)[0] or 1
+
+    def _filter_bits(self, h):
+        # Dos posiciones del filtro tomadas del hash
+        n_bits = len(self.card_filter) * 8
+        return h % n_bits, (h >> 16) % n_bits
+
+    def rebuild_card_map(self):
+        """Reconstruye el mapa UID -> slot y su filtro de pertenencia"""
+        self.card_map = {}
+        card_filter = self.card_filter
+        for i in range(len(card_filter)):
+            card_filter[i] = 0  # Se limpia sin cambiar el tamaño que fijo apply_layout
+        for slot in range(self.max_users):
+            h = self.card_hashes[slot]
+            if h:
+                self.card_map[h] = slot
+                for bit in self._filter_bits(h):
+                    self.card_filter[bit >> 3] |= 1 << (bit & 7)
+
+    def card_slot(self, uid):
+        """
+        Regresa el slot del usuario dueño de la tarjeta, o None si no esta inscrita.
+        Las tarjetas desconocidas se rechazan con el filtro, sin leer la EEPROM.
+        
+        Parameters:
+        -uid: UID de la tarjeta rellenado a 16 caracteres
+        """
+        h = self.card_hash(uid)
+        for bit in self._filter_bits(h):
+            if not self.card_filter[bit >> 3] & (1 << (bit & 7)):
+                return None
+        return self.card_map.get(h)
+
+    def card_key_matches(self, slot, card_data):
+        """
+        Compara la llave rotativa leida de la tarjeta con la guardada para el slot
+        (una lectura de pagina). Tambien acepta la posicion 48 que usaban versiones anteriores.
+        """
+        if not card_data:
+            return False
+        card_key = bytes(card_data[:16])
+        stored, legacy = self.eeprom.read_fields(self.usr_start_page + slot, '16s16s', 32)
+        self.legacy_card_key = card_key == legacy
+        return card_key == stored or self.legacy_card_key
+
+    def save_card_key(self, slot, card_key):
+        """
+        Guarda la nueva llave rotativa de la tarjeta del usuario en el slot.
+        Si la llave anterior estaba en la posicion antigua (48) se borra de ahi.
+        """
+        page = self.usr_start_page + slot
+        with self.eeprom.cache:
+            self.eeprom.partial_data(page, 32, bytes(card_key[:16]))
+            if self.legacy_card_key:
+                self.eeprom.partial_data(page, 48, b'0' * 16)
+                self.legacy_card_key = False
+
+    def _check_block(self, key, page, offset):
+        """True si el bloque de 16 bytes en page/offset es `key` cifrado consigo misma"""
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        block = self.eeprom.read_fields(page, '16s', offset)[0]
+        return cryptolib.aes(key, 1).decrypt(block) == key
+
+    def resolve_credential(self, key):
+        """
+        Identifica en una sola pasada si la contraseña es de un administrador y/o de un usuario.
+        Solo se descifran las paginas cuyo hash coincide (o cuyo hash aun no se conoce).
+        
+        Parameters:
+        -key: Contraseña (16 caracteres)
+        
+        Returns:
+        - (es_admin, slot_usuario) donde slot_usuario es None si no es usuario
+        """
+        if len(key) != 16:
+            return False, None
+        tag = self.pin_tag(key)
+        admin = False
+        for i in range(min(self.admins, self.max_admins)):
+            if self.admin_tags[i] not in (0, tag):
+                continue
+            if self._check_block(key, self.admin_start_page, i * 16):
+                admin = True
+                if self.admin_tags[i] == 0:
+                    self.admin_tags[i] = tag
+                    self.save_credential_index(admin=i)
+                break
+        slot = None
+        for i in self.used_slots():
+            if self.user_tags[i] not in (0, tag):
+                continue
+            page = self.usr_start_page + i
+            if self._check_block(key, page, 0):
+                self.read_user_info(key, page)
+                self.usr_id_num = i
+                slot = i
+                if self.user_tags[i] == 0 or self.card_hashes[i] == 0:
+                    self.user_tags[i] = tag
+                    self.card_hashes[i] = self.card_hash(self.usr_card)
+                    self.rebuild_card_map()
+                    self.save_credential_index(user=i)
+                break
+        return admin, slot
+
     def is_user(self, key):
         """
         Verifica si es un usuario registrado
@@ -130,34 +559,27 @@ class DatabaseManager:
         -key: Contraseña del usuario
         
         Returns:
-        - None
+        - True si es usuario (deja su slot en self.usr_id_num)
         """
         try:
-            for i in range(5):
-                page = self.usr_start_page + i
-                self.read_user_info(key, page)
-                if self.usr_pswd:
-                    self.usr_id_num = i
-                    return True
-            return False
+            return self.resolve_credential(key)[1] is not None
         except Exception as e:
             return False
     
-    #TODO Agregar is_admin
     def is_admin(self, key):
         """
-        Verifica si es un usuario registrado
+        Verifica si es un administrador registrado
         
         Parameters:
-        -key: Contraseña del usuario
+        -key: Contraseña del administrador
         
         Returns:
-        - None
+        - True si es administrador
         """
-        data = self.read_admin_info(key)
-        if data:
-            return True
-        return False
+        try:
+            return self.resolve_credential(key)[0]
+        except Exception as e:
+            return False
     
     def save_admin_pswd(self, key):
         """
@@ -173,9 +595,13 @@ class DatabaseManager:
         guard = [
             {'key': key, 'start': space, 'end': space + 16}
         ]
-        self.eeprom.secure_save(guard,key,self.admin_start_page,1)
-        self.admins += 1
-        self.update_gral_info()
+        with self.transaction():
+            self.eeprom.secure_save(guard,key,self.admin_start_page,1)
+            if self.admins < self.max_admins:
+                self.admin_tags[self.admins] = self.pin_tag(key)
+                self.save_credential_index(admin=self.admins)
+            self.admins += 1
+            self.update_gral_info()
         
         
     def read_admin_info(self, key):
@@ -194,130 +620,103 @@ class DatabaseManager:
         raw_data=self.eeprom.secure_read(guard,self.admin_start_page)
         return raw_data
     
-    def save_log(self, mensaje, tipo=1):
+    def save_log(self, mensaje, tipo=1, arg=0):
         """
-        Registra un mensaje en un archivo de log con una marca de tiempo.
+        Registra un mensaje en la bitacora circular con una marca de tiempo.
+        El mensaje se guarda como un codigo de LOG_MESSAGES, y cada log cuesta
+        una sola escritura de pagina; la pagina 0 no se modifica.
         
         Parameters:
-        -key:La llave de encriptacion para los logs
-        -data:El mensaje que se va a guardar
+        -mensaje:El mensaje que se va a guardar
         -tipo:Que tipo de mensaje se va a guardar
+        -arg:Argumento numerico opcional (por ejemplo, un codigo de error)
         
         Returns:
-        - None
+        - Numero de secuencia del log
         """
-        print("Entrar a save_log")
-        time = rtc_config.obtener_fecha_hora_rtc()
-        data = f"{tipo}-{time}-{mensaje}"
-        print(f"Tipo: {tipo} time: {time} Mensaje:{mensaje}")
-        print(f"mst_key: {self.mst_key}")
-        print(f"mst_key List: {list(self.mst_key)}")
-        
-        key=ReedSolomonSimple.pseudo_decrypt(list(self.mst_key))
-        print(f"Key: {key}")
-        guard = [
-            {'key': key, 'start': 0, 'end': 64}
-        ]
-        log_page = self.log_start_page + self.num_logs
-        print(f"Num Logs: {self.num_logs}")
-        if log_page > self.max_pages:
-            self.num_logs = 0
-            log_page = self.log_start_page
-        else:
-            self.num_logs += 1
-        print(f"Page: {log_page}")
-        print(f"Num Logs: {self.num_logs}")
-        print(f"Sentencia completa: Key~{key} Data~{data} page~{log_page}")
-        self.eeprom.secure_save(guard,data,log_page)
-        self.update_gral_info()
+        code = message_code(mensaje)
+        print(f"Tipo: {tipo} Mensaje:{mensaje} Codigo:{code}")
+        seq = self.log_ring.append(tipo, code, arg, rtc_config.obtener_epoch_rtc())
+        self.num_logs = self.log_ring.count()
+        return seq
+    
+    def format_log(self, record):
+        """
+        Convierte un registro binario de la bitacora en texto "{tipo}-{fecha}-{mensaje}"
+        """
+        seq, epoch, tipo, code, arg = record
+        mensaje = LOG_MESSAGES[code] if code < len(LOG_MESSAGES) else LOG_MESSAGES[0]
+        if arg:
+            mensaje = f"{mensaje} ({arg})"
+        return f"{tipo}-{rtc_config.formatear_epoch(epoch)}-{mensaje}"
             
-    def read_log(self, log_page):
+    def read_log(self, seq):
         """
         Lee un solo log
         
         Parameters:
-        -key: Contraseña del admin
-        -page:Pagina que almacena el log
+        -seq:Numero de secuencia del log
         
         Returns:
-        - None
+        - Texto del log o None si ya fue sobrescrito
         """
-        key=ReedSolomonSimple.pseudo_decrypt(list(self.mst_key))
-        guard = [
-            {'key': key, 'start': 0, 'end': 64}
-        ]
-        raw_data=self.eeprom.secure_read(guard,log_page)
-        return raw_data
+        record = self.log_ring.read(seq)
+        return self.format_log(record) if record else None
 
-    def create_log_array(self, number=10, kindof = None):
+    def create_log_array(self, number=10, kindof = None, offset=0, cursor=None):
         """
         Genera un reporte de logs que pueden clasificarse por tipo de log o solo el numero de logs
-        que se deseen consultar
+        que se deseen consultar. Con un tipo solo se leen las paginas que lo contienen.
         
         Parameters:
-        -key: Contraseña del administrador
+        -number: Numero de logs que se desean consultar
         -kindof: Tipo de logs que se desea consultar (puede no ser ninguno)
+        -offset: Numero de logs (del tipo pedido) que se saltan
+        -cursor: Secuencia desde la que se continua una consulta anterior (self.log_cursor)
         
         Returns:
         - Arreglo de logs que se encontro
         """
-        print("Se creara un array de logs")
-        print(f" Informacion recibida: Numero:{number} Tipo:{kindof}")
-        log_array = []
-        i = 0
-        while len(log_array) <= number:
-            num_log = self.log_start_page + self.num_logs - 1 - i
-            
-            if num_log < self.log_start_page or num_log >= self.max_pages:
-                break
-            
-            log = self.read_log(num_log)
-            print(f"Recuperado: {log}")
-            if not log:
-                    break
-            
-            if kindof:
-                print(f"Log #{i}: log[0]-{log[0]} type:{type(log[0])}  log[0:1]-{log[0:1]} type:{type(log[0:1])}")
-                if log[0] == str(kindof):
-                    print("Anexado al array")
-                    log_array.append(log)
-            else:
-                log_array.append(log)
-            i += 1
-        return log_array
+        print(f" Informacion recibida: Numero:{number} Tipo:{kindof} Offset:{offset} Cursor:{cursor}")
+        tipo = int(kindof) if kindof else None
+        if offset:
+            # El offset se convierte en cursor; sin tipo no cuesta ninguna lectura
+            cursor = self.log_ring.seek(tipo, offset, cursor)
+            if cursor is None:
+                self.log_cursor = None
+                return []
+        records, self.log_cursor = self.log_ring.query(tipo, number, cursor)
+        return [self.format_log(record) for record in records]
     
-    def save_phone(self, num_tel, admin=False):
+    def save_phone(self, num_tel, admin=False, slot=None):
         """
         Guarda un telefono de usuario sin encriptar 
         
         Parameters:
         -num_tel: Numero de telefono
         -admin: El telefono pertenece a un admin?
+        -slot: Slot del usuario; por defecto el que ocupara el siguiente usuario
         
         Returns:
         - Arreglo de logs que se encontro
         """
         num_tel = self.pad_data(num_tel,8)
-        buffer=ReedSolomonSimple.pseudo_encrypt(num_tel)
+        buffer=ReedSolomonSimple.pseudo_encrypt(num_tel, 20)
         num_seguro = bytes(buffer)
-        page=self.tel_start_page
+        # Los admins ocupan los primeros lugares de la region y despues van los usuarios
         if admin:
-            offset = self.admins * 20
-            if offset > 60:
-                offset = 0
-                page += 1
+            phone_slot = min(self.admins, self.max_admins - 1)
         else:
-            page +=1
-            if 0 <= self.num_usr < 1:
-                offset = 20 * self.num_usr + 20
-            elif 1 <= self.num_usr < 3:
-                offset = -20 * x + 60
-            else:
-                page += 1
-                if 3 <= self.num_usr < 4:
-                    offset = 20 * self.num_usr - 60
-                elif 4 <= self.num_usr <= 5:
-                    offset = 20 * self.num_usr - 60
+            if slot is None:
+                slot = self.free_slot()
+            if slot is None:
+                print("Ya no hay espacio para mas telefonos")
+                return
+            phone_slot = self.max_admins + slot
+        if phone_slot >= self.layout.phones.capacity:
+            print("Ya no hay espacio para mas telefonos")
+            return
+        page, offset = self.layout.phones.locate(phone_slot)
         print(f"Info Tel: page-{page}, offset-{offset},  num_seguro-{num_seguro}, len:{len(num_seguro)},")
         self.eeprom.partial_data(page, offset, num_seguro, 1)
     
@@ -326,7 +725,7 @@ class DatabaseManager:
         print("*°*°*° Empezando recuperacion de API *°*°*°")
         if admin == 1:
             print("Se requiere de los admin")
-            data_str = self.eeprom.read(self.api_key_page, 1)
+            data_str = bytes(self.eeprom.read_range(self.api_key_page, self.layout.api.pages))
             print(f"Data: {data_str} len:{len(data_str)}")
             for i in range(0, len(data_str), 16):
                 print(f"Segmento #{i}")
@@ -339,34 +738,50 @@ class DatabaseManager:
                 print("Segmento no vacio")
                 segmento = list(segmento)
                 print(f"Segmento (list): {segmento}")
-                plain_api=ReedSolomonSimple.pseudo_decrypt(segmento)
+                try:
+                    plain_api=ReedSolomonSimple.pseudo_decrypt(segmento)
+                except ReedSolomonError as e:
+                    print(f"Apikey danada, saltando: {e}")
+                    continue
                 print(f"API que se agrega: {plain_api}")
-                api.append(plain_api[0:7])
+                api.append(plain_api)
         
-        for page in range(self.usr_start_page, self.usr_start_page + 3):
-            data_str = self.eeprom.read(page, 1)
-            print(f"Data: {data_str} len:{len(data_str)}")
-            data_str = data_str[48:64]
-            print(f"Segmento: {data_str}")
-            if data_str ==  b'0000000000000000':  # Verifica que el segmento no esté vacío
-                print("Segmento vacío detectado, saltando...")
-                continue
-            data_str = list(data_str)
-            print(f"Segmento (list): {data_str}")
-            plain_api=ReedSolomonSimple.pseudo_decrypt(data_str)
-            print(f"API que se agrega: {plain_api}")
-            api.append(plain_api[0:7])
+        # Las apikeys de los usuarios estan en su pagina; se leen por bloques de paginas
+        chunk = 8
+        slots = self.used_slots()
+        last = slots[-1] + 1 if slots else 0
+        for first in range(0, last, chunk):
+            n_pages = min(chunk, last - first)
+            view = self.eeprom.read_range(self.usr_start_page + first, n_pages)
+            for i in range(n_pages):
+                if not self.slot_used(first + i):
+                    continue
+                offset = i * 64
+                data_str = bytes(view[offset + 48:offset + 64])
+                print(f"Segmento: {data_str}")
+                if data_str ==  b'0000000000000000':  # Verifica que el segmento no esté vacío
+                    print("Segmento vacío detectado, saltando...")
+                    continue
+                data_str = list(data_str)
+                print(f"Segmento (list): {data_str}")
+                try:
+                    plain_api=ReedSolomonSimple.pseudo_decrypt(data_str)
+                except ReedSolomonError as e:
+                    print(f"Apikey danada, saltando: {e}")
+                    continue
+                print(f"API que se agrega: {plain_api}")
+                api.append(plain_api)
         
         return api
         
     def save_api(self, api, page):
         print("Comenzando Crypto")
-        buffer=ReedSolomonSimple.pseudo_encrypt(api)
+        buffer=ReedSolomonSimple.pseudo_encrypt(api, 16)
         print(f"Buffer: {buffer}")
         api_seguro = bytes(buffer)
         print(f"Guardando api: {api_seguro}")
         if page == self.api_key_page:
-            offset = 16 * self.admins
+            page, offset = self.layout.api.locate(min(self.admins, self.max_admins - 1))
         else:
             offset = 48
         print(f"offset: {offset}")
@@ -379,9 +794,14 @@ class DatabaseManager:
     def read_phones(self):
         print(f"°°°Empezando a leer telefonos°°°")
         telefonos = []
-        for page in range(self.tel_start_page, self.tel_start_page + 3):
-            print(f"Pagina #{page}")
-            data_str = self.eeprom.read(page,1)
+        # Solo se leen las paginas hasta el telefono del ultimo slot ocupado
+        slots = self.used_slots()
+        last_page = self.layout.phones.locate(self.max_admins + (slots[-1] if slots else 0))[0]
+        n_pages = min(last_page + 1, self.layout.phones.end) - self.tel_start_page
+        view = self.eeprom.read_range(self.tel_start_page, n_pages)
+        for i in range(n_pages):
+            print(f"Pagina #{self.tel_start_page + i}")
+            data_str = bytes(view[i * 64:(i + 1) * 64])
             print(f"data_str: {data_str}")
             data_str = data_str[:-4]
             print(f"data recortada: {data_str}")
@@ -391,7 +811,7 @@ class DatabaseManager:
                 segmento = data_str[i:i+20]
                 print(f"segmento: {segmento}")
                 
-                if segmento == b'00000000000000000000':
+                if segmento in (b'00000000000000000000', b'\xff' * 20):
                     print("Segmento vacío detectado, saltando...")
                     continue
                 
@@ -402,7 +822,11 @@ class DatabaseManager:
                     print(f"Segmento no vacio")
                     #segmento = list(segmento)
                     #print(f"Segmento rearmado: {segmento}")
-                    plain_tel=ReedSolomonSimple.pseudo_decrypt(segmento)
+                    try:
+                        plain_tel=ReedSolomonSimple.pseudo_decrypt(segmento)
+                    except ReedSolomonError as e:
+                        print(f"Telefono danado, saltando: {e}")
+                        continue
                     print(f"Tel_recuperado: {plain_tel}")
                     telefonos.append(plain_tel)
                     print(f"Incluido en telefonos")
@@ -410,10 +834,12 @@ class DatabaseManager:
 
     def delete_user(self, user_index):
         """
-        Elimina un usuario específico y reorganiza los datos restantes.
+        Elimina un usuario. Su slot queda marcado como libre (tombstone) y se reutiliza
+        en la siguiente alta; los demas usuarios no se mueven, asi que el costo es el
+        mismo sin importar cuantos usuarios haya.
     
         Parameters:
-        - user_index: Índice del usuario que se desea eliminar (0 a num_usr - 1)
+        - user_index: Slot del usuario que se desea eliminar
     
         Returns:
         - bool: True si la operación fue exitosa, False en caso de error.
@@ -425,32 +851,30 @@ class DatabaseManager:
                 return False
 
             # Validar índice del usuario
-            if user_index < 0 or user_index >= self.num_usr:
+            if user_index < 0 or user_index >= self.max_users or not self.slot_used(user_index):
                 print("Índice de usuario inválido.")
                 return False
 
-            # Mover los datos de los usuarios posteriores hacia arriba
-            for i in range(user_index, self.num_usr - 1):
-                source_page = self.usr_start_page + i + 1
-                target_page = self.usr_start_page + i
-                # Leer los datos del siguiente usuario
-                user_data = self.eeprom.read(source_page, 1)
-                # Escribir los datos en la posición actual
-                self.eeprom.save(user_data, target_page, 1)
-
-            # Borrar los datos del último usuario
-            last_page = self.usr_start_page + self.num_usr - 1
-            self.eeprom.save(b'0' * 64, last_page, 1)  # 64 bytes de espacio vacío
-
-            # Actualizar la información general
-            self.num_usr -= 1
-            self.update_gral_info()
+            with self.transaction():
+                # Borrar la pagina del usuario (contraseña, tarjeta y apikey) y su telefono
+                self.eeprom.save(b'0' * 64, self.usr_start_page + user_index, 1)
+                page, offset = self.layout.phones.locate(self.max_admins + user_index)
+                self.eeprom.partial_data(page, offset, b'0' * 20)
+
+                # Liberar el slot en el indice de credenciales
+                self.user_tags[user_index] = 0
+                self.card_hashes[user_index] = 0
+                self.set_slot(user_index, False)
+                self.rebuild_card_map()
+                self.save_credential_index(user=user_index)
 
-            print(f"Usuario {user_index} eliminado y datos reorganizados.")
+                # Actualizar la información general
+                self.num_usr = self.count_users()
+                self.update_gral_info()
+
+            print(f"Usuario {user_index} eliminado.")
             return True
 
         except Exception as e:
             print(f"Error al eliminar usuario: {e}")
             return False
-
-        
\ No newline at end of file
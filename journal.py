@@ -0,0 +1,117 @@
+import hashlib
+import ustruct
+
+
+class Journal:
+    """
+    Bitacora de escritura anticipada (write-ahead) para transacciones de varias paginas.
+
+    La region tiene una pagina de registro seguida de las copias de las paginas:
+    1. Se escriben las copias de todas las paginas de la transaccion, una tras otra.
+    2. Se escribe el registro con las paginas destino y un hash (marca de commit).
+    3. Se escriben las paginas en su lugar.
+    4. Se marca el registro como aplicado.
+
+    Si se corta la energia antes del paso 2 la transaccion no ocurrio; si se corta
+    despues, recover() la vuelve a aplicar al arrancar. La recuperacion solo lee
+    la region del journal, no toda la EEPROM.
+    """
+
+    MAGIC = b'JRNL'
+    HEADER = '>4sBIB'  # magic, estado, secuencia, numero de paginas
+    HEADER_SIZE = 10
+    COMMITTED = 1
+    APPLIED = 2
+    MAX_PAGES = 25  # Paginas destino que caben en el registro (2 bytes cada una)
+
+    def __init__(self, control, start_page, n_pages):
+        """
+        Parameters:
+        - control: Objeto CAT24C256 (o CompositeEEPROM) que hace las transacciones I2C.
+        - start_page: Pagina del registro; las copias van en las siguientes.
+        - n_pages: Paginas de la region (registro incluido).
+        """
+        self.control = control
+        self.bpp = control.bpp
+        self.start_page = start_page
+        self.capacity = min(max(0, n_pages - 1), self.MAX_PAGES)
+        self.seq = 0
+
+    def _digest(self, header, images):
+        h = hashlib.sha256(header)
+        h.update(images)
+        return h.digest()[:4]
+
+    def _record(self, state, pages, images):
+        buf = bytearray(self.bpp)
+        ustruct.pack_into(self.HEADER, buf, 0, self.MAGIC, state, self.seq, len(pages))
+        offset = self.HEADER_SIZE
+        for page in pages:
+            ustruct.pack_into('>H', buf, offset, page)
+            offset += 2
+        buf[offset:offset + 4] = self._digest(bytes(buf[:offset]), images)
+        return buf
+
+    def commit(self, pages, contents):
+        """
+        Escribe de forma atomica las paginas dadas.
+
+        Parameters:
+        - pages: Numeros de pagina, en el orden en que se aplican.
+        - contents: Diccionario pagina -> contenido (bpp bytes).
+        """
+        bpp = self.bpp
+        images = bytearray(len(pages) * bpp)
+        for i, page in enumerate(pages):
+            images[i * bpp:(i + 1) * bpp] = contents[page]
+        self.seq += 1
+        # Copias en paginas consecutivas y despues la marca de commit
+        self.control.write((self.start_page + 1) * bpp, images)
+        self.control.sync()
+        record = self._record(self.COMMITTED, pages, images)
+        self.control.write(self.start_page * bpp, record)
+        self.control.sync()
+        self._apply(pages, images)
+        record[4] = self.APPLIED
+        self.control.write(self.start_page * bpp, record)
+
+    def _apply(self, pages, images):
+        bpp = self.bpp
+        index = {}
+        for i, page in enumerate(pages):
+            index[page] = i
+        for page in self.control.write_order(list(pages)):
+            i = index[page]
+            self.control.write(page * bpp, images[i * bpp:(i + 1) * bpp])
+        self.control.sync()
+
+    def recover(self):
+        """
+        Vuelve a aplicar la ultima transaccion si se confirmo pero no se termino de escribir.
+
+        Returns:
+        - Lista de paginas reescritas (vacia si no habia nada pendiente)
+        """
+        if self.capacity == 0:
+            return []
+        bpp = self.bpp
+        record = self.control.read(self.start_page * bpp, bpp)
+        magic, state, seq, count = ustruct.unpack_from(self.HEADER, record, 0)
+        if magic != self.MAGIC:
+            return []
+        self.seq = seq
+        if state != self.COMMITTED or not 0 < count <= self.capacity:
+            return []
+        offset = self.HEADER_SIZE + 2 * count
+        pages = list(ustruct.unpack_from('>' + 'H' * count, record, self.HEADER_SIZE))
+        images = bytearray(count * bpp)
+        self.control.read_into((self.start_page + 1) * bpp, images)
+        if self._digest(bytes(record[:offset]), images) != bytes(record[offset:offset + 4]):
+            print("Journal: registro incompleto, se descarta")
+            return []
+        print(f"Journal: reaplicando transaccion {seq} ({count} paginas)")
+        self._apply(pages, images)
+        record = bytearray(record)
+        record[4] = self.APPLIED
+        self.control.write(self.start_page * bpp, record)
+        return pages
@@ -0,0 +1,72 @@
+import cryptolib
+
+
+class KeyManager:
+    """
+    Guarda los secretos ya decodificados (por ejemplo, la llave de los logs) y los
+    objetos AES listos para usar, para no repetir la decodificacion Reed-Solomon ni
+    crear un cifrador nuevo en cada operacion.
+
+    En modo ECB un objeto de cryptolib solo puede cifrar o descifrar, asi que se
+    guarda uno por direccion. Los cifradores se guardan en una cache LRU pequeña.
+    """
+
+    ECB = 1
+
+    def __init__(self, max_ciphers=4):
+        """
+        Parameters:
+        - max_ciphers: Cuantos objetos AES se guardan a la vez.
+        """
+        self.max_ciphers = max_ciphers
+        self.secrets = {}  # nombre -> bytearray con el secreto decodificado
+        self.ciphers = {}  # (llave, descifrar) -> objeto aes
+        self.lru = []  # El cifrador usado mas recientemente va al final
+
+    def secret(self, name, decode):
+        """
+        Regresa el secreto `name`, llamando decode() solo la primera vez.
+
+        Parameters:
+        - name: Nombre del secreto.
+        - decode: Funcion que regresa el secreto en bytes. No se acepta str: codificarlo
+          cambiaria el largo de una llave binaria.
+        """
+        value = self.secrets.get(name)
+        if value is None:
+            value = decode()
+            if isinstance(value, str):
+                raise TypeError("El secreto debe ser bytes")
+            value = bytearray(value)
+            self.secrets[name] = value
+        return value
+
+    def cipher(self, key, decrypt=False):
+        """Regresa un objeto AES-ECB para la llave dada (para cifrar o para descifrar)"""
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        entry = (bytes(key), decrypt)
+        aes = self.ciphers.get(entry)
+        if aes is not None:
+            self.lru.remove(entry)
+            self.lru.append(entry)
+            return aes
+        aes = cryptolib.aes(entry[0], self.ECB)
+        self.ciphers[entry] = aes
+        self.lru.append(entry)
+        while len(self.lru) > self.max_ciphers:
+            del self.ciphers[self.lru.pop(0)]
+        return aes
+
+    def invalidate(self):
+        """Olvida secretos y cifradores (por ejemplo, porque cambio la llave maestra)"""
+        self.secrets = {}
+        self.ciphers = {}
+        self.lru = []
+
+    def wipe(self):
+        """Sobrescribe los secretos en RAM antes de olvidarlos (al salir del modo admin)"""
+        for value in self.secrets.values():
+            for i in range(len(value)):
+                value[i] = 0
+        self.invalidate()
@@ -1,11 +1,37 @@
-from machine import Pin
+from machine import Pin, Timer
+import micropython
 import utime
+import uasyncio as asyncio
+
+# Estados del escaneo con antirrebote
+IDLE = 0  # Sin tecla; las columnas esperan un flanco
+DEBOUNCE = 1  # Se detecto una tecla y se espera a que sea estable
+PRESSED = 2  # Tecla estable (con auto-repeticion mientras se mantiene)
+
 
 class Keypad4x4:
     """
     Clase para manejar un teclado matricial 4x4.
+
+    Con start() el teclado funciona por interrupciones: en reposo todas las filas
+    quedan en bajo y un flanco de bajada en cualquier columna arranca un timer que
+    escanea la matriz cada SCAN_MS. Cada escaneo da el conjunto de teclas presionadas;
+    cuando se lee igual DEBOUNCE_SCANS veces seguidas se reportan las teclas nuevas
+    (aunque otra siga presionada) y la ultima que se presiono se repite despues de
+    REPEAT_DELAY_MS cada REPEAT_MS. Los eventos van a un buffer circular preasignado,
+    que se lee con Keypad4x4Read() (sin bloquear) o con `await read_key()`.
+
+    Las interrupciones no crean objetos: los callbacks se enlazan una sola vez en
+    __init__ y lo que necesita argumentos con nombre (timer.init) se pasa a
+    micropython.schedule.
     """
 
+    SCAN_MS = 5
+    DEBOUNCE_SCANS = 3
+    REPEAT_DELAY_MS = 600
+    REPEAT_MS = 200
+    QUEUE_SIZE = 16
+
     def __init__(self):
         """
         Inicializa los pines para las filas y columnas del teclado.
@@ -29,22 +55,189 @@ class Keypad4x4:
             ["B", "6", "5", "4"],
             ["A", "3", "2", "1"]
         ]
+        self.keys = [key for row in self.key_map for key in row]  # Indice 0-15 -> tecla
+
+        # Cola de eventos (indices de tecla) y estado del escaneo
+        self.queue = bytearray(self.QUEUE_SIZE)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0  # Eventos perdidos porque la cola estaba llena
+        self.state = IDLE
+        self.candidate = 0  # Mascara de teclas del escaneo en curso
+        self.count = 0
+        self.down = 0  # Mascara de teclas ya reportadas que siguen presionadas
+        self.held = -1  # Tecla que se auto-repite
+        self.next_repeat = 0
+        self.edge_ms = 0  # Momento del ultimo flanco (para medir la latencia)
+        self.latency_ms = 0  # Del flanco al evento de la ultima tecla
+        self.timer = None
+        self.flag = None  # ThreadSafeFlag; sin el, read_key() revisa la cola cada SCAN_MS
+        # Metodos enlazados una sola vez: enlazarlos dentro de una interrupcion crea objetos
+        self._on_edge_cb = self._on_edge
+        self._tick_cb = self._tick
+        self._start_scan_cb = self._start_scan
+
+    def start(self):
+        """Activa el escaneo por interrupciones y la cola de eventos"""
+        if self.timer is not None:
+            return
+        self.timer = Timer()
+        # asyncio.Event.set() no es seguro en una interrupcion; sin ThreadSafeFlag se sondea
+        ThreadSafeFlag = getattr(asyncio, 'ThreadSafeFlag', None)
+        self.flag = ThreadSafeFlag() if ThreadSafeFlag is not None else None
+        self._arm()
+
+    def stop(self):
+        """Regresa a la lectura bajo demanda"""
+        if self.timer is None:
+            return
+        for col in self.col_list:
+            col.irq(None)
+        self.timer.deinit()
+        self.timer = None
+        self.state = IDLE
+        for r in self.row_list:
+            r.value(1)
+
+    def _arm(self):
+        # Todas las filas en bajo: cualquier tecla baja su columna
+        for r in self.row_list:
+            r.value(0)
+        for col in self.col_list:
+            col.irq(self._on_edge_cb, Pin.IRQ_FALLING)
+
+    def _on_edge(self, pin):
+        if self.state != IDLE:
+            return
+        for col in self.col_list:
+            col.irq(None)
+        self.edge_ms = utime.ticks_ms()
+        self.state = DEBOUNCE
+        self.candidate = 0
+        self.count = 0
+        self.down = 0
+        try:
+            micropython.schedule(self._start_scan_cb, 0)
+        except RuntimeError:
+            # Cola de schedule llena: se pierde este flanco y se espera el siguiente
+            self.state = IDLE
+            self._arm()
+
+    def _start_scan(self, arg):
+        # Fuera de la interrupcion: timer.init solo acepta argumentos con nombre
+        if self.timer is not None and self.state == DEBOUNCE:
+            self.timer.init(mode=Timer.PERIODIC, period=self.SCAN_MS, callback=self._tick_cb)
+
+    def _scan(self):
+        """Mascara de bits (bit = indice 0-15) de las teclas presionadas (sin crear objetos)"""
+        rows = self.row_list
+        cols = self.col_list
+        for r in range(4):
+            rows[r].value(1)
+        mask = 0
+        for r in range(4):
+            rows[r].value(0)
+            for c in range(4):
+                if cols[c].value() == 0:
+                    mask |= 1 << (r * 4 + c)
+            rows[r].value(1)
+        return mask
+
+    @staticmethod
+    def _lowest(mask):
+        for i in range(16):
+            if mask & (1 << i):
+                return i
+        return -1
+
+    def _tick(self, timer):
+        mask = self._scan()
+        now = utime.ticks_ms()
+        if mask == self.candidate:
+            self.count += 1
+        else:
+            self.candidate = mask
+            self.count = 1
+        if self.count < self.DEBOUNCE_SCANS:
+            return
+        if mask == 0:
+            # Sin teclas: se vuelve a esperar un flanco
+            self.state = IDLE
+            self.down = 0
+            self.held = -1
+            self.timer.deinit()
+            self._arm()
+            return
+        new = mask & ~self.down
+        self.down = mask
+        if new:
+            # Tecla nueva, aunque otra siga presionada: se reporta de inmediato
+            key = self._lowest(new)
+            if self.state == DEBOUNCE:
+                self.state = PRESSED
+                self.latency_ms = utime.ticks_diff(now, self.edge_ms)
+            self.held = key
+            self.next_repeat = utime.ticks_add(now, self.REPEAT_DELAY_MS)
+            self._push(key)
+        elif not mask & (1 << self.held):
+            # Se solto la tecla que se repetia; se repite la que quedo
+            self.held = self._lowest(mask)
+            self.next_repeat = utime.ticks_add(now, self.REPEAT_DELAY_MS)
+        elif utime.ticks_diff(now, self.next_repeat) >= 0:
+            self.next_repeat = utime.ticks_add(now, self.REPEAT_MS)
+            self._push(self.held)
+
+    def _push(self, key):
+        head = (self.head + 1) % self.QUEUE_SIZE
+        if head == self.tail:
+            self.dropped += 1
+            return
+        self.queue[self.head] = key
+        self.head = head
+        if self.flag is not None:
+            self.flag.set()
+
+    def get_key(self):
+        """Saca la siguiente tecla de la cola, o None si esta vacia"""
+        if self.head == self.tail:
+            return None
+        key = self.queue[self.tail]
+        self.tail = (self.tail + 1) % self.QUEUE_SIZE
+        return self.keys[key]
+
+    def flush(self):
+        """Descarta las teclas pendientes"""
+        self.tail = self.head
+
+    async def read_key(self):
+        """Espera la siguiente tecla (para tareas de uasyncio)"""
+        while True:
+            key = self.get_key()
+            if key is not None:
+                return key
+            if self.flag is None:
+                await asyncio.sleep_ms(self.SCAN_MS)
+            else:
+                await self.flag.wait()
 
     def Keypad4x4Read(self):
         """
         Lee el estado del teclado y devuelve la tecla presionada.
-        
+        Con start() regresa la siguiente tecla de la cola.
+
         :return: Tecla presionada o None si no hay tecla presionada.
         """
+        if self.timer is not None:
+            return self.get_key()
         for r in self.row_list:
             r.value(0)  # Activa la fila actual
             result = [col.value() for col in self.col_list]  # Lee el estado de las columnas
-            
+
             if min(result) == 0:  # Si alguna columna está en estado bajo
                 key = self.key_map[self.row_list.index(r)][result.index(0)]  # Obtiene la tecla correspondiente
                 r.value(1)  # Vuelve a establecer la fila a alto
                 return key
-            
+
             r.value(1)  # Vuelve a establecer la fila a alto después de la lectura
 
         return None  # Retorna None si no se presiona ninguna tecla
@@ -52,7 +245,7 @@ class Keypad4x4:
     def ReadString(self):
         """
         Lee una cadena de caracteres del teclado hasta que se presiona '#'.
-        
+
         :return: Cadena de caracteres ingresada.
         """
         string = ""
@@ -62,4 +255,7 @@ class Keypad4x4:
                 if key == "#":  # Fin de la entrada
                     return string
                 string += key  # Agrega la tecla a la cadena
-                utime.sleep(0.3)  # Espera un tiempo para evitar múltiples lecturas
+                if self.timer is None:
+                    utime.sleep(0.3)  # Espera un tiempo para evitar múltiples lecturas
+            elif self.timer is not None:
+                utime.sleep_ms(10)
@@ -57,9 +57,9 @@ class LcdApi:
         self.display_off()
         self.backlight_on()
         self.clear()
-        self.hal_write_command(self.LCD_ENTRY_MODE | self.LCD_ENTRY_INC)
-        self.hide_cursor()
-        self.display_on()
+        # Entry mode and display on with the cursor hidden, in one batch
+        self.hal_write_commands((self.LCD_ENTRY_MODE | self.LCD_ENTRY_INC,
+                                 self.LCD_ON_CTRL | self.LCD_ON_DISPLAY))
 
     def clear(self):
         # Clears the LCD display and moves the cursor to the top left corner
@@ -111,17 +111,21 @@ class LcdApi:
         self.backlight = False
         self.hal_backlight_off()
 
-    def move_to(self, cursor_x, cursor_y):
-        # Moves the cursor position to the indicated position. The cursor
-        # position is zero based (i.e. cursor_x == 0 indicates first column).
-        self.cursor_x = cursor_x
-        self.cursor_y = cursor_y
+    def ddram_command(self, cursor_x, cursor_y):
+        # Returns the command that moves the cursor to the indicated position.
         addr = cursor_x & 0x3f
         if cursor_y & 1:
             addr += 0x40    # Lines 1 & 3 add 0x40
         if cursor_y & 2:    # Lines 2 & 3 add number of columns
             addr += self.num_columns
-        self.hal_write_command(self.LCD_DDRAM | addr)
+        return self.LCD_DDRAM | addr
+
+    def move_to(self, cursor_x, cursor_y):
+        # Moves the cursor position to the indicated position. The cursor
+        # position is zero based (i.e. cursor_x == 0 indicates first column).
+        self.cursor_x = cursor_x
+        self.cursor_y = cursor_y
+        self.hal_write_command(self.ddram_command(cursor_x, cursor_y))
 
     def putchar(self, char):
         # Writes the indicated character to the LCD at the current cursor
@@ -140,9 +144,11 @@ class LcdApi:
             self.cursor_x = 0
             self.cursor_y += 1
             self.implied_newline = (char != '\n')
-        if self.cursor_y >= self.num_lines:
-            self.cursor_y = 0
-        self.move_to(self.cursor_x, self.cursor_y)
+            if self.cursor_y >= self.num_lines:
+                self.cursor_y = 0
+            # Only a wraparound needs an explicit move; within a line the
+            # controller already auto-increments the address.
+            self.move_to(self.cursor_x, self.cursor_y)
 
     def putstr(self, string):
         # Write the indicated string to the LCD at the current cursor
@@ -150,6 +156,21 @@ class LcdApi:
         for char in string:
             self.putchar(char)
 
+    def write_run(self, buf, start, end):
+        # Writes buf[start:end] as raw character codes from the current cursor
+        # position using the controller's auto-increment (no move_to per char).
+        # The run must fit in the rest of the current line.
+        self.hal_write_data_run(buf, start, end)
+        self.cursor_x += end - start
+
+    def write_run_at(self, cursor_x, cursor_y, buf, start, end):
+        # Same as move_to followed by write_run, but lets the hal send the
+        # cursor command together with the data.
+        self.cursor_x = cursor_x
+        self.cursor_y = cursor_y
+        self.hal_write_command_run(self.ddram_command(cursor_x, cursor_y), buf, start, end)
+        self.cursor_x += end - start
+
     def custom_char(self, location, charmap):
         # Write a character to one of the 8 CGRAM locations, available
         # as chr(0) through chr(7).
@@ -181,6 +202,24 @@ class LcdApi:
         # It is expected that a derived HAL class will implement this function.
         raise NotImplementedError
 
+    def hal_write_data_run(self, buf, start, end):
+        # Write several data bytes to the LCD.
+        # A derived HAL class may override this to send them in one transfer.
+        for i in range(start, end):
+            self.hal_write_data(buf[i])
+
+    def hal_write_commands(self, cmds):
+        # Write a sequence of commands to the LCD.
+        # A derived HAL class may override this to send them in one transfer.
+        for cmd in cmds:
+            self.hal_write_command(cmd)
+
+    def hal_write_command_run(self, cmd, buf, start, end):
+        # Write a command followed by several data bytes.
+        # A derived HAL class may override this to send them in one transfer.
+        self.hal_write_command(cmd)
+        self.hal_write_data_run(buf, start, end)
+
     def hal_sleep_us(self, usecs):
         # Sleep for some time (given in microseconds)
         time.sleep_us(usecs)
@@ -0,0 +1,167 @@
+import utime
+import uasyncio as asyncio
+
+
+class Message:
+    """Mensaje para el LCD con su prioridad y, opcionalmente, su duracion"""
+
+    def __init__(self, text, row, col, priority, duration_ms, seq):
+        self.text = text
+        self.row = row
+        self.col = col
+        self.priority = priority
+        self.duration_ms = duration_ms  # None = se queda hasta que lo reemplacen
+        self.seq = seq  # Orden de llegada (desempata prioridades iguales)
+        self.expires = None  # Se fija la primera vez que se muestra
+        self.offset = 0  # Posicion del desplazamiento
+        self.next_scroll = 0
+
+
+class Display:
+    """
+    Administra lo que muestra el LCD sin bloquear al resto del programa.
+
+    Los mensajes se encolan con show(); siempre se muestra el de mayor prioridad (y,
+    entre iguales, el mas reciente). Un mensaje sin duracion reemplaza a los demas
+    mensajes sin duracion de igual o menor prioridad; uno con duracion se muestra
+    duration_ms a partir de que aparece y luego se regresa al anterior. Los textos que
+    no caben en la fila se desplazan un caracter cada scroll_ms.
+
+    tick() hace el trabajo pendiente y regresa enseguida, asi que se puede llamar desde
+    el ciclo principal; run() es la misma logica como tarea de uasyncio.
+    """
+
+    def __init__(self, frame, scroll_ms=400, scroll_hold_ms=1000, clock=None):
+        """
+        Parameters:
+        - frame: Objeto LcdFrame con el que se dibuja.
+        - scroll_ms: Tiempo entre pasos del desplazamiento.
+        - scroll_hold_ms: Tiempo que se deja el inicio del texto antes de desplazarlo.
+        - clock: Funcion que regresa milisegundos (por defecto utime.ticks_ms).
+        """
+        self.frame = frame
+        self.cols = frame.cols
+        self.scroll_ms = scroll_ms
+        self.scroll_hold_ms = scroll_hold_ms
+        self.clock = clock or utime.ticks_ms
+        self.messages = []
+        self.current = None
+        self.seq = 0
+        self.dirty = False
+
+    def show(self, text, row=0, col=0, priority=0, duration_ms=None):
+        """
+        Encola un mensaje.
+
+        Parameters:
+        - text: Texto a mostrar.
+        - row, col: Posicion donde empieza.
+        - priority: Los mensajes de mayor prioridad tapan a los de menor.
+        - duration_ms: Tiempo que se muestra, o None para dejarlo fijo.
+        """
+        cur = self.current
+        if (duration_ms is None and cur is not None and cur.duration_ms is None
+                and cur.text == text and cur.row == row and cur.col == col
+                and cur.priority == priority and cur in self.messages):
+            return cur  # Ya se esta mostrando; no se reinicia el desplazamiento
+        self.seq += 1
+        msg = Message(text, row, col, priority, duration_ms, self.seq)
+        if duration_ms is None:
+            self.messages = [m for m in self.messages
+                             if m.duration_ms is not None or m.priority > priority]
+        self.messages.append(msg)
+        self.dirty = True
+        return msg
+
+    def cancel(self, msg):
+        """Quita un mensaje de la cola (si todavia esta)"""
+        if msg in self.messages:
+            self.messages.remove(msg)
+            self.dirty = True
+
+    def _pick(self):
+        best = None
+        for m in self.messages:
+            if best is None or (m.priority, m.seq) > (best.priority, best.seq):
+                best = m
+        return best
+
+    def _draw(self, msg):
+        frame = self.frame
+        width = self.cols - msg.col
+        text = msg.text
+        frame.fill()
+        if len(text) <= width:
+            frame.write(text, msg.row, msg.col)
+        else:
+            # Ventana circular sobre el texto con un espacio de separacion
+            text += " "
+            start = msg.offset
+            end = start + width
+            if end <= len(text):
+                frame.write(text[start:end], msg.row, msg.col)
+            else:
+                frame.write(text[start:] + text[:end - len(text)], msg.row, msg.col)
+        frame.flush()
+
+    def tick(self):
+        """
+        Quita los mensajes vencidos, cambia de mensaje o desplaza el texto si toca.
+
+        Returns:
+        - Milisegundos hasta que vuelve a haber algo que hacer (None si nada)
+        """
+        now = self.clock()
+        expired = False
+        for m in self.messages:
+            if m.expires is not None and utime.ticks_diff(now, m.expires) >= 0:
+                expired = True
+        if expired:
+            self.messages = [m for m in self.messages
+                             if m.expires is None or utime.ticks_diff(now, m.expires) < 0]
+            self.dirty = True
+
+        msg = self._pick()
+        if msg is not self.current or self.dirty:
+            if msg is not self.current and msg is not None:
+                msg.offset = 0
+                msg.next_scroll = utime.ticks_add(now, self.scroll_hold_ms)
+                if msg.duration_ms is not None and msg.expires is None:
+                    msg.expires = utime.ticks_add(now, msg.duration_ms)
+            self.current = msg
+            self.dirty = False
+            if msg is None:
+                self.frame.fill()
+                self.frame.flush()
+            else:
+                self._draw(msg)
+        elif msg is not None and len(msg.text) > self.cols - msg.col:
+            if utime.ticks_diff(now, msg.next_scroll) >= 0:
+                msg.offset = (msg.offset + 1) % (len(msg.text) + 1)
+                msg.next_scroll = utime.ticks_add(now, self.scroll_ms)
+                self._draw(msg)
+
+        if msg is None:
+            return None
+        wait = None
+        if len(msg.text) > self.cols - msg.col:
+            wait = utime.ticks_diff(msg.next_scroll, now)
+        for m in self.messages:
+            if m.expires is not None:
+                left = utime.ticks_diff(m.expires, now)
+                if wait is None or left < wait:
+                    wait = left
+        return None if wait is None else max(wait, 0)
+
+    async def run(self, poll_ms=50):
+        """
+        Tarea de uasyncio que mantiene actualizado el LCD.
+
+        Parameters:
+        - poll_ms: Espera maxima entre revisiones (para ver mensajes nuevos).
+        """
+        while True:
+            wait = self.tick()
+            if wait is None or wait > poll_ms:
+                wait = poll_ms
+            await asyncio.sleep_ms(wait)
@@ -0,0 +1,94 @@
+class LcdFrame:
+    """
+    Copia en RAM (framebuffer) de lo que muestra un LCD de caracteres.
+
+    Los cambios se escriben primero en `back`; flush() los compara contra `front`
+    (lo que ya tiene el LCD) y solo manda las celdas que cambiaron. Cada tramo de
+    celdas seguidas se manda con un solo move_to y los datos se escriben aprovechando
+    el auto-incremento del cursor del HD44780, asi que nunca hace falta lcd.clear().
+    El move_to y los datos del tramo van juntos (write_run_at), en una transferencia.
+    """
+
+    UNKNOWN = 0xFF  # Celda con contenido desconocido (fuerza a reescribirla)
+    BLANK = 0x20  # Espacio
+
+    def __init__(self, lcd):
+        """
+        Parameters:
+        - lcd: Objeto LcdApi (por ejemplo I2cLcd).
+        """
+        self.lcd = lcd
+        self.rows = lcd.num_lines
+        self.cols = lcd.num_columns
+        size = self.rows * self.cols
+        self.back = bytearray(b' ' * size)  # Lo que se quiere mostrar
+        self.front = bytearray(size)  # Lo que tiene el LCD
+        self.invalidate()
+
+    def invalidate(self):
+        """Olvida lo que tiene el LCD; el siguiente flush() lo reescribe completo"""
+        front = self.front
+        for i in range(len(front)):
+            front[i] = self.UNKNOWN
+
+    def fill(self, char=BLANK):
+        """Llena el framebuffer con un caracter (no manda nada al LCD)"""
+        back = self.back
+        for i in range(len(back)):
+            back[i] = char
+
+    def write(self, text, row=0, col=0):
+        """
+        Escribe texto en el framebuffer a partir de (col, row), recortado al final
+        de la fila (no manda nada al LCD).
+        """
+        if row >= self.rows or col >= self.cols:
+            return
+        base = row * self.cols
+        back = self.back
+        n = min(len(text), self.cols - col)
+        for i in range(n):
+            back[base + col + i] = ord(text[i]) & 0xFF
+
+    def show(self, text, row=0, col=0):
+        """Reemplaza toda la pantalla por el texto dado y la actualiza"""
+        self.fill()
+        self.write(text, row, col)
+        return self.flush()
+
+    def flush(self):
+        """
+        Manda al LCD las celdas que cambiaron.
+
+        Returns:
+        - Numero de celdas escritas
+        """
+        lcd = self.lcd
+        back = self.back
+        front = self.front
+        cols = self.cols
+        written = 0
+        for row in range(self.rows):
+            base = row * cols
+            col = 0
+            while col < cols:
+                if back[base + col] == front[base + col]:
+                    col += 1
+                    continue
+                start = col
+                end = col + 1
+                # Se extiende el tramo mientras sea mas barato que otro move_to:
+                # un hueco de una celda igual cuesta lo mismo que el comando
+                while end < cols:
+                    if back[base + end] != front[base + end]:
+                        end += 1
+                    elif end + 1 < cols and back[base + end + 1] != front[base + end + 1]:
+                        end += 2
+                    else:
+                        break
+                lcd.write_run_at(start, row, back, base + start, base + end)
+                for i in range(base + start, base + end):
+                    front[i] = back[i]
+                written += end - start
+                col = end
+        return written
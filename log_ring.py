@@ -0,0 +1,382 @@
+import ustruct
+
+# Tabla de mensajes fijos de la bitacora. En la EEPROM solo se guarda el indice.
+LOG_MESSAGES = (
+    "Evento",
+    "Tarjeta: No se pudo leer la tarjeta",
+    "Tarjeta: Se creo nueva contraseña de acceso",
+    "Tarjeta: No se pudo escribir",
+    "Tarjeta: Error de autenticacion",
+    "Tarjeta: error en stat",
+    "Sensor: Sensor infrarojo activado",
+    "Sensor: Sensor de puerta activado",
+    "Mensaje enviado",
+    "Error enviando mensaje",
+    "Clave API inválida",
+    "Error al enviar mensajes masivos",
+    "Se detecto intento de entrada sospechoso",
+    "Se ingreso contraseña administrador",
+    "Se ingreso contraseña",
+    "Se activo modo admin",
+    "Acceso concedido con codigo",
+    "Error en tarjeta",
+    "Acceso concedido a tarjeta",
+    "Tarjeta: Mas de 3 intentos, bloquear",
+    "Tarjeta: Tarjeta no autorizada",
+    "EEPROM: pagina dañada",
+)
+
+
+def message_code(mensaje):
+    """
+    Regresa el codigo de un mensaje de LOG_MESSAGES.
+    Tambien reconoce mensajes que inician con un texto de la tabla
+    (por ejemplo, "Error enviando mensaje: ..."). Si no se reconoce regresa 0.
+    """
+    try:
+        return LOG_MESSAGES.index(mensaje)
+    except ValueError:
+        pass
+    for code in range(1, len(LOG_MESSAGES)):
+        if mensaje.startswith(LOG_MESSAGES[code]):
+            return code
+    return 0
+
+
+class LogIndex:
+    """
+    Indice por tipo de log: un mapa de bits por tipo con una bandera por pagina
+    del anillo, que indica si esa pagina contiene algun registro del tipo.
+
+    Vive en RAM y se guarda en paginas reservadas cada `persist_every` paginas
+    de log. Al arrancar solo se vuelven a revisar las paginas escritas despues
+    del ultimo guardado, asi que la recuperacion esta acotada.
+    """
+
+    MAGIC = b'LIDX'
+    HEADER = '>4sI'  # magic, pagina logica hasta la que el indice esta completo
+    HEADER_SIZE = 8
+
+    def __init__(self, eeprom, start_page, slots, types=(1, 2, 3), persist_every=8):
+        self.eeprom = eeprom
+        self.start_page = start_page
+        self.slots = slots
+        self.types = types
+        self.persist_every = persist_every
+        self.map_size = (slots + 7) // 8
+        self.n_pages = self.pages_for(slots, len(types))
+        self.maps = {}
+        self.reset()
+
+    @classmethod
+    def pages_for(cls, slots, n_types=3):
+        """Paginas que ocupa el indice de un anillo con `slots` paginas"""
+        return (cls.HEADER_SIZE + n_types * ((slots + 7) // 8) + 63) // 64
+
+    def reset(self):
+        for tipo in self.types:
+            self.maps[tipo] = bytearray(self.map_size)
+
+    def mark(self, slot, tipo):
+        bitmap = self.maps.get(tipo)
+        if bitmap is not None:
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+
+    def clear(self, slot):
+        for bitmap in self.maps.values():
+            bitmap[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def has(self, slot, tipo):
+        """True si la ranura puede tener registros del tipo (siempre True para tipos sin indice)"""
+        bitmap = self.maps.get(tipo)
+        if bitmap is None:
+            return True
+        return bool(bitmap[slot >> 3] & (1 << (slot & 7)))
+
+    def load(self):
+        """Carga el indice guardado. Regresa la pagina logica hasta la que es valido, o None."""
+        view = self.eeprom.read_range(self.start_page, self.n_pages)
+        magic, covered = ustruct.unpack_from(self.HEADER, view, 0)
+        if magic != self.MAGIC:
+            return None
+        offset = self.HEADER_SIZE
+        for tipo in self.types:
+            self.maps[tipo][:] = view[offset:offset + self.map_size]
+            offset += self.map_size
+        return covered
+
+    def save(self, covered):
+        """Guarda el indice; todas las paginas logicas menores a `covered` ya estan completas."""
+        buf = bytearray(self.n_pages * 64)
+        ustruct.pack_into(self.HEADER, buf, 0, self.MAGIC, covered)
+        offset = self.HEADER_SIZE
+        for tipo in self.types:
+            buf[offset:offset + self.map_size] = self.maps[tipo]
+            offset += self.map_size
+        self.eeprom.save(buf, self.start_page)
+
+
+class LogRing:
+    """
+    Bitacora circular en la EEPROM con registros binarios compactos.
+
+    Cada registro ocupa 12 bytes (secuencia, fecha epoch, tipo, codigo de mensaje
+    y argumento) y caben RECORDS_PER_PAGE registros por pagina, cifrados juntos
+    con AES. El registro con secuencia `seq` siempre vive en la ranura
+    `(seq // RECORDS_PER_PAGE) % slots`, asi que la cabeza del anillo se recupera
+    al arrancar con una busqueda binaria y cada log nuevo cuesta una sola
+    escritura de pagina (sin tocar la pagina 0).
+    """
+
+    RECORD = '>IIBBH'  # seq, epoch, tipo, codigo, argumento
+    RECORD_SIZE = 12
+    RECORDS_PER_PAGE = 5
+    EMPTY = 0xFFFFFFFF
+
+    def __init__(self, eeprom, start_page, end_page, cipher_fn, index_page=None):
+        """
+        Parameters:
+        - eeprom: Objeto EEPROMManager.
+        - start_page: Primera pagina del anillo.
+        - end_page: Pagina siguiente a la ultima del anillo.
+        - cipher_fn: Funcion(decrypt) que regresa el objeto AES de los logs para cifrar o descifrar.
+        - index_page: Primera pagina reservada para el indice por tipo (opcional).
+        """
+        self.eeprom = eeprom
+        self.start_page = start_page
+        self.slots = end_page - start_page
+        self.capacity = self.slots * self.RECORDS_PER_PAGE
+        self.cipher_fn = cipher_fn
+        self.index = None
+        if index_page is not None:
+            self.index = LogIndex(eeprom, index_page, self.slots)
+        self.next_seq = 0
+        self.head = bytearray(b'\xff' * 64)  # Texto plano de la pagina cabeza
+        self.recovered = False
+
+    def _decrypt(self, slot, page_data):
+        """Regresa el texto plano de una pagina, o None si la ranura no tiene registros validos."""
+        raw = bytes(page_data)
+        if raw == b'0' * 64 or raw == b'\xff' * 64:
+            return None
+        plain = self.cipher_fn(True).decrypt(raw)
+        seq = ustruct.unpack_from('>I', plain, 0)[0]
+        if seq == self.EMPTY or seq % self.RECORDS_PER_PAGE != 0:
+            return None
+        if (seq // self.RECORDS_PER_PAGE) % self.slots != slot:
+            return None
+        return plain
+
+    def _records(self, plain):
+        """Lista de registros (seq, epoch, tipo, codigo, arg) consecutivos de una pagina"""
+        records = []
+        base = ustruct.unpack_from('>I', plain, 0)[0]
+        for i in range(self.RECORDS_PER_PAGE):
+            rec = ustruct.unpack_from(self.RECORD, plain, i * self.RECORD_SIZE)
+            if rec[0] != base + i:
+                break
+            records.append(rec)
+        return records
+
+    def read_slot(self, slot):
+        """Lee y descifra una ranura del anillo; regresa la lista de registros o None"""
+        plain = self._decrypt(slot, self.eeprom.read_range(self.start_page + slot, 1))
+        return self._records(plain) if plain else None
+
+    def recover(self):
+        """
+        Busca la cabeza del anillo. Las ranuras 0..cabeza empiezan con secuencias
+        consecutivas a partir de la ranura 0, por lo que basta una busqueda binaria
+        (O(log n) lecturas de pagina).
+        """
+        self.recovered = True
+        self.head = bytearray(b'\xff' * 64)
+        rpp = self.RECORDS_PER_PAGE
+        first = self.read_slot(0)
+        if not first:
+            self.next_seq = 0
+            if self.index:
+                self.index.reset()
+            return self.next_seq
+        base = first[0][0]
+        lo, hi = 0, self.slots - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            recs = self.read_slot(mid)
+            if recs and recs[0][0] == base + mid * rpp:
+                lo = mid
+            else:
+                hi = mid - 1
+        plain = self._decrypt(lo, self.eeprom.read_range(self.start_page + lo, 1))
+        records = self._records(plain)
+        self.next_seq = records[-1][0] + 1
+        if len(records) < rpp:
+            self.head = bytearray(plain)
+        if self.index:
+            self._recover_index()
+        return self.next_seq
+
+    def _recover_index(self):
+        """Carga el indice por tipo y lo completa con las paginas escritas despues de guardarlo"""
+        head_page = (self.next_seq - 1) // self.RECORDS_PER_PAGE
+        oldest = self.oldest_page()
+        covered = self.index.load()
+        if covered is None or covered > head_page or covered < oldest:
+            # Indice inexistente o de otro anillo: reconstruir desde el log mas viejo
+            self.index.reset()
+            covered = oldest
+        for page_seq in range(covered, head_page + 1):
+            slot = page_seq % self.slots
+            self.index.clear(slot)
+            for rec in self.read_slot(slot) or ():
+                self.index.mark(slot, rec[2])
+        if covered != head_page:
+            self.index.save(head_page)
+
+    def oldest_page(self):
+        """Numero de pagina logica (seq // RECORDS_PER_PAGE) del registro mas viejo"""
+        if self.next_seq == 0:
+            return 0
+        return max(0, (self.next_seq - 1) // self.RECORDS_PER_PAGE - self.slots + 1)
+
+    def count(self):
+        """Numero de registros disponibles en el anillo"""
+        return self.next_seq - self.oldest_page() * self.RECORDS_PER_PAGE
+
+    def append(self, tipo, code, arg=0, epoch=0):
+        """
+        Agrega un registro al anillo. Se reescribe la pagina cabeza completa,
+        por lo que cada log cuesta una escritura de pagina; dentro de un bloque
+        `with eeprom.cache:` varios logs de la misma pagina se escriben una sola vez.
+        """
+        rpp = self.RECORDS_PER_PAGE
+        seq = self.next_seq
+        pos = seq % rpp
+        page_seq = seq // rpp
+        slot = page_seq % self.slots
+        if pos == 0:
+            self.head = bytearray(b'\xff' * 64)
+            if self.index:
+                self.index.clear(slot)
+        ustruct.pack_into(self.RECORD, self.head, pos * self.RECORD_SIZE,
+                          seq, epoch, tipo, code, arg & 0xFFFF)
+        page = self.cipher_fn(False).encrypt(bytes(self.head))
+        self.eeprom.save(page, self.start_page + slot)
+        self.next_seq = seq + 1
+        if self.index:
+            self.index.mark(slot, tipo)
+            if pos == 0 and page_seq % self.index.persist_every == 0:
+                self.index.save(page_seq)
+        return seq
+
+    def read(self, seq):
+        """Lee el registro con la secuencia dada (None si ya fue sobrescrito)"""
+        if seq < 0 or seq >= self.next_seq or seq < self.next_seq - self.count():
+            return None
+        records = self.read_slot((seq // self.RECORDS_PER_PAGE) % self.slots)
+        pos = seq % self.RECORDS_PER_PAGE
+        if not records or len(records) <= pos or records[pos][0] != seq:
+            return None
+        return records[pos]
+
+    def scan(self, chunk=10, start=None):
+        """
+        Recorre los registros del mas nuevo al mas viejo, regresando
+        (seq, epoch, tipo, codigo, arg). Lee hasta `chunk` paginas por transaccion I2C.
+        Con `start` empieza en ese numero de secuencia (solo se leen las paginas desde la suya).
+        """
+        rpp = self.RECORDS_PER_PAGE
+        if self.next_seq == 0:
+            return
+        last_seq = self.next_seq - 1
+        if start is not None:
+            if start < 0:
+                return
+            last_seq = min(start, last_seq)
+        page_seq = last_seq // rpp
+        oldest = self.oldest_page()
+        while page_seq >= oldest:
+            last = page_seq % self.slots
+            first = max(0, last - chunk + 1, last - (page_seq - oldest))
+            view = self.eeprom.read_range(self.start_page + first, last - first + 1)
+            # Se decodifica el bloque completo antes de ceder, porque el buffer
+            # de read_range se reutiliza en la siguiente lectura
+            pages = []
+            for slot in range(last, first - 1, -1):
+                offset = (slot - first) * 64
+                plain = self._decrypt(slot, view[offset:offset + 64])
+                if plain is None:
+                    break
+                records = self._records(plain)
+                if not records or records[0][0] != (page_seq - len(pages)) * rpp:
+                    break
+                pages.append(records)
+            for records in pages:
+                for i in range(len(records) - 1, -1, -1):
+                    if records[i][0] <= last_seq:
+                        yield records[i]
+            if len(pages) < last - first + 1:
+                return
+            page_seq -= len(pages)
+
+    def seek(self, tipo=None, offset=0, cursor=None):
+        """
+        Cursor que queda despues de saltar `offset` registros (del tipo dado) a partir de
+        `cursor`, sin armar la lista de los saltados. Sin tipo no se lee ninguna pagina,
+        porque las secuencias son consecutivas.
+
+        Returns:
+        - Secuencia desde la que sigue la consulta, o None si ya no hay mas registros
+        """
+        newest = self.next_seq - 1
+        if cursor is None or cursor > newest:
+            cursor = newest
+        if tipo is None:
+            cursor -= offset
+            return cursor if cursor >= self.next_seq - self.count() and cursor >= 0 else None
+        skipped, cursor = self.query(tipo, offset, cursor)
+        return cursor
+
+    def query(self, tipo=None, limit=10, cursor=None):
+        """
+        Consulta paginada del mas nuevo al mas viejo.
+
+        Parameters:
+        - tipo: Tipo de log a filtrar (None para todos).
+        - limit: Numero maximo de registros a regresar.
+        - cursor: Secuencia desde la que se continua (None para empezar por el mas nuevo).
+
+        Returns:
+        - (registros, siguiente_cursor); siguiente_cursor es None si ya no hay mas.
+        Con indice, solo se leen las paginas que contienen el tipo buscado.
+        """
+        if tipo is None or self.index is None:
+            results = []
+            # Sin tipo se sabe cuantas paginas hacen falta; con tipo se leen de 10 en 10
+            chunk = limit // self.RECORDS_PER_PAGE + 2 if tipo is None else 10
+            for rec in self.scan(chunk, cursor):
+                if tipo is not None and rec[2] != tipo:
+                    continue
+                if len(results) == limit:
+                    return results, rec[0]
+                results.append(rec)
+            return results, None
+        rpp = self.RECORDS_PER_PAGE
+        if cursor is None:
+            cursor = self.next_seq - 1
+        results = []
+        page_seq = cursor // rpp
+        oldest = self.oldest_page()
+        while page_seq >= oldest:
+            slot = page_seq % self.slots
+            if self.index.has(slot, tipo):
+                records = self.read_slot(slot) or ()
+                for i in range(len(records) - 1, -1, -1):
+                    rec = records[i]
+                    if rec[0] > cursor or rec[2] != tipo:
+                        continue
+                    if len(results) == limit:
+                        return results, rec[0]
+                    results.append(rec)
+            page_seq -= 1
+        return results, None
@@ -1,5 +1,5 @@
 import mfrc522
-from CAT24C256 import EEPROMManager
+from rfid_reader import RFIDReader
 import keypad4x4
 from ucryptolib import aes
 import random
@@ -10,6 +10,8 @@ from DatabaseManager import DatabaseManager as db
 import rtc_config
 from lcd_api import LcdApi
 from pico_i2c_lcd import I2cLcd
+from lcd_frame import LcdFrame
+from lcd_display import Display
 from webserver import WiFiManager, WebServer
 import uasyncio as asyncio
 import sys
@@ -21,6 +23,7 @@ BLOCK_SIZE = 16
 LCD_NUM_ROWS = 2
 LCD_NUM_COLS = 16
 LCD_ADDR = 0x27
+KEY_POLL_MS = 20  # Cada cuanto se revisa la cola del teclado
 
 # Configuracion de Hardware
 BUZZER = PWM(Pin(21, mode=Pin.OUT))
@@ -31,13 +34,15 @@ IR_SENSOR = Pin(2, mode=Pin.IN, pull=Pin.PULL_DOWN)
 DOOR_OUT = Pin(22, mode=Pin.OUT)
 
 # Configuracion de la EEPROM
-eeprom= EEPROMManager(0x50, 256, 1, 19, 18)
 database = db()
 database.read_general_info()
+eeprom = database.eeprom  # Compartir la cache de paginas con la base de datos
 
 #Configuración LCD
 i2c = I2C(0, sda=Pin(16), scl=Pin(17), freq=400000)
 lcd = I2cLcd(i2c, LCD_ADDR, LCD_NUM_ROWS, LCD_NUM_COLS)
+lcd_frame = LcdFrame(lcd)  # Copia de la pantalla para mandar solo los cambios
+display = Display(lcd_frame)  # Cola de mensajes y desplazamiento del LCD
    
 # Clase para inicializar la configuración
 class setup_wizard:
@@ -64,7 +69,7 @@ class setup_wizard:
             }]
         self.wifi_manager = WiFiManager(ssid="TT_2024-B037", password="12345678")
         prim_config = 1 if database.flags[0] == 49 else 0
-        self.web_server = WebServer(self.wifi_manager, self.routes, prim_config)
+        self.web_server = WebServer(self.wifi_manager, self.routes, prim_config, database)
     
     def no_config(self) -> None:
         """Genera una nueva contraseña aleatoria."""
@@ -79,13 +84,18 @@ class setup_wizard:
 async def admin_mode(wizard):
     """Modo administración que inicia el servidor web."""
     wizard.no_config()
-    await wizard.start()
+    display_task = asyncio.create_task(display.run())  # El LCD sigue vivo durante el modo admin
+    try:
+        await wizard.start()
+    finally:
+        display_task.cancel()
 
 # Clase para manejar tarjetas RFID
 class RFIDCard:
     def __init__(self) -> None:
         self.uid = 0 # Identificador único de la tarjeta
         self.flag = False  # Indica si la tarjeta es válida
+        self.data = None  # Contenido del ultimo bloque leido (llave rotativa)
     
     def ReadData(self, block=8):
         """
@@ -94,22 +104,18 @@ class RFIDCard:
         :param block: Bloque de datos a leer (default: 8).
         :return: True si se leyó con éxito, False en caso contrario.
         """
-        rdr = mfrc522.MFRC522(sck=6, miso=4, mosi=7, cs=5, rst=8)
-        (stat, tag_type) = rdr.request(rdr.REQIDL)
-        if stat == rdr.OK:
-            (stat, raw_uid) = rdr.anticoll()
+        rdr = RFIDReader.shared()
+        (stat, raw_uid) = rdr.poll()
+        if raw_uid is not None:
+            self.uid = "%02x%02x%02x%02x" % (raw_uid[0], raw_uid[1], raw_uid[2], raw_uid[3])
             if stat == rdr.OK:
-                self.uid = "%02x%02x%02x%02x" % (raw_uid[0], raw_uid[1], raw_uid[2], raw_uid[3])
-                if rdr.select_tag(raw_uid) == rdr.OK:
-                    key = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]  # Clave de autenticación
-                    if rdr.auth(rdr.AUTHENT1A, block, key, raw_uid) == rdr.OK:
-                        data = rdr.read(block)
-                        self.flag = True
-                        return self.flag
-                    else:
-                        print("AUTH ERR")
-                else:
-                    print("Failed to select tag")
+                (stat, data) = rdr.transact(block)
+                if stat == rdr.OK:
+                    self.data = data
+                    self.flag = True
+                    return self.flag
+            else:
+                print("Failed to select tag")
         
         database.save_log("Tarjeta: No se pudo leer la tarjeta",3)
         
@@ -122,32 +128,21 @@ class RFIDCard:
         :param block: Bloque donde se escribirán los datos (default: 8).
         :return: True si se escribió con éxito, False en caso contrario.
         """
-        rdr = mfrc522.MFRC522(sck=6, miso=4, mosi=7, cs=5, rst=8)
-        (stat, tag_type) = rdr.request(rdr.REQIDL)
+        # La tarjeta sigue seleccionada desde ReadData; si no, se vuelve a buscar
+        rdr = RFIDReader.shared()
+        (stat, data) = rdr.transact(block, databytes)
         if stat == rdr.OK:
-            (stat, raw_uid) = rdr.anticoll()
-            if stat == rdr.OK:
-                if rdr.select_tag(raw_uid) == rdr.OK:
-                    key = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF] # Clave de autenticación
-                    if rdr.auth(rdr.AUTHENT1A, block, key, raw_uid) == rdr.OK:
-                        stat = rdr.write(block, databytes)
-                        rdr.stop_crypto1()
-                        if stat == rdr.OK:
-                            self.flag = False
-                            database.save_log("Tarjeta: Se creo nueva contraseña de acceso",2)
-                            return self.flag
-                        else:
-                            database.save_log("Tarjeta: No se pudo escribir",3)
-                            print("FAILED")
-                    else:
-                        print("AUTH ERR")
-                        database.save_log("Tarjeta: Error de autenticacion",3)
-                else:
-                    print("Failed to select tag")
-                    database.save_log("Tarjeta: No se pudo leer la tarjeta",3)
-        else:
+            self.flag = False
+            database.save_log("Tarjeta: Se creo nueva contraseña de acceso",2)
+            return self.flag
+        elif stat == rdr.NOTAGERR:
             print("stat Failure")
             database.save_log("Tarjeta: error en stat",3)
+        elif stat == rdr.AUTHERR:
+            database.save_log("Tarjeta: Error de autenticacion",3)
+        else:
+            print("FAILED")
+            database.save_log("Tarjeta: No se pudo escribir",3)
         
         return self.flag
     
@@ -241,7 +236,7 @@ def url_encode(input_string):
     
     return encoded_string
 
-def send_message(phone_number, api_key, message, debug=0):
+def send_message(phone_number, api_key, message, debug=0, logs=None):
     """
     Envia un mensaje por WhatsApp.
 
@@ -249,15 +244,17 @@ def send_message(phone_number, api_key, message, debug=0):
     :param api_key: Clave de la API para ese número.
     :param message: Mensaje que se enviará.
     :param debug: Saber si se requiere el modo depurado.
+    :param logs: Lista donde se agregan los logs (mensaje, tipo, arg) en lugar de guardarlos.
     :return: Valor booleano.
     """
+    log = database.save_log if logs is None else lambda *entry: logs.append(entry)
     url = f'https://api.callmebot.com/whatsapp.php?phone=+521{phone_number}&text={message}&apikey={api_key}'
     try:
         response = requests.get(url)
         if response.status_code == 200:
             if debug == 1:
                 print(f"Mensaje enviado a {phone_number}: {message}")
-            database.save_log(f"Mensaje enviado", 2)
+            log("Mensaje enviado", 2)
             return True
         else:
             if debug == 1:
@@ -267,7 +264,7 @@ def send_message(phone_number, api_key, message, debug=0):
         error = f"Error enviando mensaje: {str(e)}"
         if debug == 1:
             print(error)
-        database.save_log(error, 3)
+        log("Error enviando mensaje", 3, getattr(e, 'errno', 0) or 0)
         return False
         
 def send_bulk_messages(message, admin_only=False, debug=0):
@@ -278,6 +275,7 @@ def send_bulk_messages(message, admin_only=False, debug=0):
     :param admin_only: Indica si solo se debe enviar a números de administradores.
     :param debug: Saber si se requiere el modo depurado.
     """
+    logs = []  # Se guardan al final, sin dejar paginas pendientes en la cache durante los envios
     try:
         # Recuperar teléfonos y API keys
         print("*****Empezando mensajeria masiva*****")
@@ -291,58 +289,39 @@ def send_bulk_messages(message, admin_only=False, debug=0):
         if len(phone_numbers) != len(api_keys):
             raise ValueError("El número de teléfonos no coincide con el de claves API.")
         
-        for phone, api in zip(phone_numbers, api_keys):
+        for index, (phone, api) in enumerate(zip(phone_numbers, api_keys)):
             if len(api) == 7:  # Verificar que la clave API tenga la longitud correcta
-                send_message(phone, api, message, 1)
+                send_message(phone, api, message, 1, logs)
             else:
                 error = f"Clave API inválida para {phone}: {api}"
                 if debug:
                     print(error)
-                database.save_log(error, 3)
+                logs.append(("Clave API inválida", 3, index))
 
     except Exception as e:
         error = f"Error al enviar mensajes masivos: {str(e)}"
         print(error)
         if debug:
             print(error)
-        database.save_log(error, 3)
+        logs.append((error, 3, 0))
+    finally:
+        # Los logs de todos los envios se agrupan en la misma pagina de la bitacora
+        with database.eeprom.cache:
+            for mensaje, tipo, arg in logs:
+                database.save_log(mensaje, tipo, arg)
    
-def lcd_str(text, row=0, col=0, delay=0.3):
+def lcd_str(text, row=0, col=0, priority=0, duration_ms=None):
     """
-    Muestra texto en el LCD, desplazándolo si excede el límite de caracteres por fila.
+    Muestra texto en el LCD sin bloquear; si excede la fila, la tarea de la pantalla
+    lo va desplazando (ver Display.show).
     text: String que se desea mostrar.
     row: Fila donde se inicia la impresión del texto.
     col: Columna inicial para comenzar la impresión.
-    delay: Tiempo de retraso entre cada desplazamiento si el texto es largo.
+    priority: Los mensajes de mayor prioridad tapan a los de menor.
+    duration_ms: Tiempo que se muestra antes de regresar al mensaje anterior (None = fijo).
     """
-    lcd.clear()  # Limpia la pantalla antes de mostrar el nuevo texto
-    text += " "
-
-    # Calcula el límite de caracteres por fila
-    max_chars = LCD_NUM_COLS - col
-
-    # Si el texto cabe en la pantalla, simplemente mostrarlo
-    if len(text) <= max_chars + 1:
-        lcd.move_to(col, row)
-        lcd.putstr(text)
-    else:
-        # Si el texto excede el límite, mostrarlo en partes
-        start = 0
-        end = max_chars
-        while True:
-            # Calcula la ventana del texto para mostrar en pantalla
-            end = start + max_chars
-            lcd.move_to(col, row)
-            if end <= len(text):
-                lcd.putstr(text[start:end])
-            else:
-                # Si el final excede el largo del texto, envuelve al inicio
-                lcd.putstr(text[start:] + text[:end - len(text)])
-
-            time.sleep(1)  # Espera antes de desplazar
-
-            # Avanza en el texto y envuelve si llega al final
-            start = (start + 1) % len(text)
+    display.show(text, row, col, priority, duration_ms)
+    display.tick()
 
 def random_shuffle(cadena, semilla=None):
     """
@@ -406,6 +385,7 @@ def main_loop(intentos):
     stage_2 = False
     while True:
         #inicio = time.ticks_ms()        
+        display.tick()  # Mensajes temporales y desplazamiento del LCD
             
         # Manejo de intentos
         if intentos >= 3:
@@ -427,6 +407,7 @@ def main_loop(intentos):
     
             psk_code = ""
             intentos += 1
+            keypad.flush()  # Descarta teclas que se presionaron antes del mensaje
             # Ciclo para hacer display de la contraseña
             while True:
                 key = keypad.Keypad4x4Read()
@@ -440,15 +421,20 @@ def main_loop(intentos):
                     else:
                         psk_code += key  # Agrega la tecla a la cadena
                     
-                    display = "*" * len(psk_code)
-                    lcd_str(display, 0,0)
-                utime.sleep(0.3)  # Espera un tiempo para evitar múltiples lecturas
+                    stars = "*" * len(psk_code)
+                    lcd_str(stars, 0,0)
+                elif not psk_code and database.scrubber is not None:
+                    # Revisión de la EEPROM solo mientras nadie está tecleando
+                    database.scrubber.tick()
+                display.tick()
+                utime.sleep_ms(KEY_POLL_MS)  # El antirrebote lo hace el teclado
             
             pwd = pad_data(psk_code, 16)
             print(f"Texto pad: {pwd} type: {type(pwd)}")
             
-            #TODO Modificar a leer de la eeprom
-            if database.is_admin(pwd):
+            # Una sola consulta al indice de credenciales resuelve admin y usuario
+            is_admin, usr_slot = database.resolve_credential(pwd)
+            if is_admin:
                 sensores.defuse_ir()
                 sensores.defuse_door()
                 intentos = 0
@@ -460,11 +446,12 @@ def main_loop(intentos):
                     lcd_str("Modo admin", 0,0)
                     asyncio.run(admin_mode(wizard))
                     admin_flag = False
+                    database.end_admin_session()
                     del pwd
                     break
                 database.save_log("Se ingreso contraseña administrador",1)
                 
-            if database.is_user(pwd):
+            if usr_slot is not None:
                 intentos = 0
                 database.save_log("Se ingreso contraseña",1)
                 if admin_flag:
@@ -480,6 +467,7 @@ def main_loop(intentos):
                                 database.save_log("Se activo modo admin",1)
                                 asyncio.run(admin_mode(wizard))
                                 admin_flag = False
+                                database.end_admin_session()
                                 del pwd
                                 break
                             
@@ -500,11 +488,11 @@ def main_loop(intentos):
                                 del pwd
                                 break
                             else:
-                                lcd_str("Incorrecto", 0,0)
-                                utime.sleep(2)
+                                lcd_str("Incorrecto", 0,0, priority=1, duration_ms=2000)
                             
                     
-                        utime.sleep(0.3)  # Espera un tiempo para evitar múltiples lecturas
+                        display.tick()
+                        utime.sleep_ms(KEY_POLL_MS)  # El antirrebote lo hace el teclado
                 else:
                     stage_1 = False
                     stage_2 = True
@@ -520,9 +508,12 @@ def main_loop(intentos):
             lcd_str("Acerca Tarjeta", 0,0)
             
             if CardObject.ReadData(12):
-                #TODO Cambiar a leer de la eeprom
-                print(f"Tarjeta actual: {pad_data(CardObject.uid, 16)} Tarjeta de usuario: {database.usr_card}")
-                if (pad_data(CardObject.uid, 16) == database.usr_card):
+                # La tarjeta se resuelve a su slot con el mapa de UIDs; debe ser del
+                # mismo usuario que ingreso la contraseña y traer la llave rotativa vigente
+                card_slot = database.card_slot(pad_data(CardObject.uid, 16))
+                print(f"Tarjeta actual: {CardObject.uid} slot: {card_slot} slot de usuario: {database.usr_id_num}")
+                if (card_slot is not None and card_slot == database.usr_id_num
+                        and database.card_key_matches(card_slot, CardObject.data)):
                     print("Tarjeta Autorizada")
                     if CardObject.flag:
                         print(f"Tarjeta flag: {CardObject.flag}")
@@ -534,9 +525,7 @@ def main_loop(intentos):
                             database.save_log(mensaje,3)
                         else:
                             lcd_str("Autorizado", 0,0)
-                            page = database.usr_start_page + database.usr_id_num
-                            #TODO Agregar update a medias
-                            eeprom.partial_data(page, 48, new_key[:16])
+                            database.save_card_key(card_slot, new_key[:16])
                             mensaje = "Acceso concedido a tarjeta"
                             database.save_log(mensaje,1)
                             #TODO Agregar mensaje whats
@@ -568,6 +557,7 @@ if __name__=="__main__":
     CardObject = RFIDCard()
     sensores = Door_sensors()
     keypad = keypad4x4.Keypad4x4()
+    keypad.start()
     wizard = setup_wizard()
     
     DOOR_SENSOR.irq(trigger=Pin.IRQ_RISING,handler=sensores.irq_door)
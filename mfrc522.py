@@ -1,6 +1,37 @@
 from machine import Pin, SPI
 from os import uname
 
+# CRC_A de ISO 14443-3 (x^16 + x^12 + x^5 + 1 reflejado, valor inicial 0x6363), por tabla
+CRC_A_TABLE = []
+
+
+def _init_crc_a_table():
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+        CRC_A_TABLE.append(crc)
+
+
+_init_crc_a_table()
+
+# Vectores conocidos (tramas de ISO 14443-3 / MIFARE con su CRC)
+CRC_A_VECTORS = (
+    ((0x00, 0x00), (0xA0, 0x1E)),
+    ((0x12, 0x34), (0x26, 0xCF)),
+    ((0x30, 0x04), (0x26, 0xEE)),  # READ del bloque 4
+    ((0x50, 0x00), (0x57, 0xCD)),  # HLTA
+)
+
+
+def crc_a(data):
+    """CRC_A de la trama; regresa [byte bajo, byte alto] como el coprocesador del MFRC522"""
+    table = CRC_A_TABLE
+    crc = 0x6363
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return [crc & 0xFF, crc >> 8]
+
 
 class MFRC522:
     OK = 0
@@ -12,7 +43,12 @@ class MFRC522:
     AUTHENT1A = 0x60
     AUTHENT1B = 0x61
 
-    def __init__(self, sck, mosi, miso, rst, cs):
+    def __init__(self, sck, mosi, miso, rst, cs, soft_crc=True):
+        """
+        soft_crc: Calcular el CRC_A de las tramas en software (tabla) en lugar de usar
+        el coprocesador del chip. El coprocesador se usa para verificarlo en init() y
+        como respaldo si la verificacion falla.
+        """
 
         self.sck = Pin(sck, Pin.OUT)
         self.mosi = Pin(mosi, Pin.OUT)
@@ -22,6 +58,11 @@ class MFRC522:
 
         self.rst.value(0)
         self.cs.value(1)
+        self.spi_transactions = 0  # Tramas SPI (cada una con su CS)
+        self.soft_crc = soft_crc
+        # Buffers reutilizables: direccion + hasta 64 bytes del FIFO
+        self._tx = bytearray(66)
+        self._rx = bytearray(66)
 
         board = uname()[0]
 
@@ -45,19 +86,57 @@ class MFRC522:
 
     def _wreg(self, reg, val):
 
+        tx = self._tx
+        tx[0] = (reg << 1) & 0x7e
+        tx[1] = val & 0xff
+        self.spi_transactions += 1
         self.cs.value(0)
-        self.spi.write(b'%c' % int(0xff & ((reg << 1) & 0x7e)))
-        self.spi.write(b'%c' % int(0xff & val))
+        self.spi.write(memoryview(tx)[:2])
         self.cs.value(1)
 
     def _rreg(self, reg):
 
+        tx = self._tx
+        tx[0] = ((reg << 1) & 0x7e) | 0x80
+        tx[1] = 0
+        self.spi_transactions += 1
         self.cs.value(0)
-        self.spi.write(b'%c' % int(0xff & (((reg << 1) & 0x7e) | 0x80)))
-        val = self.spi.read(1)
+        self.spi.write_readinto(memoryview(tx)[:2], memoryview(self._rx)[:2])
         self.cs.value(1)
 
-        return val[0]
+        return self._rx[1]
+
+    def _fifo_write(self, data):
+        """Escribe todos los bytes en el FIFO (registro 0x09) en una sola trama"""
+        n = len(data)
+        tx = self._tx
+        tx[0] = (0x09 << 1) & 0x7e
+        # Copia directa: `data` casi siempre es una lista, y bytes(data) crearia un objeto por trama
+        for i in range(n):
+            tx[i + 1] = data[i]
+        self.spi_transactions += 1
+        self.cs.value(0)
+        self.spi.write(memoryview(tx)[:n + 1])
+        self.cs.value(1)
+
+    def _burst_read(self, regs, n):
+        """
+        Lee n registros en una sola trama: cada byte enviado es la direccion del siguiente
+        y el ultimo es 0. `regs` es un registro (se repite, para el FIFO) o una lista.
+
+        Returns:
+        - memoryview sobre el buffer de recepcion (valido hasta la siguiente lectura)
+        """
+        tx = self._tx
+        for i in range(n):
+            reg = regs if isinstance(regs, int) else regs[i]
+            tx[i] = ((reg << 1) & 0x7e) | 0x80
+        tx[n] = 0
+        self.spi_transactions += 1
+        self.cs.value(0)
+        self.spi.write_readinto(memoryview(tx)[:n + 1], memoryview(self._rx)[:n + 1])
+        self.cs.value(1)
+        return memoryview(self._rx)[1:n + 1]
 
     def _sflags(self, reg, mask):
         self._wreg(reg, self._rreg(reg) | mask)
@@ -79,22 +158,22 @@ class MFRC522:
             wait_irq = 0x30
 
         self._wreg(0x02, irq_en | 0x80)
-        self._cflags(0x04, 0x80)
-        self._sflags(0x0A, 0x80)
+        self._wreg(0x04, 0x7F)  # Limpia todas las interrupciones
+        self._wreg(0x0A, 0x80)  # Vacia el FIFO
         self._wreg(0x01, 0x00)
 
-        for c in send:
-            self._wreg(0x09, c)
+        self._fifo_write(send)
         self._wreg(0x01, cmd)
 
         if cmd == 0x0C:
             self._sflags(0x0D, 0x80)
 
+        # Espera la respuesta o el timer (TimerIRq, ~25 ms con la configuracion de init())
         i = 2000
         while True:
             n = self._rreg(0x04)
             i -= 1
-            if ~((i != 0) and ~(n & 0x01) and ~(n & wait_irq)):
+            if i == 0 or n & 0x01 or n & wait_irq:
                 break
 
         self._cflags(0x0D, 0x80)
@@ -105,9 +184,12 @@ class MFRC522:
 
                 if n & irq_en & 0x01:
                     stat = self.NOTAGERR
+                elif not n & wait_irq:
+                    stat = self.ERR
                 elif cmd == 0x0C:
-                    n = self._rreg(0x0A)
-                    lbits = self._rreg(0x0C) & 0x07
+                    level, control = self._burst_read((0x0A, 0x0C), 2)
+                    n = level
+                    lbits = control & 0x07
                     if lbits != 0:
                         bits = (n - 1) * 8 + lbits
                     else:
@@ -118,8 +200,7 @@ class MFRC522:
                     elif n > 16:
                         n = 16
 
-                    for _ in range(n):
-                        recv.append(self._rreg(0x09))
+                    recv = list(self._burst_read(0x09, n))
             else:
                 stat = self.ERR
 
@@ -127,11 +208,18 @@ class MFRC522:
 
     def _crc(self, data):
 
-        self._cflags(0x05, 0x04)
-        self._sflags(0x0A, 0x80)
+        if self.soft_crc:
+            return crc_a(data)
+        return self._crc_chip(data)
+
+    def _crc_chip(self, data):
+        """CRC_A calculado por el coprocesador del MFRC522"""
+
+        self._wreg(0x01, 0x00)
+        self._wreg(0x05, 0x04)  # Limpia CRCIRq
+        self._wreg(0x0A, 0x80)  # Vacia el FIFO
 
-        for c in data:
-            self._wreg(0x09, c)
+        self._fifo_write(data)
 
         self._wreg(0x01, 0x03)
 
@@ -142,7 +230,7 @@ class MFRC522:
             if not ((i != 0) and not (n & 0x04)):
                 break
 
-        return [self._rreg(0x22), self._rreg(0x21)]
+        return list(self._burst_read((0x22, 0x21), 2))
 
     def init(self):
 
@@ -154,6 +242,17 @@ class MFRC522:
         self._wreg(0x15, 0x40)
         self._wreg(0x11, 0x3D)
         self.antenna_on()
+        if self.soft_crc and not self.crc_self_test():
+            print("MFRC522: el CRC en software no coincide con el chip, se usa el coprocesador")
+            self.soft_crc = False
+
+    def crc_self_test(self):
+        """Compara el CRC_A en software con los vectores conocidos y con el coprocesador"""
+        for data, expected in CRC_A_VECTORS:
+            if crc_a(data) != list(expected):
+                return False
+        data = CRC_A_VECTORS[-1][0]
+        return self._crc_chip(data) == crc_a(data)
 
     def reset(self):
         self._wreg(0x01, 0x0F)
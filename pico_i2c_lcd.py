@@ -15,11 +15,26 @@ SHIFT_DATA      = 4  # P4-P7
 class I2cLcd(LcdApi):
     
     #Implements a HD44780 character LCD connected via PCF8574 on I2C
+    #
+    # Every byte sent to the LCD becomes four PCF8574 port writes (high nibble
+    # with E set, high nibble, low nibble with E set, low nibble). They are
+    # encoded into one preallocated buffer and sent with a single writeto, so
+    # drawing does not allocate. A cursor move and the data run after it, or a
+    # sequence of commands, share one transfer. Garbage is only collected if
+    # the caller asks for it (collect()).
 
     def __init__(self, i2c, i2c_addr, num_lines, num_columns):
         self.i2c = i2c
         self.i2c_addr = i2c_addr
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
+        # Room for a full line plus the command that moves the cursor to it
+        size = max(num_columns, 1) + 1
+        self.buf = bytearray(4 * size)
+        view = memoryview(self.buf)
+        # One view per length, so sending n bytes does not create a new slice
+        self.views = [view[:4 * n] for n in range(size + 1)]
+        self.init_view = view[:2]  # Initialization nibbles (E high, E low)
+        self.port = bytearray(1)
+        self.i2c.writeto(self.i2c_addr, self.port)
         utime.sleep_ms(20)   # Allow LCD time to powerup
         # Send reset 3 times
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
@@ -38,49 +53,92 @@ class I2cLcd(LcdApi):
         self.hal_write_command(cmd)
         gc.collect()
 
+    def collect(self):
+        # Runs the garbage collector (only when explicitly requested).
+        gc.collect()
+
+    def _encode(self, pos, flags, data):
+        # Encodes one byte as the four port writes that latch both nibbles.
+        buf = self.buf
+        byte = flags | (((data >> 4) & 0x0f) << SHIFT_DATA)
+        buf[pos] = byte | MASK_E
+        buf[pos + 1] = byte
+        byte = flags | ((data & 0x0f) << SHIFT_DATA)
+        buf[pos + 2] = byte | MASK_E
+        buf[pos + 3] = byte
+
     def hal_write_init_nibble(self, nibble):
         # Writes an initialization nibble to the LCD.
         # This particular function is only used during initialization.
         byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        self.buf[0] = byte | MASK_E
+        self.buf[1] = byte
+        self.i2c.writeto(self.i2c_addr, self.init_view)
         
     def hal_backlight_on(self):
         # Allows the hal layer to turn the backlight on
-        self.i2c.writeto(self.i2c_addr, bytes([1 << SHIFT_BACKLIGHT]))
-        gc.collect()
+        self.port[0] = 1 << SHIFT_BACKLIGHT
+        self.i2c.writeto(self.i2c_addr, self.port)
         
     def hal_backlight_off(self):
         #Allows the hal layer to turn the backlight off
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
-        gc.collect()
+        self.port[0] = 0
+        self.i2c.writeto(self.i2c_addr, self.port)
         
     def hal_write_command(self, cmd):
         # Write a command to the LCD. Data is latched on the falling edge of E.
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
-                (((cmd >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
-                ((cmd & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        self._encode(0, self.backlight << SHIFT_BACKLIGHT, cmd)
+        self.i2c.writeto(self.i2c_addr, self.views[1])
         if cmd <= 3:
             # The home and clear commands require a worst case delay of 4.1 msec
             utime.sleep_ms(5)
-        gc.collect()
 
     def hal_write_data(self, data):
         # Write data to the LCD. Data is latched on the falling edge of E.
-        byte = (MASK_RS |
-                (self.backlight << SHIFT_BACKLIGHT) |
-                (((data >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = (MASK_RS |
-                (self.backlight << SHIFT_BACKLIGHT) |
-                ((data & 0x0f) << SHIFT_DATA))      
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        self._encode(0, MASK_RS | (self.backlight << SHIFT_BACKLIGHT), data)
+        self.i2c.writeto(self.i2c_addr, self.views[1])
+
+    def hal_write_data_run(self, buf, start, end):
+        # Write several data bytes in one I2C transfer (split if longer than
+        # the preallocated buffer).
+        flags = MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+        chunk = len(self.views) - 1
+        while start < end:
+            n = min(end - start, chunk)
+            for i in range(n):
+                self._encode(4 * i, flags, buf[start + i])
+            self.i2c.writeto(self.i2c_addr, self.views[n])
+            start += n
+
+    def hal_write_commands(self, cmds):
+        # Write several commands in one I2C transfer. Home and clear still get
+        # their own delay, so the batch is sent before waiting for them.
+        flags = self.backlight << SHIFT_BACKLIGHT
+        chunk = len(self.views) - 1
+        n = 0
+        for cmd in cmds:
+            self._encode(4 * n, flags, cmd)
+            n += 1
+            if n == chunk or cmd <= 3:
+                self.i2c.writeto(self.i2c_addr, self.views[n])
+                n = 0
+                if cmd <= 3:
+                    utime.sleep_ms(5)
+        if n:
+            self.i2c.writeto(self.i2c_addr, self.views[n])
+
+    def hal_write_command_run(self, cmd, buf, start, end):
+        # Write a command (usually a cursor move) and the data bytes that
+        # follow it in one I2C transfer.
+        if cmd <= 3:
+            self.hal_write_command(cmd)
+            self.hal_write_data_run(buf, start, end)
+            return
+        self._encode(0, self.backlight << SHIFT_BACKLIGHT, cmd)
+        flags = MASK_RS | (self.backlight << SHIFT_BACKLIGHT)
+        n = min(end - start, len(self.views) - 2)
+        for i in range(n):
+            self._encode(4 * (i + 1), flags, buf[start + i])
+        self.i2c.writeto(self.i2c_addr, self.views[n + 1])
+        if start + n < end:
+            self.hal_write_data_run(buf, start + n, end)
@@ -1,81 +1,308 @@
-import random
+try:
+    import numpy as np  # Solo en la computadora (verificacion por lotes)
+except ImportError:
+    np = None
+
+# Tablas de GF(256) con el polinomio primitivo x^8 + x^4 + x^3 + x^2 + 1 (0x11d).
+# GF_EXP esta duplicada para no tener que reducir el exponente en las multiplicaciones.
+GF_EXP = bytearray(512)
+GF_LOG = bytearray(256)
+
+
+def _init_tables(prim=0x11d):
+    x = 1
+    for i in range(255):
+        GF_EXP[i] = x
+        GF_LOG[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= prim
+    for i in range(255, 512):
+        GF_EXP[i] = GF_EXP[i - 255]
+
+
+_init_tables()
+
+
+class ReedSolomonError(Exception):
+    pass
+
+
+def gf_mul(x, y):
+    if x == 0 or y == 0:
+        return 0
+    return GF_EXP[GF_LOG[x] + GF_LOG[y]]
+
+
+def gf_div(x, y):
+    if y == 0:
+        raise ZeroDivisionError()
+    if x == 0:
+        return 0
+    return GF_EXP[(GF_LOG[x] + 255 - GF_LOG[y]) % 255]
+
+
+def gf_pow(x, power):
+    return GF_EXP[(GF_LOG[x] * power) % 255]
+
+
+def gf_inverse(x):
+    return GF_EXP[255 - GF_LOG[x]]
+
+
+def gf_poly_scale(p, x):
+    return [gf_mul(c, x) for c in p]
+
+
+def gf_poly_add(p, q):
+    r = [0] * max(len(p), len(q))
+    for i in range(len(p)):
+        r[i + len(r) - len(p)] = p[i]
+    for i in range(len(q)):
+        r[i + len(r) - len(q)] ^= q[i]
+    return r
+
+
+def gf_poly_mul(p, q):
+    r = [0] * (len(p) + len(q) - 1)
+    for j in range(len(q)):
+        for i in range(len(p)):
+            r[i + j] ^= gf_mul(p[i], q[j])
+    return r
+
+
+def gf_poly_eval(poly, x):
+    """Evalua el polinomio (coeficiente de mayor grado primero) con Horner"""
+    y = poly[0]
+    for i in range(1, len(poly)):
+        y = gf_mul(y, x) ^ poly[i]
+    return y
+
+
+def gf_poly_div(dividend, divisor):
+    """Division sintetica; regresa (cociente, residuo)"""
+    out = list(dividend)
+    for i in range(len(dividend) - (len(divisor) - 1)):
+        coef = out[i]
+        if coef != 0:
+            for j in range(1, len(divisor)):
+                if divisor[j] != 0:
+                    out[i + j] ^= gf_mul(divisor[j], coef)
+    separator = -(len(divisor) - 1)
+    return out[:separator], out[separator:]
+
+
+class ReedSolomon:
+    """
+    Codigo Reed-Solomon sistematico RS(n, k) sobre GF(256) con `nsym` simbolos de paridad.
+    Corrige hasta nsym // 2 bytes erroneos por palabra (n <= 255).
+    """
+
+    def __init__(self, nsym=4):
+        self.nsym = nsym
+        gen = [1]
+        for i in range(nsym):
+            gen = gf_poly_mul(gen, [1, gf_pow(2, i)])
+        self.gen = gen
+        self.gen_log = bytearray(GF_LOG[c] for c in gen)
+
+    def encode(self, msg):
+        """Regresa msg + paridad (bytearray)"""
+        n_msg = len(msg)
+        out = bytearray(n_msg + self.nsym)
+        out[:n_msg] = msg
+        gen, gen_log = self.gen, self.gen_log
+        for i in range(n_msg):
+            coef = out[i]
+            if coef != 0:
+                lc = GF_LOG[coef]
+                for j in range(1, len(gen)):
+                    out[i + j] ^= GF_EXP[lc + gen_log[j]]
+        out[:n_msg] = msg
+        return out
+
+    def syndromes(self, codeword):
+        """Sindromes S_j = C(alpha^j); todos en cero si la palabra es valida"""
+        synd = [0] * self.nsym
+        exp, log = GF_EXP, GF_LOG
+        for j in range(self.nsym):
+            # Horner con alpha^j; multiplicar por alpha^j es sumar j al logaritmo
+            s = 0
+            for c in codeword:
+                s = (exp[log[s] + j] if s else 0) ^ c
+            synd[j] = s
+        return synd
+
+    def check(self, codeword):
+        return not any(self.syndromes(codeword))
+
+    def _error_locator(self, synd):
+        # Berlekamp-Massey; synd lleva un 0 al inicio
+        err_loc = [1]
+        old_loc = [1]
+        for i in range(self.nsym):
+            k = i + 1
+            delta = synd[k]
+            for j in range(1, len(err_loc)):
+                delta ^= gf_mul(err_loc[-(j + 1)], synd[k - j])
+            old_loc = old_loc + [0]
+            if delta != 0:
+                if len(old_loc) > len(err_loc):
+                    new_loc = gf_poly_scale(old_loc, delta)
+                    old_loc = gf_poly_scale(err_loc, gf_inverse(delta))
+                    err_loc = new_loc
+                err_loc = gf_poly_add(err_loc, gf_poly_scale(old_loc, delta))
+        while err_loc and err_loc[0] == 0:
+            del err_loc[0]
+        if (len(err_loc) - 1) * 2 > self.nsym:
+            raise ReedSolomonError("Demasiados errores para corregir")
+        return err_loc
+
+    def _error_positions(self, err_loc, n):
+        # Busqueda de Chien
+        err_loc = err_loc[::-1]
+        positions = []
+        for i in range(n):
+            if gf_poly_eval(err_loc, gf_pow(2, i)) == 0:
+                positions.append(n - 1 - i)
+        if len(positions) != len(err_loc) - 1:
+            raise ReedSolomonError("No se pudieron localizar los errores")
+        return positions
+
+    def _correct(self, codeword, synd, err_pos):
+        # Algoritmo de Forney
+        n = len(codeword)
+        coef_pos = [n - 1 - p for p in err_pos]
+        e_loc = [1]
+        for p in coef_pos:
+            e_loc = gf_poly_mul(e_loc, gf_poly_add([1], [gf_pow(2, p), 0]))
+        rev_synd = synd[::-1]
+        err_eval = gf_poly_div(gf_poly_mul(rev_synd, e_loc), [1] + [0] * len(e_loc))[1][::-1]
+        X = [gf_pow(2, -(255 - p)) for p in coef_pos]
+        for i, Xi in enumerate(X):
+            Xi_inv = gf_inverse(Xi)
+            loc_prime = 1
+            for j in range(len(X)):
+                if j != i:
+                    loc_prime = gf_mul(loc_prime, 1 ^ gf_mul(Xi_inv, X[j]))
+            if loc_prime == 0:
+                raise ReedSolomonError("No se pudo calcular la magnitud del error")
+            y = gf_mul(Xi, gf_poly_eval(err_eval[::-1], Xi_inv))
+            codeword[err_pos[i]] ^= gf_div(y, loc_prime)
+
+    def decode(self, codeword):
+        """
+        Corrige la palabra y regresa solo el mensaje (bytearray).
+        Lanza ReedSolomonError si tiene mas errores de los que se pueden corregir.
+        """
+        out = bytearray(codeword)
+        synd = self.syndromes(out)
+        if any(synd):
+            synd = [0] + synd
+            err_loc = self._error_locator(synd)
+            err_pos = self._error_positions(err_loc, len(out))
+            self._correct(out, synd, err_pos)
+            if any(self.syndromes(out)):
+                raise ReedSolomonError("No se pudo corregir el mensaje")
+        return out[:len(out) - self.nsym]
+
+    def check_batch(self, codewords):
+        """
+        Verifica muchas palabras del mismo largo a la vez. Con NumPy los sindromes se
+        calculan vectorizados; sin NumPy se revisan una por una.
+
+        Returns:
+        - Lista de booleanos, True si la palabra es valida
+        """
+        if np is None:
+            return [self.check(c) for c in codewords]
+        n = len(codewords[0])
+        words = np.frombuffer(b''.join(bytes(c) for c in codewords), dtype=np.uint8).reshape(-1, n)
+        exp = np.frombuffer(bytes(GF_EXP), dtype=np.uint8)
+        log = np.frombuffer(bytes(GF_LOG), dtype=np.uint8).astype(np.int32)
+        log_words = log[words]
+        nonzero = words != 0
+        powers = n - 1 - np.arange(n)
+        ok = np.ones(words.shape[0], dtype=bool)
+        for j in range(self.nsym):
+            terms = np.where(nonzero, exp[(log_words + j * powers) % 255], 0).astype(np.uint8)
+            ok &= np.bitwise_xor.reduce(terms, axis=1) == 0
+        return ok.tolist()
+
 
 class ReedSolomonSimple:
+    """
+    Formato de los datos protegidos (telefonos, apikeys y llave maestra).
+
+    Registro nuevo: 0x01 + palabra RS de [largo] + datos (XOR 0xFF) + relleno + paridad.
+    El formato anterior guardaba los datos alterados seguidos de su "paridad"
+    (dato XOR 0xFF); sus bytes iniciales siempre son ASCII visible, asi que un primer
+    byte fuera de ese rango identifica al formato nuevo.
+    """
+
+    MARKER = 0x01
+    codec = ReedSolomon(4)
+
     def __init__(self):
         pass
 
     @staticmethod
-    def calculate_parity(data):
+    def pseudo_encrypt(mensaje, size=None):
         """
-        Genera una paridad XOR para cada byte en los datos, proporcionando corrección por posición.
+        Codifica el mensaje en el formato nuevo.
+
+        Parameters:
+        - mensaje: str o bytes.
+        - size: Tamaño del espacio donde se guardara; la palabra se rellena hasta ocuparlo.
+
+        Returns:
+        - Lista de bytes
         """
-        parity = []
-        for byte in data:
-            parity.append(byte ^ 0xFF)  # Operación XOR con 0xFF para generar paridad específica
-        return parity
+        if not isinstance(mensaje, (bytes, bytearray)):
+            mensaje = mensaje.encode('utf-8')
+        codec = ReedSolomonSimple.codec
+        k = len(mensaje) + 1
+        if size is not None:
+            k = size - 1 - codec.nsym
+            if k < len(mensaje) + 1:
+                raise ValueError("El mensaje no cabe en el espacio indicado")
+        msg = bytearray(k)
+        msg[0] = len(mensaje)
+        for i in range(len(mensaje)):
+            msg[i + 1] = mensaje[i] ^ 0xFF
+        return [ReedSolomonSimple.MARKER] + list(codec.encode(msg))
 
     @staticmethod
-    def encode(data):
+    def pseudo_decrypt(mensaje_con_error):
+        """Decodifica un registro (formato nuevo o anterior) y regresa el texto"""
+        return ''.join(chr(b) for b in ReedSolomonSimple.pseudo_decrypt_bytes(mensaje_con_error))
+
+    @staticmethod
+    def pseudo_decrypt_bytes(mensaje_con_error):
         """
-        Codifica los datos originales añadiendo paridad.
-        `data`: El mensaje original como string.
+        Decodifica un registro y regresa los bytes originales, sin pasarlos por str
+        (para secretos binarios como la llave maestra).
         """
-        if isinstance(data, bytes):
-        # Si data ya es bytes, no necesitas codificarlo.
-            data = list(data)
-        else:
-        # Si data es string, conviértelo a bytes y luego a lista.
-            data = list(data.encode('utf-8'))
-
-        # Generamos paridad y anexamos a los datos
-        parity = ReedSolomonSimple.calculate_parity(data)
-        encoded_data = data + parity
-        return encoded_data
+        data = bytes(mensaje_con_error)
+        if data and not 32 <= data[0] <= 126:
+            msg = ReedSolomonSimple.codec.decode(data[1:])
+            return bytes(b ^ 0xFF for b in msg[1:1 + msg[0]])
+        return ReedSolomonSimple.legacy_decode_bytes(data)
 
     @staticmethod
-    def detect_and_correct_errors(encoded_data):
+    def legacy_decode(data):
         """
-        Detecta y corrige un error simple en los datos codificados.
-        `encoded_data`: Lista de bytes de datos codificados con paridad añadida.
+        Decodificador del formato anterior. Los datos alterados no sirven; el mensaje
+        se obtiene de la segunda mitad (dato XOR 0xFF). Se quita el relleno '0' que queda
+        despues de la paridad, que nunca es un byte de paridad de un texto ASCII.
         """
-        length = len(encoded_data) // 2
-        data, parity = encoded_data[:length], encoded_data[length:]
-
-        # Detectamos y corregimos errores
-        error_index = -1
-        for i in range(length):
-            calculated_parity = data[i] ^ 0xFF
-            if calculated_parity != parity[i]:
-                error_index = i
-                break  # Salimos si detectamos un único error
-
-        if error_index != -1:
-            # Intentamos corregir el byte en la posición con el error
-            correct_value = parity[error_index] ^ 0xFF
-            data[error_index] = correct_value
-
-        # Convertimos de vuelta a string los datos corregidos
-        decoded_data = bytes(data).decode('utf-8')
-        return decoded_data
-    
-    def pseudo_encrypt(mensaje):
-        mensaje_con_error = ReedSolomonSimple.encode(mensaje)
-        len_mesj = len(mensaje)
-        # Introducimos varios errores en posiciones aleatorias dentro de los datos (no en la paridad)
-        for pos in range(len_mesj):
-            # Aseguramos que el error mantenga el byte dentro de un rango visible ASCII (32-126)
-            original_byte = mensaje_con_error[pos]
-            new_byte = original_byte
-            while new_byte == original_byte or not (32 <= new_byte <= 126):
-                new_byte = original_byte ^ random.randint(1, 95)  # Genera bytes dentro del rango ASCII visible
-            mensaje_con_error[pos] = new_byte  # Asigna el nuevo byte
-        return mensaje_con_error
-
-    def pseudo_decrypt(mensaje_con_error):
-        len_mesj = int(len(mensaje_con_error) / 2)
-        for j in range(len_mesj):  # Realizamos varias pasadas, una por cada error
-            mensaje_decodificado = ReedSolomonSimple.detect_and_correct_errors(mensaje_con_error)
-            mensaje_con_error = list(mensaje_decodificado.encode('utf-8')) + mensaje_con_error[len_mesj:]
-        mensaje_final = ''.join(chr(b) for b in mensaje_con_error[:len_mesj])
-        return mensaje_final
+        return ''.join(chr(b) for b in ReedSolomonSimple.legacy_decode_bytes(data))
 
+    @staticmethod
+    def legacy_decode_bytes(data):
+        """Igual que legacy_decode, pero regresa bytes"""
+        end = len(data)
+        while end > 0 and data[end - 1] == 0x30:
+            end -= 1
+        half = end // 2
+        return bytes(b ^ 0xFF for b in data[half:2 * half])
@@ -0,0 +1,109 @@
+import utime
+import mfrc522
+
+
+class RFIDReader:
+    """
+    Lector MFRC522 de larga vida, compartido por main.py y webserver.py.
+
+    El lector se inicializa una sola vez (SPI, reset, init y antena encendida). poll()
+    busca una tarjeta y la deja seleccionada; transact() autentica un bloque de esa
+    tarjeta y lo lee o escribe. Antes del siguiente poll() se apaga y enciende el campo
+    para que la tarjeta vuelva al estado IDLE, lo mismo que pasaba al crear un lector
+    nuevo en cada lectura, pero sin volver a configurar el chip.
+    """
+
+    OK = mfrc522.MFRC522.OK
+    NOTAGERR = mfrc522.MFRC522.NOTAGERR
+    ERR = mfrc522.MFRC522.ERR
+    AUTHERR = 3  # La tarjeta no acepto la clave del sector
+
+    DEFAULT_KEY = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]  # Clave de autenticación
+    FIELD_RESET_MS = 5  # Tiempo para que la tarjeta se reinicie al volver el campo
+
+    _shared = None
+
+    def __init__(self, sck=6, miso=4, mosi=7, cs=5, rst=8, rdr=None):
+        """
+        Parameters:
+        - sck, miso, mosi, cs, rst: Pines del MFRC522.
+        - rdr: Objeto MFRC522 ya creado (opcional).
+        """
+        if rdr is None:
+            rdr = mfrc522.MFRC522(sck=sck, miso=miso, mosi=mosi, cs=cs, rst=rst)
+        self.rdr = rdr
+        self.raw_uid = None  # UID de la tarjeta seleccionada
+        self.session = False  # Hay una tarjeta seleccionada desde el ultimo poll()
+        self.auth_sector = None  # Sector autenticado en la sesion actual
+
+    @classmethod
+    def shared(cls):
+        """Regresa el lector compartido, creandolo la primera vez"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @property
+    def spi_transactions(self):
+        """Transacciones SPI (tramas con CS) hechas por el lector desde que se creo"""
+        return self.rdr.spi_transactions
+
+    def poll(self, mode=mfrc522.MFRC522.REQIDL):
+        """
+        Busca una tarjeta en el campo y la selecciona.
+
+        Returns:
+        - (stat, raw_uid): stat es OK, NOTAGERR si no hay tarjeta o ERR si no se pudo seleccionar
+        """
+        rdr = self.rdr
+        if self.session:
+            self.end()
+        (stat, tag_type) = rdr.request(mode)
+        if stat != rdr.OK:
+            return rdr.NOTAGERR, None
+        (stat, raw_uid) = rdr.anticoll()
+        if stat != rdr.OK:
+            return rdr.NOTAGERR, None
+        if rdr.select_tag(raw_uid) != rdr.OK:
+            return rdr.ERR, raw_uid
+        self.raw_uid = raw_uid
+        self.session = True
+        self.auth_sector = None
+        return rdr.OK, raw_uid
+
+    def transact(self, block, data=None, key=DEFAULT_KEY):
+        """
+        Autentica el bloque en la tarjeta seleccionada y lo lee (data None) o lo escribe.
+        Si no hay tarjeta seleccionada primero hace poll(). No se vuelve a autenticar
+        si el bloque es del mismo sector que la operacion anterior.
+
+        Returns:
+        - (stat, datos leidos o None); stat es OK, NOTAGERR, ERR o AUTHERR
+        """
+        rdr = self.rdr
+        if not self.session:
+            stat, raw_uid = self.poll()
+            if stat != rdr.OK:
+                return stat, None
+        sector = block // 4
+        if sector != self.auth_sector:
+            if rdr.auth(rdr.AUTHENT1A, block, key, self.raw_uid) != rdr.OK:
+                print("AUTH ERR")
+                self.end()
+                return self.AUTHERR, None
+            self.auth_sector = sector
+        if data is None:
+            recv = rdr.read(block)
+            return (rdr.OK, recv) if recv is not None else (rdr.ERR, None)
+        return rdr.write(block, data), None
+
+    def end(self):
+        """Termina la sesion con la tarjeta: apaga el cifrado y reinicia el campo"""
+        rdr = self.rdr
+        rdr.stop_crypto1()
+        rdr.antenna_on(False)
+        rdr.antenna_on(True)
+        utime.sleep_ms(self.FIELD_RESET_MS)
+        self.session = False
+        self.auth_sector = None
+        self.raw_uid = None
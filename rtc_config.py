@@ -60,3 +60,13 @@ def obtener_fecha_hora_rtc():
     rtc = machine.RTC()
     fecha_hora = rtc.datetime()
     return formatear_fecha_hora(fecha_hora)
+
+# Obtener la fecha y hora del RTC como segundos desde la epoca (para guardar en binario)
+def obtener_epoch_rtc():
+    year, month, day, _, hour, minute, second, _ = machine.RTC().datetime()
+    return utime.mktime((year, month, day, hour, minute, second, 0, 0))
+
+# Formatear una fecha guardada como epoch igual que formatear_fecha_hora
+def formatear_epoch(epoch):
+    year, month, day, hour, minute, second = utime.localtime(epoch)[:6]
+    return f"{day:02d}-{month:02d}-{year} {hour:02d}:{minute:02d}:{second:02d}"
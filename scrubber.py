@@ -0,0 +1,296 @@
+import utime
+import uasyncio as asyncio
+
+# CRC-16/CCITT (polinomio 0x1021, valor inicial 0xFFFF), por tabla de 256 entradas
+CRC16_POLY = 0x1021
+CRC16_TABLE = []
+
+
+def _init_table():
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC16_POLY) if crc & 0x8000 else (crc << 1)
+        CRC16_TABLE.append(crc & 0xFFFF)
+
+
+_init_table()
+
+
+def crc16(data, crc=0xFFFF):
+    table = CRC16_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ b]
+    return crc
+
+
+class CrcTable:
+    """
+    Tabla con un CRC-16 por pagina de la EEPROM, guardada en su propia region.
+
+    Empieza con un magic seguido de una entrada de 2 bytes por pagina del dispositivo
+    (indexada por numero de pagina). Una entrada en 0 significa que la pagina todavia
+    no tiene CRC; los CRC calculados nunca valen 0. Si la region no tiene el magic
+    (cerradura recien migrada) todas las paginas empiezan sin CRC y el scrubber los
+    va adoptando.
+    """
+
+    MAGIC = b'CRCT'
+    HEADER_SIZE = 4
+
+    def __init__(self, eeprom, region, covered):
+        """
+        Parameters:
+        - eeprom: Objeto EEPROMManager.
+        - region: Region 'crc' de la tabla de asignacion.
+        - covered: Lista de regiones cuyas paginas se protegen (datos que casi no cambian).
+        """
+        self.eeprom = eeprom
+        self.bpp = eeprom.control.bpp
+        self.start_page = region.start
+        self.n_pages = region.pages
+        self.ranges = [(r.start, r.end) for r in covered if r.pages]
+        raw = eeprom.read_range(self.start_page, self.n_pages)
+        self.tags = bytearray(raw)
+        if bytes(self.tags[:self.HEADER_SIZE]) != self.MAGIC:
+            self.tags = bytearray(len(self.tags))
+            self.tags[:self.HEADER_SIZE] = self.MAGIC
+            self.missing_magic = True
+        else:
+            self.missing_magic = False
+
+    @staticmethod
+    def pages_for(total_pages):
+        return (CrcTable.HEADER_SIZE + 2 * total_pages + 63) // 64
+
+    def covers(self, page):
+        for start, end in self.ranges:
+            if start <= page < end:
+                return True
+        return False
+
+    def pages(self):
+        """Paginas protegidas, en orden"""
+        for start, end in self.ranges:
+            for page in range(start, end):
+                yield page
+
+    @staticmethod
+    def compute(data):
+        return crc16(data) or 1
+
+    def tag(self, page):
+        offset = self.HEADER_SIZE + 2 * page
+        return (self.tags[offset] << 8) | self.tags[offset + 1]
+
+    def set(self, page, tag):
+        """
+        Cambia la entrada en RAM.
+
+        Returns:
+        - Paginas de la region que hay que volver a escribir
+        """
+        offset = self.HEADER_SIZE + 2 * page
+        self.tags[offset] = tag >> 8
+        self.tags[offset + 1] = tag & 0xFF
+        touched = [self.start_page + offset // self.bpp]
+        if self.missing_magic:
+            touched.append(self.start_page)
+            self.missing_magic = False
+        return touched
+
+    def update(self, page, data):
+        """Recalcula el CRC de una pagina que se acaba de modificar"""
+        return self.set(page, self.compute(data))
+
+    def image(self, crc_page):
+        """Contenido completo de una pagina de la region"""
+        offset = (crc_page - self.start_page) * self.bpp
+        return self.tags[offset:offset + self.bpp]
+
+    def reload(self, crc_page):
+        """Vuelve a leer de la EEPROM una pagina de la tabla (cambios descartados)"""
+        control = self.eeprom.control
+        offset = (crc_page - self.start_page) * self.bpp
+        raw = control.read(crc_page * self.bpp, self.bpp)
+        header = raw if offset == 0 else control.read(self.start_page * self.bpp, self.HEADER_SIZE)
+        if bytes(header[:self.HEADER_SIZE]) == self.MAGIC:
+            self.tags[offset:offset + self.bpp] = raw
+        else:
+            # La tabla nunca se ha escrito: sus entradas valen 0 (sin CRC)
+            self.tags[offset:offset + self.bpp] = bytes(self.bpp)
+            self.tags[:self.HEADER_SIZE] = self.MAGIC
+            self.missing_magic = True
+
+    def reset(self):
+        """Olvida todos los CRC (por ejemplo, despues de borrar la EEPROM)"""
+        self.tags = bytearray(len(self.tags))
+        self.tags[:self.HEADER_SIZE] = self.MAGIC
+        self.missing_magic = True
+
+
+def correct_single_bit(data, syndrome):
+    """
+    Corrige un bit volteado usando la linealidad del CRC: voltear el bit p cambia el
+    CRC en un valor que solo depende de p. Con 512 bits por pagina el CRC-16 distingue
+    todos los errores de un bit.
+
+    Returns:
+    - Posicion del bit corregido, o None si el error no es de un solo bit
+    """
+    n_bits = len(data) * 8
+    diff = CRC16_POLY  # Efecto de voltear el ultimo bit
+    for p in range(n_bits - 1, -1, -1):
+        if diff == syndrome:
+            data[p >> 3] ^= 0x80 >> (p & 7)
+            return p
+        diff = ((diff << 1) ^ CRC16_POLY) & 0xFFFF if diff & 0x8000 else (diff << 1)
+    return None
+
+
+class Scrubber:
+    """
+    Revisa en segundo plano las paginas protegidas por la tabla de CRC.
+
+    Cada tick() lee a lo mas `pages_per_tick` paginas directamente de la EEPROM y no
+    hace nada si no ha pasado `interval_ms` desde el anterior, asi que el bus queda
+    libre para las consultas de acceso. Las paginas con error se corrigen si es un
+    solo bit (o si la cache tiene una copia valida); si no, se marcan en el mapa de salud.
+    """
+
+    def __init__(self, eeprom, crc, pages_per_tick=1, interval_ms=250, on_bad=None):
+        """
+        Parameters:
+        - eeprom: Objeto EEPROMManager.
+        - crc: Objeto CrcTable.
+        - pages_per_tick: Paginas que se revisan por tick.
+        - interval_ms: Tiempo minimo entre ticks.
+        - on_bad: Funcion(pagina) que se llama cuando una pagina no se puede corregir.
+        """
+        self.eeprom = eeprom
+        self.crc = crc
+        self.bpp = eeprom.control.bpp
+        self.pages_per_tick = pages_per_tick
+        self.interval_ms = interval_ms
+        self.on_bad = on_bad
+        self.health = bytearray((eeprom.control.pages + 7) // 8)  # 1 = pagina dañada
+        self.order = list(crc.pages())
+        self.cursor = 0
+        self.last_tick = None
+        self.adopted = {}  # Paginas de la tabla con CRC adoptados sin escribir
+        self.buf = bytearray(self.bpp)
+        self.passes = 0
+        self.repaired = 0
+
+    def is_bad(self, page):
+        return bool(self.health[page >> 3] & (1 << (page & 7)))
+
+    def _mark(self, page, bad):
+        if bad:
+            self.health[page >> 3] |= 1 << (page & 7)
+        else:
+            self.health[page >> 3] &= ~(1 << (page & 7)) & 0xFF
+
+    def bad_pages(self):
+        return [page for page in self.order if self.is_bad(page)]
+
+    def tick(self):
+        """
+        Revisa las siguientes paginas si ya toca.
+
+        Returns:
+        - Numero de paginas revisadas
+        """
+        now = utime.ticks_ms()
+        if self.last_tick is not None and utime.ticks_diff(now, self.last_tick) < self.interval_ms:
+            return 0
+        self.last_tick = now
+        if not self.order:
+            return 0
+        checked = 0
+        for _ in range(self.pages_per_tick):
+            self.check(self.order[self.cursor])
+            checked += 1
+            self.cursor += 1
+            if self.cursor >= len(self.order):
+                self.cursor = 0
+                self.passes += 1
+                self._save_adopted()
+        return checked
+
+    async def run(self, idle=None):
+        """
+        Tarea de uasyncio que llama tick() cada interval_ms.
+
+        Parameters:
+        - idle: Funcion opcional que regresa False mientras hay una consulta en curso.
+        """
+        while True:
+            if idle is None or idle():
+                self.tick()
+            await asyncio.sleep_ms(self.interval_ms)
+
+    def verify(self, pages):
+        """
+        Revisa de inmediato una lista de paginas (validacion al arrancar).
+
+        Returns:
+        - Paginas que quedaron dañadas
+        """
+        for page in pages:
+            self.check(page)
+        self._save_adopted()
+        return [page for page in pages if self.is_bad(page)]
+
+    def check(self, page):
+        """
+        Compara una pagina con su CRC y la repara si se puede.
+
+        Returns:
+        - True si la pagina quedo bien
+        """
+        cache = self.eeprom.cache
+        if page in cache.dirty:
+            return True  # Tiene cambios pendientes; su CRC se actualiza al escribirla
+        control = self.eeprom.control
+        control.read_into(page * self.bpp, self.buf)
+        tag = self.crc.tag(page)
+        actual = self.crc.compute(self.buf)
+        if tag == 0:
+            # Pagina sin CRC (escrita antes de tener la tabla): se adopta el actual
+            for crc_page in self.crc.set(page, actual):
+                self.adopted[crc_page] = True
+            self._mark(page, False)
+            return True
+        if actual == tag:
+            self._mark(page, False)
+            return True
+        print(f"Scrubber: CRC incorrecto en la pagina {page}")
+        fixed = None
+        copy = cache.pages.get(page)
+        if copy is not None and self.crc.compute(copy) == tag:
+            fixed = bytes(copy)
+        elif correct_single_bit(self.buf, crc16(self.buf) ^ tag) is not None:
+            fixed = bytes(self.buf)
+        if fixed is not None and self.crc.compute(fixed) == tag:
+            # El CRC no cambia, asi que se escribe directo sin pasar por la cache
+            cache.invalidate(page)
+            control.write(page * self.bpp, fixed)
+            self.repaired += 1
+            self._mark(page, False)
+            print(f"Scrubber: pagina {page} reparada")
+            return True
+        if not self.is_bad(page):
+            self._mark(page, True)
+            if self.on_bad is not None:
+                self.on_bad(page)
+        return False
+
+    def _save_adopted(self):
+        # Los CRC adoptados se escriben juntos, una escritura por pagina de la tabla
+        if not self.adopted:
+            return
+        with self.eeprom.cache:
+            for crc_page in self.adopted:
+                self.eeprom.cache.write(crc_page, 0, self.crc.image(crc_page))
+        self.adopted = {}
@@ -0,0 +1,243 @@
+import ustruct
+from log_ring import LogIndex, LogRing
+from scrubber import CrcTable
+
+# Regiones de la EEPROM, en el orden en que se describen en la pagina de cabecera.
+# La informacion general siempre esta en la pagina 0 y no se describe desde la version 2.
+# La tabla de CRC (version 3) va justo antes del journal y su tamaño depende del
+# dispositivo, asi que tampoco se describe (la cabecera solo tiene lugar para 8 regiones).
+REGIONS = ('journal', 'admin', 'users', 'phones', 'api', 'log_index', 'cred_index', 'logs')
+REGIONS_V1 = ('gral', 'admin', 'users', 'phones', 'api', 'log_index', 'cred_index', 'logs')
+
+LEGACY_PAGES = 256  # Las versiones anteriores solo usaban las primeras 256 paginas
+MAX_USERS_LIMIT = 999  # El numero de usuarios se guarda con 3 digitos
+JOURNAL_PAGES = 17  # Registro del journal + 16 paginas por transaccion (datos y sus CRC)
+
+
+class Region:
+    """
+    Zona contigua de la EEPROM con registros de tamaño fijo.
+    record_size = 0 indica una region sin registros (por ejemplo, mapas de bits).
+    """
+
+    def __init__(self, start, pages, record_size, capacity):
+        self.start = start
+        self.pages = pages
+        self.record_size = record_size
+        self.capacity = capacity
+
+    @property
+    def end(self):
+        """Pagina siguiente a la ultima de la region"""
+        return self.start + self.pages
+
+    def locate(self, slot, bpp=64):
+        """Regresa (pagina, offset) del registro `slot` (los registros no cruzan paginas)"""
+        per_page = max(1, bpp // self.record_size)
+        return self.start + slot // per_page, (slot % per_page) * self.record_size
+
+    def __repr__(self):
+        return f"Region({self.start}, {self.pages}, {self.record_size}, {self.capacity})"
+
+
+class StorageLayout:
+    """
+    Tabla de asignacion de la EEPROM: donde empieza cada region, cuantas paginas
+    ocupa, el tamaño de sus registros y cuantos caben.
+
+    Se guarda en la ultima pagina del chip, asi que las regiones crecen con el
+    tamaño del dispositivo (CAT24C256, 24LC512, ...). Si la pagina no tiene tabla
+    se usa el acomodo fijo de las versiones anteriores (ver legacy()).
+    """
+
+    MAGIC = b'LYT'
+    VERSION = 3
+    HEADER = '>3sBHBB'  # magic, version, paginas totales, numero de regiones, checksum
+    HEADER_SIZE = 8
+    REGION = '>HHBH'  # inicio, paginas, tamaño de registro, capacidad
+    REGION_SIZE = 7
+
+    def __init__(self, total_pages, regions, stored=False, version=VERSION):
+        """
+        Parameters:
+        - total_pages: Paginas del dispositivo completo.
+        - regions: Diccionario nombre -> Region con todas las de REGIONS.
+        - stored: True si la tabla esta guardada en la EEPROM.
+        - version: Version del formato de la tabla.
+        """
+        self.total_pages = total_pages
+        self.regions = regions
+        self.regions['gral'] = Region(0, 1, 64, 1)
+        if 'journal' not in regions:
+            self.regions['journal'] = Region(0, 0, 64, 0)  # Sin journal
+        if 'crc' not in regions:
+            self.regions['crc'] = Region(0, 0, 2, 0)  # Sin tabla de CRC
+        self.stored = stored
+        self.version = version
+
+    def __getattr__(self, name):
+        regions = self.__dict__.get('regions')
+        if regions and name in regions:
+            return regions[name]
+        raise AttributeError(name)
+
+    @property
+    def header_page(self):
+        return self.total_pages - 1
+
+    @property
+    def max_users(self):
+        return self.regions['users'].capacity
+
+    @property
+    def max_admins(self):
+        return self.regions['admin'].capacity
+
+    @staticmethod
+    def cred_index_pages(max_admins, max_users):
+        """
+        Paginas del indice de credenciales: magic, tags de 16 bits, hashes de UID de
+        32 bits y el mapa de bits de slots de usuario ocupados
+        """
+        return (StorageLayout.cred_slots_offset(max_admins, max_users) + (max_users + 7) // 8 + 63) // 64
+
+    @staticmethod
+    def cred_hash_offset(max_admins, max_users):
+        # Alineado a 4 bytes para que ningun hash cruce el limite de una pagina
+        return (4 + 2 * (max_admins + max_users) + 3) & ~3
+
+    @staticmethod
+    def cred_slots_offset(max_admins, max_users):
+        return StorageLayout.cred_hash_offset(max_admins, max_users) + 4 * max_users
+
+    @staticmethod
+    def _ring(start, end):
+        """Divide [start, end) entre el indice de logs y el anillo, dando al anillo lo mas posible"""
+        slots = end - start
+        while slots > 0 and slots + LogIndex.pages_for(slots) > end - start:
+            slots -= 1
+        index = Region(start, LogIndex.pages_for(slots), 0, 3)
+        logs = Region(index.end, slots, LogRing.RECORD_SIZE, slots * LogRing.RECORDS_PER_PAGE)
+        return index, logs
+
+    @staticmethod
+    def _user_regions(start, max_admins, max_users):
+        """Regiones de usuarios, telefonos e indice de credenciales, consecutivas desde start"""
+        users = Region(start, max_users, 64, max_users)
+        n_phones = max_admins + max_users
+        phones = Region(users.end, (n_phones + 2) // 3, 20, n_phones)
+        cred = Region(phones.end, StorageLayout.cred_index_pages(max_admins, max_users), 6, max_users)
+        return users, phones, cred
+
+    @staticmethod
+    def _journal(total_pages):
+        """El journal va justo antes de la pagina de cabecera"""
+        start = total_pages - 1 - JOURNAL_PAGES
+        return Region(start, JOURNAL_PAGES, 64, JOURNAL_PAGES - 1)
+
+    @staticmethod
+    def _crc(total_pages, journal):
+        """La tabla de CRC por pagina va justo antes del journal"""
+        pages = CrcTable.pages_for(total_pages)
+        return Region(journal.start - pages, pages, 2, total_pages)
+
+    @classmethod
+    def legacy(cls, total_pages):
+        """Acomodo fijo de las versiones anteriores (5 usuarios, logs hasta la pagina 255, sin journal)"""
+        return cls(total_pages, {
+            'admin': Region(1, 1, 16, 3),
+            'users': Region(2, 5, 64, 5),
+            'phones': Region(7, 3, 20, 9),
+            'api': Region(10, 1, 16, 3),
+            'log_index': Region(11, 2, 0, 3),
+            'cred_index': Region(13, 1, 6, 5),
+            'logs': Region(14, 242, LogRing.RECORD_SIZE, 242 * LogRing.RECORDS_PER_PAGE),
+        })
+
+    @classmethod
+    def build(cls, total_pages, max_users=None, max_admins=3):
+        """
+        Acomodo para un dispositivo nuevo. Por defecto una cuarta parte de las paginas
+        se reserva para usuarios; el resto (menos la cabecera) es para la bitacora.
+        """
+        if max_users is None:
+            max_users = min(total_pages // 4, MAX_USERS_LIMIT)
+        admin = Region(1, (max_admins * 16 + 63) // 64, 16, max_admins)
+        api = Region(admin.end, (max_admins * 16 + 63) // 64, 16, max_admins)
+        users, phones, cred = cls._user_regions(api.end, max_admins, max_users)
+        journal = cls._journal(total_pages)
+        crc = cls._crc(total_pages, journal)
+        index, logs = cls._ring(cred.end, crc.start)
+        if logs.pages < 8:
+            raise ValueError("No caben tantos usuarios en la EEPROM")
+        return cls(total_pages, {
+            'journal': journal, 'admin': admin, 'users': users, 'phones': phones,
+            'api': api, 'log_index': index, 'cred_index': cred, 'logs': logs, 'crc': crc,
+        })
+
+    @classmethod
+    def migrated(cls, total_pages):
+        """
+        Acomodo para una cerradura con el formato anterior: la bitacora, el indice de logs,
+        los admins y las apikeys se quedan donde estan, y los usuarios, telefonos e indice
+        de credenciales se mueven a las paginas que no se usaban (de la 256 a la tabla de CRC).
+        """
+        old = cls.legacy(total_pages)
+        journal = cls._journal(total_pages)
+        crc = cls._crc(total_pages, journal)
+        start, end = LEGACY_PAGES, crc.start
+        max_users = 0
+        while max_users < MAX_USERS_LIMIT:
+            cred = cls._user_regions(start, old.max_admins, max_users + 1)[2]
+            if cred.end > end:
+                break
+            max_users += 1
+        if max_users <= old.max_users:
+            raise ValueError("La EEPROM no tiene espacio libre para migrar")
+        regions = dict(old.regions)
+        regions['users'], regions['phones'], regions['cred_index'] = \
+            cls._user_regions(start, old.max_admins, max_users)
+        regions['journal'] = journal
+        regions['crc'] = crc
+        return cls(total_pages, regions)
+
+    def pack(self):
+        """Serializa la tabla en una pagina de 64 bytes"""
+        buf = bytearray(64)
+        offset = self.HEADER_SIZE
+        for name in REGIONS:
+            r = self.regions[name]
+            ustruct.pack_into(self.REGION, buf, offset, r.start, r.pages, r.record_size, r.capacity)
+            offset += self.REGION_SIZE
+        checksum = sum(buf[self.HEADER_SIZE:]) & 0xFF
+        ustruct.pack_into(self.HEADER, buf, 0, self.MAGIC, self.version,
+                          self.total_pages, len(REGIONS), checksum)
+        return bytes(buf)
+
+    @classmethod
+    def unpack(cls, buf, total_pages):
+        """Lee una tabla guardada; regresa None si la pagina no tiene una tabla valida"""
+        magic, version, pages, count, checksum = ustruct.unpack_from(cls.HEADER, buf, 0)
+        names = {1: REGIONS_V1, 2: REGIONS, 3: REGIONS}.get(version)
+        if magic != cls.MAGIC or names is None or count != len(names):
+            return None
+        if pages != total_pages or checksum != sum(buf[cls.HEADER_SIZE:64]) & 0xFF:
+            return None
+        regions = {}
+        offset = cls.HEADER_SIZE
+        for name in names:
+            regions[name] = Region(*ustruct.unpack_from(cls.REGION, buf, offset))
+            offset += cls.REGION_SIZE
+        if version >= 3:
+            regions['crc'] = cls._crc(total_pages, regions['journal'])
+        return cls(total_pages, regions, stored=True, version=version)
+
+    @classmethod
+    def load(cls, eeprom):
+        """Lee la tabla de la ultima pagina de la EEPROM (o None)"""
+        total_pages = eeprom.control.pages
+        return cls.unpack(eeprom.read_view(total_pages - 1), total_pages)
+
+    def save(self, eeprom):
+        eeprom.save(self.pack(), self.header_page)
+        self.stored = True
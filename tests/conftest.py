@@ -0,0 +1,68 @@
+"""
+Arnes para correr en la PC el codigo de MicroPython de la cerradura.
+
+tests/fakes va primero en sys.path para reemplazar los modulos de la Pico
+(machine, cryptolib, network, uasyncio, ...); los modulos u* que en MicroPython
+son alias de la biblioteca estandar se apuntan a la de CPython, y al modulo time
+se le agregan las funciones ticks_* y sleep_* que solo tiene MicroPython.
+"""
+import os
+import sys
+import time
+import json
+import re
+import struct
+import hashlib
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(HERE, 'fakes'))
+
+time.ticks_ms = lambda: int(time.monotonic() * 1000)
+time.ticks_us = lambda: int(time.monotonic() * 1000000)
+time.ticks_diff = lambda a, b: a - b
+time.ticks_add = lambda a, b: a + b
+time.sleep_ms = lambda ms: None
+time.sleep_us = lambda us: None
+_mktime = time.mktime
+time.mktime = lambda t: int(_mktime(tuple(t[:6]) + (0, 0, -1)))  # MicroPython usa 8 campos
+sys.modules['utime'] = time
+sys.modules['ujson'] = json
+sys.modules['ure'] = re
+sys.modules['ustruct'] = struct
+sys.modules['uhashlib'] = hashlib
+
+import fake_rc522  # noqa: E402
+from fake_i2c import FakeEEPROM  # noqa: E402
+
+fake_rc522.install()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    """EEPROM simulada; EEPROMManager la usa en lugar de machine.I2C"""
+    import CAT24C256
+    device = FakeEEPROM()
+    monkeypatch.setattr(CAT24C256, 'I2C', lambda *a, **k: device)
+    return device
+
+
+@pytest.fixture
+def database(bus):
+    """DatabaseManager recien formateado sobre la EEPROM simulada"""
+    from DatabaseManager import DatabaseManager
+    db = DatabaseManager()
+    db.read_general_info()
+    return db
+
+
+@pytest.fixture
+def chip():
+    """MFRC522 simulado con un lector compartido nuevo"""
+    from rfid_reader import RFIDReader
+    RFIDReader._shared = None
+    emulated = fake_rc522.install()
+    yield emulated
+    RFIDReader._shared = None
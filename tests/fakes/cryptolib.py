@@ -0,0 +1,39 @@
+"""
+`cryptolib` falso: no es AES real, pero revisa lo mismo que el de MicroPython
+(llave de 16 o 32 bytes, datos en bloques de 16) y es una permutacion por bloque,
+como ECB, asi que cifrar y descifrar regresan los datos originales.
+"""
+import hashlib
+
+MODE_ECB = 1
+MODE_CBC = 2
+
+created = 0  # Objetos aes creados (para los benchmarks)
+
+
+class aes:
+    def __init__(self, key, mode, iv=None):
+        global created
+        if isinstance(key, str):
+            key = key.encode()
+        if len(key) not in (16, 32):
+            raise ValueError("key")
+        created += 1
+        self.k = hashlib.sha256(bytes(key)).digest()[:16]
+
+    def _x(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        if len(data) % 16:
+            raise ValueError("blksize")
+        k = self.k
+        return bytes(b ^ k[i % 16] ^ (((i % 16) * 7) & 0xFF) for i, b in enumerate(bytes(data)))
+
+    def encrypt(self, data, out=None):
+        r = self._x(data)
+        if out is not None:
+            out[:len(r)] = r
+            return None
+        return r
+
+    decrypt = encrypt
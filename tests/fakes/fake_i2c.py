@@ -0,0 +1,132 @@
+"""Dispositivos I2C simulados: EEPROM CAT24C256 (una o varias en un bus) y PCF8574."""
+
+
+class FakeEEPROM:
+    """
+    Una CAT24C256 en el bus. Cuenta transacciones y revisa que ninguna escritura
+    cruce el limite de una pagina. Con busy_polls > 0 el chip no responde a
+    `busy_polls` sondeos de ACK despues de cada escritura (tWR variable).
+    """
+
+    def __init__(self, size=32768, fill=b'0', page=64, busy_polls=0):
+        self.mem = bytearray(fill * size)
+        self.page = page
+        self.busy_polls = busy_polls
+        self.busy = 0
+        self.reads = 0
+        self.writes = 0
+        self.polls = 0
+        self.written_pages = []
+
+    def readfrom_mem(self, addr, mem, n, addrsize=16):
+        self.reads += 1
+        return bytes(self.mem[mem:mem + n])
+
+    def readfrom_mem_into(self, addr, mem, buf, addrsize=16):
+        self.reads += 1
+        buf[:] = self.mem[mem:mem + len(buf)]
+
+    def writeto_mem(self, addr, mem, buf, addrsize=16):
+        if self.busy:
+            raise OSError(5)
+        if mem // self.page != (mem + len(buf) - 1) // self.page:
+            raise AssertionError("escritura cruza una pagina: %d+%d" % (mem, len(buf)))
+        self.writes += 1
+        self.written_pages.append(mem // self.page)
+        self.mem[mem:mem + len(buf)] = buf
+        self.busy = self.busy_polls
+
+    def writeto(self, addr, buf, stop=True):
+        self.polls += 1
+        if self.busy:
+            self.busy -= 1
+            raise OSError(5)
+        return 0
+
+    @property
+    def transactions(self):
+        return self.reads + self.writes
+
+
+class MultiBus:
+    """
+    Varias EEPROM en un bus con tiempo simulado (us). Cada chip no reconoce su
+    direccion mientras dura su ciclo de escritura; acceder a el antes es un error.
+    """
+
+    def __init__(self, addrs, size=32768, t_wr_us=3000):
+        self.mem = {a: bytearray(b'0' * size) for a in addrs}
+        self.busy_until = {a: 0 for a in addrs}
+        self.t_wr_us = t_wr_us
+        self.now = 0
+        self.log = []
+        self.reads = 0
+        self.writes = 0
+
+    def _check(self, a):
+        assert self.now >= self.busy_until[a], ("acceso mientras escribe", hex(a))
+
+    def readfrom_mem(self, a, mem, n, addrsize=16):
+        self._check(a)
+        self.reads += 1
+        self.now += 100
+        return bytes(self.mem[a][mem:mem + n])
+
+    def readfrom_mem_into(self, a, mem, buf, addrsize=16):
+        self._check(a)
+        self.reads += 1
+        self.now += 100
+        buf[:] = self.mem[a][mem:mem + len(buf)]
+
+    def writeto_mem(self, a, mem, buf, addrsize=16):
+        self._check(a)
+        self.writes += 1
+        self.now += 100
+        assert mem // 64 == (mem + len(buf) - 1) // 64
+        self.mem[a][mem:mem + len(buf)] = buf
+        self.busy_until[a] = self.now + self.t_wr_us
+        self.log.append(a)
+
+    def writeto(self, a, buf, stop=True):
+        self.now += 20
+        if self.now < self.busy_until[a]:
+            raise OSError(19)
+        return 0
+
+
+class FakePCF8574:
+    """Expansor PCF8574 del LCD: guarda lo que se escribe y decodifica los nibbles."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.calls = 0
+        self.port = []
+
+    def writeto(self, addr, data):
+        self.calls += 1
+        self.bytes += len(data)
+        self.port.extend(bytes(data))
+
+    def reset(self):
+        self.bytes = 0
+        self.calls = 0
+        self.port = []
+
+    def latched(self):
+        """
+        Bytes que recibio el HD44780 (RS, valor), armados con los nibbles que se
+        enganchan en el flanco de bajada de E.
+        """
+        out = []
+        high = None
+        prev = 0
+        for value in self.port:
+            if prev & 0x04 and not value & 0x04:
+                nibble = (prev >> 4) & 0x0F
+                if high is None:
+                    high = nibble
+                else:
+                    out.append((prev & 0x01, (high << 4) | nibble))
+                    high = None
+            prev = value
+        return out
@@ -0,0 +1,125 @@
+"""Emulador minimo de MFRC522 + tarjeta MIFARE Classic que cuenta las tramas SPI."""
+def crc_a(data):
+    crc=0x6363
+    for b in data:
+        b=(b^(crc&0xFF))&0xFF; b=(b^(b<<4))&0xFF
+        crc=((crc>>8)^(b<<8)^(b<<3)^(b>>4))&0xFFFF
+    return [crc&0xFF, crc>>8]
+
+class Card:
+    def __init__(self, uid=(0xDE,0xAD,0xBE,0xEF)):
+        self.uid=list(uid); self.state='IDLE'; self.blocks={i:[0]*16 for i in range(64)}; self.pending_write=None
+    def bcc(self):
+        b=0
+        for x in self.uid: b^=x
+        return b
+    def rx(self, frame, bits7):
+        if bits7:
+            if frame[0]==0x26 and self.state=='IDLE' or frame[0]==0x52 and self.state in ('IDLE','HALT'):
+                self.state='READY'; return [0x04,0x00], 16
+            if self.state=='ACTIVE': self.state='IDLE'
+            return None, 0
+        if self.pending_write is not None:
+            if len(frame)==18 and crc_a(frame[:16])==frame[16:]:
+                self.blocks[self.pending_write]=frame[:16]; self.pending_write=None; return [0x0A],4
+            self.pending_write=None; return None,0
+        if frame[:2]==[0x93,0x20] and self.state=='READY':
+            return self.uid+[self.bcc()], 40
+        if frame[:2]==[0x93,0x70] and len(frame)==9 and self.state=='READY':
+            if crc_a(frame[:7])!=frame[7:9] or frame[2:6]!=self.uid: return None,0
+            self.state='ACTIVE'; r=[0x08]; return r+crc_a(r), 24
+        if self.state!='ACTIVE': return None,0
+        if len(frame)==4 and crc_a(frame[:2])!=frame[2:]: return None,0
+        if frame[0]==0x30:
+            d=list(self.blocks[frame[1]]); return d+crc_a(d), 144
+        if frame[0]==0xA0:
+            self.pending_write=frame[1]; return [0x0A],4
+        if frame[0]==0x50:
+            self.state='HALT'; return None,0
+        return None,0
+
+class Chip:
+    def __init__(self):
+        self.regs=[0]*64; self.fifo=[]; self.card=None; self.tx=0; self.frames=0
+        self.addr=None; self.read_mode=False; self.selected=False
+        self.field=False
+    # CS
+    def cs(self, v):
+        if v==0: self.selected=True; self.addr=None; self.frames+=1
+        else: self.selected=False; self.addr=None
+    def _rd(self, reg):
+        if reg==0x09:
+            return self.fifo.pop(0) if self.fifo else 0
+        if reg==0x0A: return len(self.fifo)
+        return self.regs[reg]
+    def _wr(self, reg, val):
+        if reg==0x09: self.fifo.append(val); return
+        if reg==0x0A:
+            if val&0x80: self.fifo=[]
+            return
+        if reg==0x04:  # ComIrqReg: bit7 Set1
+            if val&0x80: self.regs[4]|=val&0x7F
+            else: self.regs[4]&=~val&0x7F
+            return
+        if reg==0x05:
+            if val&0x80: self.regs[5]|=val&0x7F
+            else: self.regs[5]&=~val&0x7F
+            return
+        self.regs[reg]=val
+        if reg==0x14:
+            on=bool(val&0x03)
+            if not on and self.card: self.card.state='IDLE'; self.card.pending_write=None
+            self.field=on
+        if reg==0x01: self._cmd(val&0x0F)
+        if reg==0x0D and val&0x80 and self.regs[1]&0x0F==0x0C: self._transceive()
+    def _cmd(self, cmd):
+        if cmd==0x0F: self.regs=[0]*64; self.fifo=[]; self.field=False
+        elif cmd==0x03:
+            c=crc_a(self.fifo); self.fifo=[]; self.regs[0x22]=c[0]; self.regs[0x21]=c[1]; self.regs[5]|=0x04
+        elif cmd==0x0E:
+            self.fifo=[]; self.regs[4]|=0x10; self.regs[0x08]|=0x08
+    def _transceive(self):
+        frame=list(self.fifo); self.fifo=[]; self.tx+=1
+        bits7=(self.regs[0x0D]&0x07)==7
+        resp=None
+        if self.card is not None and self.field: resp,bits=self.card.rx(frame,bits7)
+        if resp is None:
+            self.regs[4]|=0x01; return
+        self.fifo=list(resp); self.regs[0x0C]=(bits%8)&0x07; self.regs[4]|=0x30
+    # SPI bytes
+    def xfer(self, b):
+        if self.addr is None:
+            self.addr=(b>>1)&0x3F; self.read_mode=bool(b&0x80); return 0
+        if self.read_mode:
+            v=self._rd(self.addr); self.addr=((b>>1)&0x3F) if b else self.addr; return v
+        self._wr(self.addr,b); return 0
+
+CHIP=Chip()
+
+
+class FakeSPI:
+    def __init__(self,*a,**k): self.chip=CHIP
+    def init(self,*a,**k): pass
+    def write(self, buf):
+        for b in bytes(buf): self.chip.xfer(b)
+    def read(self, n, write=0):
+        return bytes(self.chip.xfer(write) for _ in range(n))
+    def readinto(self, buf, write=0):
+        for i in range(len(buf)): buf[i]=self.chip.xfer(write)
+    def write_readinto(self, wbuf, rbuf):
+        for i,b in enumerate(bytes(wbuf)): rbuf[i]=self.chip.xfer(b)
+class FakePin:
+    OUT=1; IN=0
+    def __init__(self, n, mode=None, pull=None):
+        self.n=n; self.v=1
+    def value(self, v=None):
+        if v is None: return self.v
+        self.v=v
+        if self.n==5: CHIP.cs(v)
+def install():
+    """Conecta mfrc522 al emulador; regresa un chip nuevo sin tarjeta"""
+    global CHIP
+    import mfrc522
+    CHIP = Chip()
+    mfrc522.SPI=FakeSPI; mfrc522.Pin=FakePin; mfrc522.uname=lambda: ('rp2',)
+    return CHIP
@@ -0,0 +1,75 @@
+"""Modulo `machine` falso para correr el codigo de la cerradura en la PC."""
+
+
+class Pin:
+    OUT = 1
+    IN = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, n, mode=None, pull=None, value=None):
+        self.n = n
+        self._v = 1 if value is None else value
+        self.handler = None
+        self.trigger = None
+
+    def value(self, v=None):
+        if v is None:
+            return self._v
+        self._v = v
+
+    def toggle(self):
+        self._v ^= 1
+
+    def irq(self, handler=None, trigger=None, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+
+class PWM:
+    def __init__(self, pin):
+        self.pin = pin
+
+    def freq(self, f=None):
+        pass
+
+    def duty_u16(self, d=None):
+        pass
+
+
+class I2C:
+    def __init__(self, *a, **k):
+        raise RuntimeError("Usa un bus falso de tests/fakes/fake_i2c.py")
+
+
+class SPI:
+    def __init__(self, *a, **k):
+        raise RuntimeError("Usa tests/fakes/fake_rc522.py")
+
+
+class RTC:
+    def datetime(self, v=None):
+        return (2026, 10, 18, 6, 12, 30, 45, 0)
+
+
+class Timer:
+    """Timer que no corre solo: los tests llaman fire() al avanzar el reloj falso"""
+    PERIODIC = 1
+    ONE_SHOT = 0
+
+    def __init__(self, *a, **k):
+        self.callback = None
+        self.period = None
+
+    def init(self, mode=PERIODIC, period=None, callback=None, freq=None):
+        self.period = period
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        if self.callback is not None:
+            self.callback(self)
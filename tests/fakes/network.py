@@ -0,0 +1,30 @@
+AP_IF = 1
+STA_IF = 0
+
+
+class WLAN:
+    def __init__(self, *a):
+        self._active = False
+
+    def active(self, v=None):
+        if v is None:
+            return self._active
+        self._active = v
+
+    def config(self, *a, **k):
+        pass
+
+    def ifconfig(self, *a):
+        return ('192.168.4.1', '255.255.255.0', '192.168.4.1', '8.8.8.8')
+
+    def status(self, *a):
+        return []
+
+    def scan(self):
+        return []
+
+    def isconnected(self):
+        return False
+
+    def connect(self, *a):
+        pass
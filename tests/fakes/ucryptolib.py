@@ -0,0 +1 @@
+from cryptolib import *  # noqa: F401,F403
@@ -0,0 +1,39 @@
+"""Indice de tarjetas inscritas y su filtro de pertenencia [user-008]."""
+from reed_solomon import ReedSolomonSimple
+
+
+def uid(n):
+    return "%016x" % (n * 2654435761)
+
+
+def test_filter_keeps_layout_size_with_many_users(database):
+    database.save_general_info("T1-101    ", bytes(ReedSolomonSimple.pseudo_encrypt(bytes(range(16)), 32)))
+    size = max(8, database.max_users)
+    assert len(database.card_filter) == size
+    for slot in range(database.max_users):
+        database.card_hashes[slot] = database.card_hash(uid(slot))
+    database.rebuild_card_map()
+    assert len(database.card_filter) == size
+    for slot in range(database.max_users):
+        assert database.card_slot(uid(slot)) == slot
+    # Con 8 bits por usuario casi todas las tarjetas desconocidas se rechazan en el filtro
+    passed = 0
+    for n in range(10000, 11000):
+        h = database.card_hash(uid(n))
+        bits = database._filter_bits(h)
+        if all(database.card_filter[b >> 3] & (1 << (b & 7)) for b in bits):
+            passed += 1
+        assert database.card_slot(uid(n)) is None
+    print(f"\nfiltro: {database.max_users} usuarios, {size} bytes, {passed / 10:.1f}% falsos positivos")
+    assert passed < 100
+
+
+def test_removed_card_leaves_filter(database):
+    database.save_general_info("T1-101    ", bytes(ReedSolomonSimple.pseudo_encrypt(bytes(range(16)), 32)))
+    database.card_hashes[0] = database.card_hash(uid(1))
+    database.rebuild_card_map()
+    assert database.card_slot(uid(1)) == 0
+    database.card_hashes[0] = 0
+    database.rebuild_card_map()
+    assert database.card_slot(uid(1)) is None
+    assert not any(database.card_filter)
@@ -0,0 +1,93 @@
+"""Varias EEPROM en el bus como un solo espacio de paginas [user-010]."""
+import pytest
+
+from CAT24C256 import CompositeEEPROM, EEPROMManager
+from fake_i2c import MultiBus
+
+A, B = 0x50, 0x51
+
+
+def composite(stripe, t_wr_us=3000):
+    bus = MultiBus((A, B), t_wr_us=t_wr_us)
+    return bus, CompositeEEPROM.from_profile(bus, (A, B), stripe=stripe)
+
+
+def test_concatenated_mapping():
+    bus, eeprom = composite(False)
+    assert eeprom.pages == 1024
+    assert [(c.i2c_addr, p) for c, p in map(eeprom.locate, (0, 511, 512, 1023))] == \
+        [(A, 0), (A, 511), (B, 0), (B, 511)]
+    eeprom.write(512 * 64, b'B' * 64)
+    eeprom.sync()
+    assert bytes(bus.mem[B][0:64]) == b'B' * 64
+    assert bytes(bus.mem[A][0:64]) == b'0' * 64
+
+
+def test_striped_mapping():
+    bus, eeprom = composite(True)
+    assert [(c.i2c_addr, p) for c, p in map(eeprom.locate, (0, 1, 2, 5))] == \
+        [(A, 0), (B, 0), (A, 1), (B, 2)]
+    eeprom.write(5 * 64, b'S' * 64)
+    eeprom.sync()
+    assert bytes(bus.mem[B][2 * 64:3 * 64]) == b'S' * 64
+
+
+@pytest.mark.parametrize("stripe", [False, True])
+def test_read_spanning_two_chips(stripe):
+    bus, eeprom = composite(stripe)
+    first = 511 if not stripe else 2
+    data = bytes(range(128))
+    eeprom.write(first * 64, data)  # Dos paginas, una en cada chip
+    assert eeprom.locate(first)[0] is not eeprom.locate(first + 1)[0]
+    assert eeprom.read(first * 64 + 32, 64) == data[32:96]
+    buf = bytearray(128)
+    eeprom.read_into(first * 64, buf)
+    assert bytes(buf) == data
+
+
+def test_manager_read_range_across_chips():
+    bus = MultiBus((A, B))
+    m = EEPROMManager([A, B], 1024, 1, 0, 0, i2c=bus)
+    m.save(b'X' * 64, 511)
+    m.save(b'Y' * 64, 512)
+    m.cache.invalidate()
+    assert bytes(m.read_range(511, 2)) == b'X' * 64 + b'Y' * 64
+
+
+def test_write_order_alternates_chips():
+    bus, eeprom = composite(False)
+    assert eeprom.write_order([0, 1, 2, 512, 513]) == [0, 512, 1, 513, 2]
+    bus, eeprom = composite(True)
+    assert eeprom.write_order([0, 2, 4, 1]) == [0, 1, 2, 4]
+
+
+def test_writes_overlap_and_never_address_a_busy_chip():
+    # MultiBus falla si se accede a un chip durante su tWR
+    t_wr = 3000
+    times = {}
+    for name, pages in (('un chip', list(range(8))), ('dos chips', [0, 1, 2, 3, 512, 513, 514, 515])):
+        bus = MultiBus((A, B), t_wr_us=t_wr)
+        m = EEPROMManager([A, B], 1024, 1, 0, 0, i2c=bus)
+        start = bus.now
+        with m.cache:
+            for page in pages:
+                m.partial_data(page, 0, b'W' * 64)
+        m.control.sync()
+        times[name] = bus.now - start
+        if name == 'dos chips':
+            assert bus.log == [A, B] * 4
+        m.cache.invalidate()
+        for page in pages:
+            assert bytes(m.read_view(page)) == b'W' * 64
+    print(f"\n8 escrituras: un chip {times['un chip']} us, dos chips {times['dos chips']} us")
+    assert times['dos chips'] < times['un chip'] * 0.7
+
+
+def test_access_right_after_write_waits_for_that_chip():
+    bus, eeprom = composite(False)
+    eeprom.write(0, b'1' * 64)
+    # Otro chip se puede usar mientras A escribe; A solo despues de su tWR
+    eeprom.write(512 * 64, b'2' * 64)
+    assert bus.now < bus.busy_until[A]
+    assert eeprom.read(0, 64) == b'1' * 64
+    assert eeprom.read(512 * 64, 64) == b'2' * 64
@@ -0,0 +1,55 @@
+"""CRC_A en software con tabla de 256 entradas [user-020]."""
+import random
+import time
+
+import fake_rc522
+import mfrc522
+from mfrc522 import CRC_A_VECTORS, crc_a
+from rfid_reader import RFIDReader
+
+
+def test_known_vectors():
+    for data, expected in CRC_A_VECTORS:
+        assert crc_a(data) == list(expected)
+
+
+def test_matches_bitwise_reference():
+    rnd = random.Random(20)
+    for _ in range(2000):
+        data = [rnd.randrange(256) for _ in range(rnd.randrange(0, 19))]
+        assert crc_a(data) == fake_rc522.crc_a(data)
+
+
+def test_init_self_test_keeps_software_crc(chip):
+    rdr = mfrc522.MFRC522(6, 7, 4, 8, 5)
+    rdr.init()
+    assert rdr.soft_crc
+
+
+def test_init_falls_back_to_coprocessor_when_it_disagrees(chip, monkeypatch):
+    rdr = mfrc522.MFRC522(6, 7, 4, 8, 5)
+    monkeypatch.setattr(fake_rc522, 'crc_a', lambda data: [0, 0])
+    rdr.init()
+    assert not rdr.soft_crc
+
+
+def read_blocks(chip, soft_crc, n):
+    chip.card = fake_rc522.Card()
+    chip.card.blocks[4] = list(range(16))
+    reader = RFIDReader(rdr=mfrc522.MFRC522(6, 7, 4, 8, 5, soft_crc=soft_crc))
+    reader.rdr.init()
+    reader.transact(4)
+    frames = reader.spi_transactions
+    start = time.perf_counter()
+    for _ in range(n):
+        stat, data = reader.transact(4)
+        assert stat == reader.rdr.OK and list(data) == list(range(16))
+    return (reader.spi_transactions - frames) / n, (time.perf_counter() - start) / n
+
+
+def test_bench_software_crc_saves_spi_frames(chip):
+    soft_frames, soft_t = read_blocks(chip, True, 50)
+    chip_frames, chip_t = read_blocks(chip, False, 50)
+    print(f"\nlectura de bloque: CRC en software {soft_frames:.0f} tramas SPI ({soft_t * 1e6:.0f} us), "
+          f"coprocesador {chip_frames:.0f} tramas ({chip_t * 1e6:.0f} us)")
+    assert soft_frames < chip_frames
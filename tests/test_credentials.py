@@ -0,0 +1,60 @@
+"""Resolucion de contraseñas por indice de hashes con sal [user-007]."""
+import time
+
+from DatabaseManager import DatabaseManager
+from reed_solomon import ReedSolomonSimple as RS
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def pin(n):
+    return ("%08d" % n).ljust(16)
+
+
+def enrol(db, n):
+    for i in range(n):
+        db.buffer = bytes([i]) * 16
+        assert db.save_user_info(pin(i), "%016x" % i, "U%d" % i)
+
+
+def test_admin_and_user_resolved_in_one_pass(database):
+    database.save_general_info("T1-101    ", MASTER)
+    database.save_admin_pswd(pin(900))
+    enrol(database, 3)
+    assert database.resolve_credential(pin(900)) == (True, None)
+    assert database.resolve_credential(pin(2)) == (False, 2)
+    assert database.resolve_credential(pin(77)) == (False, None)
+    assert database.resolve_credential("corta") == (False, None)
+
+
+def test_index_survives_reboot(database, bus):
+    database.save_general_info("T1-101    ", MASTER)
+    enrol(database, 10)
+    again = DatabaseManager()
+    again.read_general_info()
+    bus.reads = 0
+    assert again.resolve_credential(pin(9)) == (False, 9)
+    assert bus.reads <= 3
+
+
+def test_bench_resolution_does_not_grow_with_users(database, bus, capsys):
+    database.save_general_info("T1-101    ", MASTER)
+    enrolled = 0
+    reads = {}
+    for n in (5, 20, 60):
+        for i in range(enrolled, n):
+            database.buffer = bytes([i]) * 16
+            database.save_user_info(pin(i), "%016x" % i, "U%d" % i)
+        enrolled = n
+        database.eeprom.cache.invalidate()
+        bus.reads = 0
+        start = time.perf_counter()
+        for _ in range(20):
+            assert database.resolve_credential(pin(n - 1))[1] == n - 1
+            assert database.resolve_credential(pin(10000))[1] is None
+        elapsed = (time.perf_counter() - start) / 40
+        reads[n] = bus.reads
+        with capsys.disabled():
+            print(f"\ncredenciales: {n} usuarios, {elapsed * 1e6:.0f} us por consulta, "
+                  f"{bus.reads} lecturas en 40 consultas")
+    assert reads[60] <= reads[5] + 2
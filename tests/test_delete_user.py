@@ -0,0 +1,112 @@
+"""Bajas de usuario con tombstone y reutilizacion del slot [user-011]."""
+import pytest
+
+from DatabaseManager import DatabaseManager
+from reed_solomon import ReedSolomonSimple as RS
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def pin(n):
+    return ("%08d" % n).ljust(16)
+
+
+def card(n):
+    return "%016x" % n
+
+
+def enrol(db, users):
+    for i in users:
+        db.buffer = bytes([i]) * 16
+        assert db.save_user_info(pin(i), card(i), "U%d" % i)
+
+
+@pytest.fixture
+def db(database):
+    database.save_general_info("T1-101    ", MASTER)
+    return database
+
+
+def page_of(db, slot):
+    start = (db.usr_start_page + slot) * 64
+    return start, start + 64
+
+
+def test_delete_cost_does_not_depend_on_user_count(db, bus, capsys):
+    costs = []
+    for users in (3, 40):
+        enrol(db, range(db.num_usr, users))  # El primero ocupa el slot 1 que quedo libre
+        assert db.num_usr == users
+        writes, reads = bus.writes, bus.reads
+        assert db.delete_user(1)
+        costs.append((bus.writes - writes, bus.reads - reads))
+        with capsys.disabled():
+            print(f"\nbaja con {users} usuarios: {costs[-1][0]} escrituras, {costs[-1][1]} lecturas")
+    # Solo se tocan las paginas del slot borrado, su parte del indice y la general
+    assert costs[0] == costs[1]
+
+
+def test_other_users_keep_their_slots(db, bus):
+    enrol(db, range(5))
+    before = {slot: bytes(bus.mem[slice(*page_of(db, slot))]) for slot in (0, 3, 4)}
+    assert db.delete_user(2)
+    assert db.used_slots() == [0, 1, 3, 4]
+    assert db.num_usr == 4
+    assert db.resolve_credential(pin(2)) == (False, None)
+    assert db.card_hash(card(2)) not in db.card_map
+    for slot, data in before.items():
+        assert bytes(bus.mem[slice(*page_of(db, slot))]) == data
+        assert db.resolve_credential(pin(slot)) == (False, slot)
+    assert bytes(bus.mem[slice(*page_of(db, 2))]) == b'0' * 64
+
+
+def test_freed_slot_is_reused(db):
+    enrol(db, range(5))
+    assert db.delete_user(1)
+    assert db.delete_user(3)
+    assert db.free_slot() == 1
+    enrol(db, [50])
+    assert db.resolve_credential(pin(50)) == (False, 1)
+    enrol(db, [51])
+    assert db.resolve_credential(pin(51)) == (False, 3)
+    assert db.free_slot() == 5
+    assert db.num_usr == 5
+    # El indice guardado en la EEPROM coincide despues de reiniciar
+    again = DatabaseManager()
+    again.read_general_info()
+    assert again.used_slots() == [0, 1, 2, 3, 4]
+    assert again.num_usr == 5
+    assert again.resolve_credential(pin(50)) == (False, 1)
+    assert again.resolve_credential(pin(3)) == (False, None)
+
+
+def test_failed_delete_restores_ram_and_eeprom(db, bus, monkeypatch):
+    enrol(db, range(4))
+    image = bytes(bus.mem)
+    state = (db.used_slots(), db.num_usr, list(db.user_tags), list(db.card_hashes), dict(db.card_map))
+
+    def broken(*args, **kwargs):
+        raise OSError(5)
+
+    with monkeypatch.context() as m:
+        m.setattr(db, 'save_credential_index', broken)
+        assert db.delete_user(2) is False
+    assert bytes(bus.mem) == image
+    assert (db.used_slots(), db.num_usr, list(db.user_tags), list(db.card_hashes), dict(db.card_map)) == state
+    assert db.resolve_credential(pin(2)) == (False, 2)
+    assert db.free_slot() == 4
+    # Despues del fallo la baja funciona normalmente
+    assert db.delete_user(2)
+    assert db.free_slot() == 2
+
+
+def test_invalid_deletes_are_rejected(db, bus):
+    enrol(db, range(2))
+    writes = bus.writes
+    assert db.delete_user(-1) is False
+    assert db.delete_user(db.max_users) is False
+    assert db.delete_user(5) is False  # Slot libre
+    assert db.delete_user(0)
+    assert db.delete_user(1) is False  # Ultimo usuario
+    assert db.used_slots() == [1]
+    assert bus.writes > writes
@@ -0,0 +1,89 @@
+"""Cola de mensajes del LCD sin bloquear [user-024]."""
+import os
+import symtable
+
+from fake_i2c import FakePCF8574
+from lcd_display import Display
+from lcd_frame import LcdFrame
+from pico_i2c_lcd import I2cLcd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Clock:
+    def __init__(self):
+        self.ms = 0
+
+    def __call__(self):
+        return self.ms
+
+
+def make_display(**kw):
+    bus = FakePCF8574()
+    frame = LcdFrame(I2cLcd(bus, 0x27, 2, 16))
+    clock = Clock()
+    return Display(frame, clock=clock, **kw), frame, clock, bus
+
+
+def screen(frame):
+    return bytes(frame.front).decode('latin-1')
+
+
+def test_timed_message_returns_to_previous():
+    display, frame, clock, _ = make_display()
+    display.show("Ingrese su clave")
+    display.tick()
+    display.show("Acceso denegado", priority=1, duration_ms=2000)
+    assert display.tick() == 2000
+    assert screen(frame).startswith("Acceso denegado")
+    clock.ms = 1999
+    display.tick()
+    assert screen(frame).startswith("Acceso denegado")
+    clock.ms = 2000
+    display.tick()
+    assert screen(frame).startswith("Ingrese su clave")
+
+
+def test_long_text_scrolls_without_redrawing_idle_ticks():
+    display, frame, clock, bus = make_display(scroll_ms=400, scroll_hold_ms=1000)
+    display.show("Acerque su tarjeta al lector")
+    display.tick()
+    bus.reset()
+    clock.ms = 999
+    display.tick()
+    assert bus.bytes == 0
+    clock.ms = 1000
+    display.tick()
+    assert screen(frame)[:16] == "cerque su tarjet"
+    clock.ms = 1400
+    display.tick()
+    assert screen(frame)[:16] == "erque su tarjeta"
+
+
+def test_same_message_does_not_restart_scroll():
+    display, frame, clock, _ = make_display()
+    display.show("Acerque su tarjeta al lector")
+    display.tick()
+    clock.ms = 1000
+    display.tick()
+    display.show("Acerque su tarjeta al lector")
+    display.tick()
+    assert screen(frame)[:16] == "cerque su tarjet"
+
+
+def test_main_loop_does_not_shadow_display():
+    # Una asignacion a `display` dentro de main_loop la volveria local
+    # y la primera llamada daria UnboundLocalError
+    with open(os.path.join(ROOT, 'main.py'), encoding='utf-8') as f:
+        table = symtable.symtable(f.read(), 'main.py', 'exec')
+    scopes = [table]
+    while scopes:
+        scope = scopes.pop()
+        if scope.get_name() == 'main_loop':
+            break
+        scopes.extend(scope.get_children())
+    else:
+        raise AssertionError("main_loop no esta en main.py")
+    for name in ('display', 'Display'):
+        if name in scope.get_identifiers():
+            assert not scope.lookup(name).is_local(), name
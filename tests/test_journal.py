@@ -0,0 +1,128 @@
+"""Transacciones con journal en la cache de paginas [user-012]."""
+import pytest
+
+from CAT24C256 import EEPROMManager
+from journal import Journal
+from reed_solomon import ReedSolomonSimple
+
+
+def manager(bus, budget=512):
+    m = EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus, cache_budget=budget)
+    m.attach_journal(Journal(m.control, 494, 17))
+    return m
+
+
+def test_transaction_larger_than_cache_budget(bus):
+    m = manager(bus, budget=128)  # 2 paginas
+    with m.transaction():
+        for page in (10, 11, 12):
+            m.partial_data(page, 0, b'T' * 16)
+    for page in (10, 11, 12):
+        assert bytes(bus.mem[page * 64:page * 64 + 16]) == b'T' * 16
+    assert len(m.cache.pages) <= 2
+
+
+def test_failed_transaction_writes_nothing(bus):
+    m = manager(bus)
+    before = bytes(bus.mem)
+    with pytest.raises(TypeError):
+        with m.transaction():
+            m.partial_data(10, 0, b'A' * 16)
+            m.partial_data(11, 0, None)
+    assert bytes(bus.mem) == before
+    assert not m.cache.dirty
+    assert bytes(m.read_view(10)[:16]) != b'A' * 16
+
+
+def test_failed_cache_block_writes_nothing(bus):
+    m = manager(bus)
+    before = bytes(bus.mem)
+    with pytest.raises(RuntimeError):
+        with m.cache:
+            m.partial_data(10, 0, b'A' * 16)
+            raise RuntimeError("falla")
+    assert bytes(bus.mem) == before
+
+
+def test_failed_enrolment_leaves_crc_table_consistent(database, bus, monkeypatch):
+    database.save_general_info("Depto 101 ", bytes(ReedSolomonSimple.pseudo_encrypt(bytes(range(16)), 32)))
+    assert database.scrubber is not None
+    before = bytes(bus.mem)
+    crc = database.eeprom.cache.crc
+    tags = bytes(crc.tags)
+
+    def fail(user=None):
+        raise RuntimeError("falla a la mitad del alta")
+
+    monkeypatch.setattr(database, 'save_credential_index', fail)
+    database.buffer = b'C' * 16
+    with pytest.raises(RuntimeError):
+        database.save_user_info("4321            ", "cx00000000000001", "ABCDEFG")
+    assert bytes(bus.mem) == before
+    # Los CRC en RAM regresan a los que estan en la EEPROM
+    assert bytes(crc.tags) == tags
+    assert database.scrubber.check(database.usr_start_page)
+
+
+def test_failed_enrolment_restores_ram_index(database, bus, monkeypatch):
+    database.save_general_info("Depto 101 ", bytes(ReedSolomonSimple.pseudo_encrypt(bytes(range(16)), 32)))
+    database.buffer = b'A' * 16
+    database.save_user_info("1111            ", "cx00000000000001", "PRIMERO")
+    before = bytes(bus.mem)
+    index = (list(database.user_tags), list(database.card_hashes), bytes(database.user_slots),
+             database.num_usr, dict(database.card_map), bytes(database.card_filter))
+
+    def fail(user=None):
+        raise RuntimeError("falla a la mitad del alta")
+
+    with monkeypatch.context() as m:
+        m.setattr(database, 'save_credential_index', fail)
+        database.buffer = b'B' * 16
+        with pytest.raises(RuntimeError):
+            database.save_user_info("2222            ", "cx00000000000002", "SEGUNDO")
+    assert bytes(bus.mem) == before
+    assert (list(database.user_tags), list(database.card_hashes), bytes(database.user_slots),
+            database.num_usr, dict(database.card_map), bytes(database.card_filter)) == index
+    assert database.used_slots() == [0]
+    assert database.card_slot("cx00000000000002") is None
+    assert database.resolve_credential("2222            ") == (False, None)
+    # El slot que fallo se usa en la siguiente alta
+    assert database.free_slot() == 1
+    database.buffer = b'B' * 16
+    assert database.save_user_info("2222            ", "cx00000000000002", "SEGUNDO")
+    assert database.card_slot("cx00000000000002") == 1
+
+
+def test_failed_commit_restores_ram_index(database, monkeypatch):
+    database.save_general_info("Depto 101 ", bytes(ReedSolomonSimple.pseudo_encrypt(bytes(range(16)), 32)))
+    journal = database.eeprom.cache.journal
+
+    def fail(pages, contents):
+        raise OSError("error de I2C")
+
+    monkeypatch.setattr(journal, 'commit', fail)
+    database.buffer = b'A' * 16
+    with pytest.raises(OSError):
+        database.save_user_info("1111            ", "cx00000000000001", "PRIMERO")
+    assert database.used_slots() == []
+    assert database.card_slot("cx00000000000001") is None
+    assert database.num_usr == 0
+
+
+def test_power_cut_after_commit_is_replayed(bus):
+    m = manager(bus)
+    journal = m.cache.journal
+
+    def power_cut(pages, images):
+        raise OSError("sin energia")
+
+    journal._apply = power_cut
+    with pytest.raises(OSError):
+        with m.transaction():
+            m.partial_data(20, 0, b'J' * 64)
+            m.partial_data(21, 0, b'K' * 64)
+    assert bytes(bus.mem[20 * 64:21 * 64]) != b'J' * 64
+    m2 = manager(bus)
+    assert bytes(bus.mem[20 * 64:21 * 64]) == b'J' * 64
+    assert bytes(bus.mem[21 * 64:22 * 64]) == b'K' * 64
+    assert m2.cache.journal.recover() == []
@@ -0,0 +1,73 @@
+"""Llaves decodificadas y cifradores en cache [user-015]."""
+import random
+import time
+
+import cryptolib
+import pytest
+
+from key_manager import KeyManager
+from reed_solomon import ReedSolomonSimple as RS
+
+
+def random_master(seed):
+    key = bytes(random.Random(seed).randrange(256) for _ in range(16))
+    return key, bytes(RS.pseudo_encrypt(key, 32))
+
+
+def test_decoded_random_key_is_a_valid_aes_key():
+    for seed in range(10):
+        key, stored = random_master(seed)
+        keys = KeyManager()
+        secret = keys.secret('log', lambda: RS.pseudo_decrypt_bytes(stored))
+        assert bytes(secret) == key
+        cryptolib.aes(bytes(secret), 1)  # Lanza ValueError si el largo no es 16/32
+
+
+def test_str_secrets_are_rejected():
+    with pytest.raises(TypeError):
+        KeyManager().secret('x', lambda: "clave")
+
+
+def test_save_log_with_binary_master_key(database):
+    for seed in range(5):
+        key, stored = random_master(seed)
+        database.save_general_info("T1-101    ", stored)
+        database.save_log("Se ingreso contraseña", 1)
+        assert len(database.log_key()) == 16
+        assert database.create_log_array(number=1)
+
+
+def test_secret_decoded_once_and_cipher_reused():
+    calls = []
+    keys = KeyManager(max_ciphers=2)
+    for _ in range(5):
+        keys.secret('log', lambda: calls.append(1) or b'k' * 16)
+    assert len(calls) == 1
+    assert keys.cipher(b'k' * 16) is keys.cipher(b'k' * 16)
+    keys.cipher(b'a' * 16)
+    keys.cipher(b'b' * 16)
+    assert len(keys.ciphers) == 2
+
+
+def test_wipe_zeroes_secrets():
+    keys = KeyManager()
+    secret = keys.secret('log', lambda: b'k' * 16)
+    keys.wipe()
+    assert secret == bytearray(16) and not keys.secrets
+
+
+def test_bench_log_latency(database):
+    """Benchmark: latencia de escribir y leer logs con la llave en cache"""
+    database.save_general_info("T1-101    ", random_master(1)[1])
+    created = cryptolib.created
+    n = 50
+    t = time.perf_counter()
+    for _ in range(n):
+        database.save_log("Se ingreso contraseña", 1)
+    t_save = (time.perf_counter() - t) / n
+    t = time.perf_counter()
+    database.create_log_array(number=10)
+    t_read = time.perf_counter() - t
+    print("save_log %.0f us, create_log_array(10) %.0f us, objetos aes creados %d"
+          % (t_save * 1e6, t_read * 1e6, cryptolib.created - created))
+    assert cryptolib.created - created <= 2
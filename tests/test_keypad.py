@@ -0,0 +1,133 @@
+"""Teclado 4x4 por interrupciones, sobre una matriz simulada [user-021]."""
+import asyncio
+
+import pytest
+
+import keypad4x4
+from keypad4x4 import Keypad4x4
+
+
+class Matrix:
+    """Conecta las filas y columnas falsas del teclado como una matriz real"""
+
+    def __init__(self, kp):
+        self.kp = kp
+        self.pressed = set()
+        for c, col in enumerate(kp.col_list):
+            col.value = self._reader(c)
+
+    def _reader(self, c):
+        def value(v=None):
+            for r, row in enumerate(self.kp.row_list):
+                if row.value() == 0 and self.kp.key_map[r][c] in self.pressed:
+                    return 0
+            return 1
+        return value
+
+    def _edges(self, before):
+        for c, col in enumerate(self.kp.col_list):
+            if before[c] == 1 and col.value() == 0 and col.handler is not None:
+                col.handler(col)
+
+    def press(self, key):
+        before = [col.value() for col in self.kp.col_list]
+        self.pressed.add(key)
+        self._edges(before)
+
+    def release(self, key):
+        self.pressed.discard(key)
+
+
+@pytest.fixture
+def pad(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(keypad4x4.utime, 'ticks_ms', lambda: now[0])
+    kp = Keypad4x4()
+    matrix = Matrix(kp)
+    kp.start()
+
+    def run(ms):
+        # Avanza el reloj y dispara el timer de escaneo mientras este activo
+        for _ in range(ms // kp.SCAN_MS):
+            now[0] += kp.SCAN_MS
+            kp.timer.fire()
+    return kp, matrix, run
+
+
+def drain(kp):
+    keys = []
+    while True:
+        key = kp.get_key()
+        if key is None:
+            return keys
+        keys.append(key)
+
+
+def test_press_is_reported_after_debounce(pad):
+    kp, matrix, run = pad
+    matrix.press("5")
+    run(kp.SCAN_MS * kp.DEBOUNCE_SCANS)
+    assert drain(kp) == ["5"]
+    assert kp.latency_ms == kp.SCAN_MS * kp.DEBOUNCE_SCANS
+    matrix.release("5")
+    run(50)
+    assert kp.state == keypad4x4.IDLE
+    assert kp.timer.callback is None
+    assert all(col.handler is kp._on_edge_cb for col in kp.col_list)
+
+
+def test_bounce_gives_one_event(pad):
+    kp, matrix, run = pad
+    for _ in range(3):
+        matrix.press("7")
+        run(kp.SCAN_MS)
+        matrix.release("7")
+        run(kp.SCAN_MS)
+    matrix.press("7")
+    run(100)
+    assert drain(kp) == ["7"]
+
+
+def test_second_key_while_held_is_reported_on_next_scan(pad):
+    kp, matrix, run = pad
+    matrix.press("1")
+    run(50)
+    matrix.press("2")
+    run(kp.SCAN_MS * kp.DEBOUNCE_SCANS)
+    assert drain(kp) == ["1", "2"]
+    # Se suelta la segunda: la primera no se vuelve a reportar como nueva
+    matrix.release("2")
+    run(50)
+    assert drain(kp) == []
+    run(kp.REPEAT_DELAY_MS)
+    assert drain(kp) == ["1"]
+
+
+def test_held_key_repeats(pad):
+    kp, matrix, run = pad
+    matrix.press("#")
+    run(kp.SCAN_MS * kp.DEBOUNCE_SCANS + kp.REPEAT_DELAY_MS + 2 * kp.REPEAT_MS)
+    assert drain(kp) == ["#"] * 4
+
+
+def test_full_queue_drops_and_counts(pad):
+    kp, matrix, run = pad
+    matrix.press("0")
+    run(kp.REPEAT_DELAY_MS + kp.REPEAT_MS * 20)
+    keys = drain(kp)
+    print(f"\nteclado: {len(keys)} en cola, {kp.dropped} perdidas, latencia {kp.latency_ms} ms")
+    assert len(keys) == kp.QUEUE_SIZE - 1
+    assert kp.dropped > 0
+
+
+def test_read_key_without_thread_safe_flag_polls(pad):
+    kp, matrix, run = pad
+    kp.flag = None
+
+    async def main():
+        task = asyncio.ensure_future(kp.read_key())
+        await asyncio.sleep(0)
+        matrix.press("A")
+        run(kp.SCAN_MS * kp.DEBOUNCE_SCANS)
+        return await asyncio.wait_for(task, 1)
+    assert asyncio.run(main()) == "A"
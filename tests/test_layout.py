@@ -0,0 +1,112 @@
+"""Tabla de asignacion de la EEPROM y migracion del acomodo fijo [user-009]."""
+import pytest
+
+from DatabaseManager import DatabaseManager
+from reed_solomon import ReedSolomonSimple as RS
+from storage_layout import StorageLayout
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def check_regions(layout):
+    regions = sorted((r.start, r.end, name) for name, r in layout.regions.items() if r.pages)
+    assert regions[0] == (0, 1, 'gral')
+    for (s1, e1, n1), (s2, e2, n2) in zip(regions, regions[1:]):
+        assert e1 <= s2, f"{n1} se encima con {n2}"
+    assert regions[-1][1] <= layout.header_page
+
+
+@pytest.mark.parametrize("total_pages", [512, 1024])
+@pytest.mark.parametrize("users", [5, 50, 200])
+def test_build_scales_with_users(total_pages, users):
+    layout = StorageLayout.build(total_pages, max_users=users)
+    check_regions(layout)
+    assert layout.max_users == users
+    assert layout.phones.capacity >= users + layout.max_admins
+    again = StorageLayout.unpack(layout.pack(), total_pages)
+    assert {n: (r.start, r.pages, r.capacity) for n, r in again.regions.items()} == \
+        {n: (r.start, r.pages, r.capacity) for n, r in layout.regions.items()}
+    print(f"\nacomodo {total_pages} paginas, {users} usuarios: {layout.logs.capacity} logs")
+
+
+def test_too_many_users_is_rejected():
+    with pytest.raises(ValueError):
+        StorageLayout.build(512, max_users=480)
+
+
+def test_bad_header_falls_back_to_legacy():
+    buf = bytearray(StorageLayout.build(512).pack())
+    buf[20] ^= 0xFF
+    assert StorageLayout.unpack(buf, 512) is None
+    assert StorageLayout.unpack(StorageLayout.build(1024).pack(), 512) is None
+
+
+def test_legacy_lock_is_migrated(database, bus, monkeypatch):
+    assert not database.layout.stored
+    # Una cerradura con el formato anterior: se inscribe sin migrar todavia
+    with monkeypatch.context() as m:
+        m.setattr(DatabaseManager, 'migrate_layout', lambda self: False)
+        database.depto_info = "T1-101    "
+        database.mst_key = MASTER
+        database.num_usr = 0
+        database.num_logs = 0
+        database.admins = 0
+        database.update_gral_info()
+        database.buffer = b'C' * 16
+        database.save_phone("55123456")
+        database.save_user_info("4321".ljust(16), "cx00000000000001", "ABCDEFG")
+        old = database.layout
+        assert database.resolve_credential("4321".ljust(16)) == (False, 0)
+
+    db = DatabaseManager()
+    db.read_general_info()
+    assert db.layout.stored
+    check_regions(db.layout)
+    assert db.max_users > old.max_users
+    assert db.resolve_credential("4321".ljust(16)) == (False, 0)
+    assert db.card_slot("cx00000000000001") == 0
+    # Las copias del acomodo anterior se borraron y la bitacora no se movio
+    assert bytes(bus.mem[old.users.start * 64:old.users.end * 64]) == b'0' * 64 * old.users.pages
+    assert db.layout.logs.start == old.logs.start
+    again = DatabaseManager()
+    again.read_general_info()
+    assert again.max_users == db.max_users
+
+
+@pytest.mark.parametrize("users", [5, 50, 200])
+def test_bench_enrol_and_lookup_at_scale(users, monkeypatch, capsys):
+    from fake_i2c import FakeEEPROM
+    import CAT24C256
+    import time
+    # DatabaseManager solo ocupa 256 paginas de la CAT24C256 (64 usuarios): se simula una 24LC512
+    device = FakeEEPROM(size=65536)
+    monkeypatch.setattr(CAT24C256, 'I2C', lambda *a, **k: device)
+    monkeypatch.setattr(CAT24C256, 'CHIP_PROFILES', dict(CAT24C256.CHIP_PROFILES,
+                                                         CAT24C256=CAT24C256.CHIP_PROFILES['24LC512']))
+    db = DatabaseManager()
+    db.read_general_info()
+    layout = StorageLayout.build(db.eeprom.control.pages, max_users=users)
+    layout.save(db.eeprom)
+    db.apply_layout(layout)
+    db.save_general_info("T1-101    ", MASTER)
+    assert db.max_users == users
+    start = time.perf_counter()
+    writes = device.writes
+    for i in range(users):
+        db.buffer = bytes([i & 0xFF]) * 16
+        assert db.save_user_info(("%08d" % i).ljust(16), "%016x" % i, "U%d" % i)
+    enrol = (time.perf_counter() - start) / users
+    enrol_writes = (device.writes - writes) / users
+    reads = device.reads
+    start = time.perf_counter()
+    for i in range(0, users, max(1, users // 20)):
+        assert db.resolve_credential(("%08d" % i).ljust(16)) == (False, i)
+    n = len(range(0, users, max(1, users // 20)))
+    lookup = (time.perf_counter() - start) / n
+    lookup_reads = (device.reads - reads) / n
+    with capsys.disabled():
+        print(f"\n{users} usuarios: alta {enrol * 1e3:.2f} ms ({enrol_writes:.1f} escrituras), "
+              f"consulta {lookup * 1e6:.0f} us ({lookup_reads:.1f} lecturas)")
+    # gral + usuario + indice + CRC, cada una con su copia en la bitacora: no crece con los usuarios
+    assert enrol_writes <= 24
+    assert lookup_reads <= 2
@@ -0,0 +1,82 @@
+"""LCD por I2C con buffer preasignado [user-023] y framebuffer [user-022]."""
+from fake_i2c import FakePCF8574
+from lcd_frame import LcdFrame
+from pico_i2c_lcd import I2cLcd
+
+RS_CMD = 0
+RS_DATA = 1
+
+
+def make_lcd():
+    bus = FakePCF8574()
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    bus.reset()
+    return lcd, bus
+
+
+def test_init_nibbles_use_one_view():
+    bus = FakePCF8574()
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    # Cuatro nibbles de inicializacion de 2 bytes despues del byte del puerto
+    assert bus.port[1:9:2] == [0x34, 0x34, 0x34, 0x24]
+    assert len(lcd.init_view) == 2
+
+
+def test_run_latches_cursor_command_and_data():
+    lcd, bus = make_lcd()
+    lcd.write_run_at(3, 1, b'HOLA', 0, 4)
+    assert bus.calls == 1
+    assert bus.latched() == [(RS_CMD, 0x80 | 0x43)] + [(RS_DATA, c) for c in b'HOLA']
+    assert (lcd.cursor_x, lcd.cursor_y) == (7, 1)
+
+
+def test_long_run_is_split_but_complete():
+    lcd, bus = make_lcd()
+    text = bytes(range(0x41, 0x41 + 40))
+    lcd.write_run_at(0, 0, text, 0, len(text))
+    assert bus.latched() == [(RS_CMD, 0x80)] + [(RS_DATA, c) for c in text]
+
+
+def test_commands_are_batched():
+    lcd, bus = make_lcd()
+    lcd.hal_write_commands((0x06, 0x0C, 0x14))
+    assert bus.calls == 1
+    assert bus.latched() == [(RS_CMD, 0x06), (RS_CMD, 0x0C), (RS_CMD, 0x14)]
+
+
+def test_frame_sends_only_changed_cells():
+    lcd, bus = make_lcd()
+    frame = LcdFrame(lcd)
+    frame.write("Acceso concedido", 0)
+    frame.write("Bienvenido", 1)
+    assert frame.flush() == 32
+    full = bus.bytes
+    print(f"\nLCD: redibujo completo {full} bytes en {bus.calls} transferencias")
+    assert bus.calls == 2
+    bus.reset()
+    frame.write("Acceso denegado ", 0)
+    frame.flush()
+    print(f"LCD: cambio de una palabra {bus.bytes} bytes en {bus.calls} transferencias")
+    assert bus.calls == 1
+    assert bus.bytes < full // 3
+    bus.reset()
+    assert frame.flush() == 0
+    assert bus.bytes == 0
+
+
+def test_transfers_reuse_preallocated_views():
+    # En MicroPython cada slice nuevo es una asignacion; todo lo que se manda
+    # tiene que ser una de las vistas creadas en __init__
+    bus = FakePCF8574()
+    sent = []
+    bus.writeto = lambda addr, data: sent.append(data)
+    lcd = I2cLcd(bus, 0x27, 2, 16)
+    frame = LcdFrame(lcd)
+    rows = (b'0123456789ABCDEF', b'FEDCBA9876543210')
+    for i in range(100):
+        frame.back[:] = rows[i & 1] + rows[(i + 1) & 1]
+        frame.flush()
+    lcd.hal_write_commands((0x06, 0x0C))
+    allowed = [id(v) for v in lcd.views] + [id(lcd.init_view), id(lcd.port)]
+    print(f"\nLCD: {len(sent)} transferencias, {sum(len(d) for d in sent)} bytes en 100 redibujos")
+    assert all(id(data) in allowed for data in sent)
@@ -0,0 +1,70 @@
+"""Registros binarios de 12 bytes en la bitacora, cinco por pagina cifrada [user-005]."""
+import struct
+
+from log_ring import LOG_MESSAGES, LogRing, message_code
+from reed_solomon import ReedSolomonSimple as RS
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def formatted(database):
+    database.save_general_info("T1-101    ", MASTER)
+    return database
+
+
+def plain_page(db, bus, slot):
+    page = db.log_ring.start_page + slot
+    return db.log_cipher(True).decrypt(bytes(bus.mem[page * 64:(page + 1) * 64]))
+
+
+def test_record_format():
+    assert struct.calcsize(LogRing.RECORD) == LogRing.RECORD_SIZE == 12
+    assert LogRing.RECORD_SIZE * LogRing.RECORDS_PER_PAGE <= 64
+
+
+def test_five_records_per_encrypted_page(database, bus):
+    db = formatted(database)
+    for i in range(7):
+        db.save_log("Se ingreso contraseña", 1 + i % 3, 100 + i)
+    code = LOG_MESSAGES.index("Se ingreso contraseña")
+    first = plain_page(db, bus, 0)
+    records = [struct.unpack_from(LogRing.RECORD, first, i * 12) for i in range(5)]
+    assert [r[0] for r in records] == [0, 1, 2, 3, 4]
+    assert [(r[2], r[3], r[4]) for r in records] == [(1 + i % 3, code, 100 + i) for i in range(5)]
+    assert first[60:] == b'\xff' * 4
+    second = plain_page(db, bus, 1)
+    assert struct.unpack_from('>I', second, 12)[0] == 6
+    assert second[24:] == b'\xff' * 40  # Resto de la pagina cabeza sin usar
+    page = db.log_ring.start_page
+    assert bytes(bus.mem[page * 64:page * 64 + 64]) != bytes(first)  # Cifrada en la EEPROM
+
+
+def test_batched_logs_cost_one_page_write(database, bus):
+    db = formatted(database)
+    ring = db.log_ring
+    bus.written_pages.clear()
+    with db.eeprom.cache:
+        for i in range(ring.RECORDS_PER_PAGE):
+            db.save_log("Mensaje enviado", 2, i)
+    log_pages = [p for p in bus.written_pages if ring.start_page <= p < ring.start_page + ring.slots]
+    assert log_pages == [ring.start_page]
+    assert [rec[4] for rec in ring.scan()] == [4, 3, 2, 1, 0]
+
+
+def test_message_codes():
+    assert message_code("Evento") == 0
+    assert message_code("Mensaje enviado") == LOG_MESSAGES.index("Mensaje enviado")
+    assert message_code("Error enviando mensaje: timeout") == LOG_MESSAGES.index("Error enviando mensaje")
+    assert message_code("Algo que no esta en la tabla") == 0
+
+
+def test_records_read_back_as_text(database, monkeypatch):
+    db = formatted(database)
+    import rtc_config
+    monkeypatch.setattr(rtc_config, 'obtener_epoch_rtc', lambda: 1700000000)
+    monkeypatch.setattr(rtc_config, 'formatear_epoch', lambda epoch: str(epoch))
+    seq = db.save_log("Acceso concedido con codigo", 3, 70000)
+    db.save_log("No esta en la tabla", 1)
+    assert db.read_log(seq) == "3-1700000000-Acceso concedido con codigo (%d)" % (70000 & 0xFFFF)
+    assert db.read_log(seq + 1) == "1-1700000000-Evento"
+    assert db.log_ring.read(seq)[1] == 1700000000
@@ -0,0 +1,101 @@
+"""Bitacora en anillo con numeros de secuencia [user-004]."""
+import math
+
+from DatabaseManager import DatabaseManager
+from reed_solomon import ReedSolomonSimple as RS
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def formatted(database):
+    database.save_general_info("T1-101    ", MASTER)
+    return database
+
+
+def test_one_page_write_per_event(database, bus):
+    db = formatted(database)
+    ring = db.log_ring
+    bus.written_pages.clear()
+    n = 40
+    for i in range(n):
+        db.save_log("Se ingreso contraseña", 1, i)
+    log_pages = [p for p in bus.written_pages if ring.start_page <= p < ring.start_page + ring.slots]
+    other = [p for p in bus.written_pages if p not in log_pages]
+    print(f"\nbitacora: {len(bus.written_pages) / n:.2f} escrituras por log "
+          f"({len(other)} del indice por tipo)")
+    assert len(log_pages) == n
+    assert db.gral_start_page not in bus.written_pages
+    assert len(other) <= n // (ring.RECORDS_PER_PAGE * ring.index.persist_every) + 1
+
+
+def test_boot_recovery_uses_binary_search(database, bus):
+    db = formatted(database)
+    n = 123
+    for i in range(n):
+        db.save_log("Acceso concedido con codigo", 1, i)
+    bus.reads = 0
+    again = DatabaseManager()
+    again.read_general_info()
+    ring = again.log_ring
+    assert ring.next_seq == n
+    assert again.num_logs == n
+    assert again.read_log(n - 1).endswith("(122)")
+    print(f"\nrecuperacion: {bus.reads} lecturas con {ring.slots} paginas de bitacora")
+    # Busqueda binaria de la cabeza mas el arranque del resto de la base de datos
+    assert bus.reads < 2 * math.ceil(math.log2(ring.slots)) + 20
+
+
+def test_wraparound_keeps_newest(database):
+    db = formatted(database)
+    ring = db.log_ring
+    total = ring.capacity + 2 * ring.RECORDS_PER_PAGE + 3
+    for i in range(total):
+        db.save_log("Se ingreso contraseña", 1 + i % 3, i & 0xFFFF)
+    assert ring.next_seq == total
+    assert ring.count() <= ring.capacity
+    assert ring.read(0) is None
+    assert ring.read(total - 1)[4] == (total - 1) & 0xFFFF
+    again = DatabaseManager()
+    again.read_general_info()
+    assert again.log_ring.next_seq == total
+    newest = [rec[0] for rec in again.log_ring.scan()]
+    assert newest[0] == total - 1
+    assert newest == sorted(newest, reverse=True)
+    assert len(newest) == ring.count()
+
+
+def test_cursor_pages_read_only_what_they_return(database):
+    db = formatted(database)
+    ring = db.log_ring
+    for i in range(300):
+        db.save_log("Se ingreso contraseña", 1 + i % 3, i)
+    decrypted = []
+    original = ring._decrypt
+
+    def counting(slot, page_data):
+        decrypted.append(slot)
+        return original(slot, page_data)
+
+    ring._decrypt = counting
+    costs = []
+    cursor = None
+    seen = []
+    while True:
+        del decrypted[:]
+        logs = db.create_log_array(number=10, cursor=cursor)
+        if not logs:
+            break
+        costs.append(len(decrypted))
+        seen.append(len(logs))
+        cursor = db.log_cursor
+        if cursor is None:
+            break
+    print(f"\nbitacora: {len(costs)} paginas de consulta, {max(costs)} paginas descifradas como maximo")
+    assert sum(seen) == 300
+    # Una consulta de 10 registros toca a lo mas 3 paginas mas la del siguiente cursor
+    assert max(costs) <= 10 // ring.RECORDS_PER_PAGE + 2
+    # El offset se convierte en cursor sin leer los registros saltados
+    del decrypted[:]
+    logs = db.create_log_array(number=5, offset=250)
+    assert len(decrypted) <= 5 // ring.RECORDS_PER_PAGE + 2
+    assert logs[0] == db.format_log(ring.read(300 - 1 - 250))
@@ -0,0 +1,61 @@
+"""Transferencias en rafaga al FIFO y a los registros del MFRC522 [user-019]."""
+import fake_rc522
+import mfrc522
+from rfid_reader import RFIDReader
+
+
+def reader():
+    return mfrc522.MFRC522(6, 7, 4, 8, 5)
+
+
+def test_fifo_write_is_one_frame(chip):
+    rdr = reader()
+    data = list(range(1, 19))  # Trama de escritura de bloque: 16 datos + CRC
+    frames = chip.frames
+    rdr._fifo_write(data)
+    assert chip.frames - frames == 1
+    assert chip.fifo == data
+    rdr._fifo_write(bytearray(b'\x30\x08'))
+    assert chip.fifo == data + [0x30, 0x08]
+
+
+def test_fifo_burst_read_is_one_frame(chip):
+    rdr = reader()
+    chip.fifo = list(range(40, 56))
+    frames = chip.frames
+    assert list(rdr._burst_read(0x09, 16)) == list(range(40, 56))
+    assert chip.frames - frames == 1
+    assert chip.fifo == []
+
+
+def test_register_list_burst_read(chip):
+    rdr = reader()
+    chip.fifo = [1, 2, 3]
+    chip.regs[0x0C] = 0x05
+    frames = chip.frames
+    level, control = rdr._burst_read((0x0A, 0x0C), 2)
+    assert (level, control) == (3, 0x05)
+    assert chip.frames - frames == 1
+
+
+def test_card_read_uses_bursts(chip, monkeypatch):
+    chip.card = fake_rc522.Card()
+    chip.card.blocks[4] = list(range(16))
+    rdr = RFIDReader(rdr=reader())
+    rdr.poll()
+    regs = []
+    real = rdr.rdr._wreg
+    monkeypatch.setattr(rdr.rdr, '_wreg', lambda reg, val: regs.append(reg) or real(reg, val))
+    frames = chip.frames
+    assert rdr.transact(4) == (rdr.OK, list(range(16)))
+    # Ni los bytes enviados ni los recibidos van uno por trama
+    assert 0x09 not in regs
+    print(f"\nlectura de bloque: {chip.frames - frames} tramas SPI")
+    assert chip.frames - frames < 2 * (4 + 18)
+
+
+def test_poll_without_card_does_not_spin(chip):
+    rdr = RFIDReader(rdr=reader())
+    frames = chip.frames
+    assert rdr.poll() == (rdr.NOTAGERR, None)
+    assert chip.frames - frames < 50  # Antes: 2000 lecturas de ComIrqReg
@@ -0,0 +1,46 @@
+"""Cache de paginas de EEPROMManager [user-001]."""
+from CAT24C256 import EEPROMManager
+
+
+def manager(bus, budget=512):
+    return EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus, cache_budget=budget)
+
+
+def test_multi_field_update_is_one_page_write(bus):
+    m = manager(bus)
+    with m.cache:
+        m.partial_data(10, 0, b"A" * 16)
+        m.partial_data(10, 16, b"B" * 16)
+        m.partial_data(10, 32, b"C" * 16)
+    assert bus.written_pages == [10]
+    assert bytes(bus.mem[640:688]) == b'A' * 16 + b'B' * 16 + b'C' * 16
+
+
+def test_reads_hit_the_cache(bus):
+    m = manager(bus)
+    m.partial_data(5, 0, b"x" * 8)
+    reads = bus.reads
+    for _ in range(10):
+        m.read_view(5)
+    assert bus.reads == reads
+
+
+def test_lru_respects_budget(bus):
+    m = manager(bus, budget=128)
+    for page in range(6):
+        m.read_view(page)
+    assert len(m.cache.pages) <= 2
+
+
+def test_bench_writes_per_enrolment(database, bus):
+    """Benchmark: escrituras fisicas por alta de usuario completa"""
+    from reed_solomon import ReedSolomonSimple as RS
+    database.save_general_info("T1-101    ", bytes(RS.pseudo_encrypt(bytes(range(16)), 32)))
+    database.buffer = bytearray(b'Q' * 16)
+    before = bus.writes
+    with database.eeprom.transaction():
+        database.save_phone("5550001")
+        database.save_user_info("4321            ", "cx00000000000001", "ABCDEFG")
+    writes = bus.writes - before
+    print("escrituras por alta:", writes)
+    assert writes <= 24
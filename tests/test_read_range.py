@@ -0,0 +1,77 @@
+"""Lecturas en rafaga de varias paginas y scanners sobre read_range [user-002]."""
+import math
+
+from CAT24C256 import EEPROMManager
+from reed_solomon import ReedSolomonSimple as RS
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+def enrol_with_phones(db, n):
+    for i in range(n):
+        db.save_phone("5512%04d" % i)
+        db.buffer = bytes([i]) * 16
+        assert db.save_user_info(("%08d" % i).ljust(16), "%016x" % i, "API%05d" % i)
+
+
+def test_range_is_one_transaction(bus):
+    m = EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus)
+    for page in range(20, 30):
+        bus.mem[page * 64:(page + 1) * 64] = bytes([page]) * 64
+    reads = bus.reads
+    view = m.read_range(20, 10)
+    assert bus.reads - reads == 1
+    assert bytes(view) == b''.join(bytes([p]) * 64 for p in range(20, 30))
+
+
+def test_range_sees_pending_cache_writes(bus):
+    m = EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus)
+    with m.cache:
+        m.partial_data(22, 8, b'NUEVO')
+        view = m.read_range(20, 4)
+        assert bytes(view[2 * 64 + 8:2 * 64 + 13]) == b'NUEVO'
+        assert bytes(bus.mem[22 * 64 + 8:22 * 64 + 13]) != b'NUEVO'
+    assert bytes(m.read_range(22, 1)[8:13]) == b'NUEVO'
+
+
+def test_range_buffer_is_reused(bus):
+    m = EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus)
+    first = m.read_range(0, 4)
+    m.read_range(4, 2)
+    assert m.read_range(8, 4).obj is first.obj  # Sin reservar otro buffer
+
+
+def test_phone_scan_reads_in_one_burst(database, bus):
+    db = database
+    db.save_general_info("T1-101    ", MASTER)
+    enrol_with_phones(db, 9)
+    db.eeprom.cache.invalidate()
+    reads = bus.reads
+    phones = db.read_phones()
+    assert phones == ["5512%04d" % i for i in range(9)]
+    assert bus.reads - reads == 1
+
+
+def test_user_api_scan_reads_in_chunks(database, bus):
+    db = database
+    db.save_general_info("T1-101    ", MASTER)
+    enrol_with_phones(db, 20)
+    db.eeprom.cache.invalidate()
+    reads = bus.reads
+    api = db.get_api()
+    assert api == ["API%05d" % i for i in range(20)]
+    assert bus.reads - reads == math.ceil(20 / 8)
+
+
+def test_log_scan_reads_in_chunks(database, bus):
+    db = database
+    db.save_general_info("T1-101    ", MASTER)
+    ring = db.log_ring
+    n = 30 * ring.RECORDS_PER_PAGE
+    for i in range(n):
+        db.save_log("Se ingreso contraseña", 1, i)
+    db.eeprom.cache.invalidate()
+    reads = bus.reads
+    seqs = [rec[0] for rec in ring.scan(chunk=10)]
+    assert seqs == list(range(n - 1, -1, -1))
+    assert bus.reads - reads == math.ceil(30 / 10)
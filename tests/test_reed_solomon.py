@@ -0,0 +1,35 @@
+"""Codec Reed-Solomon [user-013]."""
+import os
+import random
+
+import pytest
+
+from reed_solomon import ReedSolomon, ReedSolomonError, ReedSolomonSimple as RS
+
+
+def test_binary_secret_round_trips_as_bytes():
+    for seed in range(20):
+        key = bytes(random.Random(seed).randrange(256) for _ in range(16))
+        assert RS.pseudo_decrypt_bytes(bytes(RS.pseudo_encrypt(key, 32))) == key
+
+
+def test_text_round_trip():
+    assert RS.pseudo_decrypt(RS.pseudo_encrypt("5512345678", 20)) == "5512345678"
+
+
+def test_corrects_up_to_nsym_half_errors():
+    codec = ReedSolomon(4)
+    msg = bytearray(os.urandom(20))
+    word = bytearray(codec.encode(msg))
+    word[3] ^= 0x55
+    word[17] ^= 0x01
+    assert bytes(codec.decode(word)) == bytes(msg)
+
+
+def test_too_many_errors_raise():
+    codec = ReedSolomon(4)
+    word = bytearray(codec.encode(bytearray(20)))
+    for i in (1, 5, 9):
+        word[i] ^= 0xFF
+    with pytest.raises(ReedSolomonError):
+        codec.decode(word)
@@ -0,0 +1,105 @@
+"""Lector MFRC522 compartido con sesion por tarjeta [user-018]."""
+import fake_rc522
+import mfrc522
+from rfid_reader import RFIDReader
+
+KEY = [0xFF] * 6
+NEW_KEY = list(range(16))
+
+
+def card(chip):
+    chip.card = fake_rc522.Card()
+    chip.card.blocks[8] = list(range(100, 116))
+    return chip.card
+
+
+def legacy_access(block, data=None):
+    """Referencia del codigo anterior: un MFRC522 nuevo (reset + init) en cada acceso"""
+    rdr = mfrc522.MFRC522(sck=6, miso=4, mosi=7, cs=5, rst=8)
+    (stat, tag_type) = rdr.request(rdr.REQIDL)
+    assert stat == rdr.OK
+    (stat, raw_uid) = rdr.anticoll()
+    assert stat == rdr.OK
+    assert rdr.select_tag(raw_uid) == rdr.OK
+    assert rdr.auth(rdr.AUTHENT1A, block, KEY, raw_uid) == rdr.OK
+    if data is None:
+        return rdr.read(block)
+    stat = rdr.write(block, data)
+    rdr.stop_crypto1()
+    return stat
+
+
+def test_spi_frames_before_and_after_session(chip, capsys):
+    card(chip)
+    # Antes: leer la tarjeta y escribir la llave nueva con dos lectores nuevos
+    frames = chip.frames
+    assert legacy_access(8) == list(range(100, 116))
+    read_before = chip.frames - frames
+    chip.card.state = 'IDLE'  # El lector nuevo resetea el chip y apaga el campo
+    assert legacy_access(8, NEW_KEY) == mfrc522.MFRC522.OK
+    pair_before = chip.frames - frames
+
+    card(chip)
+    reader = RFIDReader.shared()
+    frames = chip.frames
+    stat, uid = reader.poll()
+    assert stat == reader.OK and uid is not None
+    assert reader.transact(8) == (reader.OK, list(range(100, 116)))
+    read_after = chip.frames - frames
+    # La escritura va en la misma sesion: sin poll ni autenticacion de nuevo
+    assert reader.transact(8, NEW_KEY) == (reader.OK, None)
+    pair_after = chip.frames - frames
+    assert chip.card.blocks[8] == NEW_KEY
+    assert reader.spi_transactions >= pair_after
+    with capsys.disabled():
+        print(f"\ntramas SPI: lectura {read_before} -> {read_after}, "
+              f"lectura + escritura {pair_before} -> {pair_after}")
+    assert read_after < read_before
+    assert pair_after < pair_before
+
+
+def test_same_sector_is_authenticated_once(chip, monkeypatch):
+    card(chip)
+    reader = RFIDReader.shared()
+    auths = []
+    real = reader.rdr.auth
+    monkeypatch.setattr(reader.rdr, 'auth', lambda *a: auths.append(a[1]) or real(*a))
+    for block in (8, 9, 10, 12):
+        stat, data = reader.transact(block)
+        assert stat == reader.OK
+    assert auths == [8, 12]  # Sector 2 una vez, luego sector 3
+
+
+def test_end_releases_the_card(chip):
+    tag = card(chip)
+    reader = RFIDReader.shared()
+    assert reader.transact(8)[0] == reader.OK
+    assert reader.session and reader.auth_sector == 2 and reader.raw_uid is not None
+    assert chip.regs[0x08] & 0x08  # Crypto1 encendido
+    reader.end()
+    assert not reader.session
+    assert reader.auth_sector is None and reader.raw_uid is None
+    assert not chip.regs[0x08] & 0x08
+    assert tag.state == 'IDLE' and chip.field
+    # La siguiente operacion vuelve a seleccionar la tarjeta
+    assert reader.transact(8) == (reader.OK, list(range(100, 116)))
+    assert reader.session
+
+
+def test_poll_ends_the_previous_session(chip):
+    card(chip)
+    reader = RFIDReader.shared()
+    assert reader.transact(8)[0] == reader.OK
+    stat, uid = reader.poll()
+    assert stat == reader.OK and reader.auth_sector is None
+    chip.card = None
+    assert reader.poll() == (reader.NOTAGERR, None)
+    assert not reader.session and reader.raw_uid is None
+
+
+def test_auth_failure_ends_the_session(chip, monkeypatch):
+    card(chip)
+    reader = RFIDReader.shared()
+    monkeypatch.setattr(reader.rdr, 'auth', lambda *a: reader.rdr.ERR)
+    assert reader.transact(8) == (reader.AUTHERR, None)
+    assert not reader.session and reader.auth_sector is None
@@ -0,0 +1,173 @@
+"""CRC por pagina, scrubber en segundo plano y validacion al arrancar [user-014]."""
+import pytest
+
+import utime
+from DatabaseManager import DatabaseManager
+from reed_solomon import ReedSolomonSimple as RS
+from scrubber import CrcTable, Scrubber, crc16, correct_single_bit
+
+MASTER = bytes(RS.pseudo_encrypt(bytes(range(16)), 32))
+
+
+@pytest.fixture
+def db(database):
+    """Cerradura con tabla de asignacion (CRC y journal) y un usuario inscrito"""
+    database.save_general_info("T1-101    ", MASTER)
+    database.buffer = b'C' * 16
+    assert database.save_user_info("4321".ljust(16), "0123456789abcdef", "Ana")
+    assert database.scrubber is not None
+    return database
+
+
+def user_page(db):
+    return db.layout.users.start + db.resolve_credential("4321".ljust(16))[1]
+
+
+def flip(bus, page, byte, bit=0):
+    bus.mem[page * 64 + byte] ^= 1 << bit
+
+
+def test_crc_is_never_zero():
+    assert CrcTable.compute(b'') != 0
+    data = bytes(64)
+    assert CrcTable.compute(data) == (crc16(data) or 1)
+
+
+@pytest.mark.parametrize("bit", [0, 7, 200, 511])
+def test_correct_single_bit_every_position(bit):
+    good = bytearray(range(64))
+    bad = bytearray(good)
+    bad[bit >> 3] ^= 0x80 >> (bit & 7)
+    assert correct_single_bit(bad, crc16(bad) ^ crc16(good)) == bit
+    assert bad == good
+
+
+def test_single_bit_flip_is_detected_and_repaired(db, bus):
+    page = user_page(db)
+    good = bytes(bus.mem[page * 64:page * 64 + 64])
+    db.eeprom.cache.invalidate(page)
+    flip(bus, page, 20, 3)
+    assert db.scrubber.check(page)
+    assert db.scrubber.repaired == 1
+    assert bytes(bus.mem[page * 64:page * 64 + 64]) == good
+    assert not db.scrubber.is_bad(page)
+
+
+def test_multi_bit_error_repaired_from_clean_cached_copy(db, bus):
+    page = user_page(db)
+    cached = bytes(db.eeprom.cache.read(page))
+    assert page not in db.eeprom.cache.dirty
+    flip(bus, page, 5, 1)
+    flip(bus, page, 40, 6)
+    assert db.scrubber.check(page)
+    assert db.scrubber.repaired == 1
+    assert bytes(bus.mem[page * 64:page * 64 + 64]) == cached
+
+
+def test_stale_cached_copy_is_not_used(db, bus):
+    page = user_page(db)
+    db.eeprom.cache.read(page)[0] ^= 0xFF  # Copia en RAM que tampoco cuadra con el CRC
+    flip(bus, page, 5, 1)
+    flip(bus, page, 40, 6)
+    before = bytes(bus.mem[page * 64:page * 64 + 64])
+    assert not db.scrubber.check(page)
+    assert db.scrubber.repaired == 0
+    assert bytes(bus.mem[page * 64:page * 64 + 64]) == before
+
+
+def test_health_bitmap_marks_and_clears(db, bus):
+    reported = []
+    scrubber = db.scrubber
+    scrubber.on_bad = reported.append
+    page = user_page(db)
+    db.eeprom.cache.invalidate(page)
+    flip(bus, page, 5, 1)
+    flip(bus, page, 40, 6)
+    assert not scrubber.check(page)
+    assert scrubber.is_bad(page)
+    assert scrubber.bad_pages() == [page]
+    assert not scrubber.check(page)
+    assert reported == [page]  # Solo se reporta la primera vez
+    # Una escritura nueva actualiza el CRC y la pagina vuelve a estar sana
+    db.eeprom.save(b'U' * 64, page)
+    assert scrubber.check(page)
+    assert not scrubber.is_bad(page)
+    assert scrubber.bad_pages() == []
+    scrubber._mark(page + 1, True)
+    assert scrubber.is_bad(page + 1) and not scrubber.is_bad(page)
+    scrubber._mark(page + 1, False)
+    assert not any(scrubber.health)
+
+
+def test_dirty_page_is_skipped(db, bus):
+    page = user_page(db)
+    with db.eeprom.cache:
+        db.eeprom.partial_data(page, 0, b'X' * 16)
+        flip(bus, page, 40, 6)
+        flip(bus, page, 41, 6)
+        assert db.scrubber.check(page)
+    assert not db.scrubber.is_bad(page)
+
+
+def test_tick_is_rate_limited(db, monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(utime, 'ticks_ms', lambda: now[0])
+    scrubber = Scrubber(db.eeprom, db.eeprom.cache.crc, pages_per_tick=3, interval_ms=250)
+    reads = db.eeprom.control.i2c.reads
+    assert scrubber.tick() == 3
+    assert db.eeprom.control.i2c.reads - reads == 3
+    assert scrubber.tick() == 0
+    now[0] += 249
+    assert scrubber.tick() == 0
+    now[0] += 1
+    assert scrubber.tick() == 3
+    assert scrubber.cursor == 6
+    # Una vuelta completa a las paginas protegidas
+    total = len(scrubber.order)
+    while scrubber.passes == 0:
+        now[0] += 250
+        assert scrubber.tick() == 3
+    assert scrubber.cursor == (6 + 3 * ((total - 6 + 2) // 3)) % total
+
+
+def test_unwritten_table_is_adopted_in_one_write_per_page(db, bus):
+    crc = db.eeprom.cache.crc
+    start, n = crc.start_page, crc.n_pages
+    bus.mem[start * 64:(start + n) * 64] = b'0' * 64 * n  # Tabla nunca escrita
+    db.eeprom.cache.invalidate()
+    fresh = CrcTable(db.eeprom, db.layout.crc, [db.layout.users])
+    assert fresh.missing_magic
+    db.eeprom.attach_crc(fresh)
+    scrubber = Scrubber(db.eeprom, fresh)
+    del bus.written_pages[:]
+    pages = list(range(db.layout.users.start, db.layout.users.end))
+    assert scrubber.verify(pages) == []
+    assert not scrubber.adopted
+    written = sorted(set(bus.written_pages))
+    assert written == sorted(set([start] + [start + (4 + 2 * p) // 64 for p in pages]))
+    assert len(bus.written_pages) == len(written)
+    # Al volver a leer la tabla ya tiene magic y los CRC de cada pagina
+    again = CrcTable(db.eeprom, db.layout.crc, [db.layout.users])
+    assert not again.missing_magic
+    for page in pages:
+        assert again.tag(page) == CrcTable.compute(bus.mem[page * 64:page * 64 + 64])
+
+
+def test_boot_verify_repairs_and_reports(db, bus):
+    layout = db.layout
+    cred = layout.cred_index.start
+    admin = layout.admin.start
+    db.save_admin_pswd("9876".ljust(16))
+    assert db.eeprom.cache.crc.tag(cred) and db.eeprom.cache.crc.tag(admin)
+    flip(bus, cred, 1, 4)  # Un bit: se corrige
+    flip(bus, admin, 2, 0)  # Varios bits: se reporta
+    flip(bus, admin, 30, 5)
+    good_cred = db.eeprom.cache.crc.tag(cred)
+    logs = db.log_ring.count()
+    again = DatabaseManager()
+    again.read_general_info()
+    assert again.scrubber.repaired == 1
+    assert CrcTable.compute(bus.mem[cred * 64:cred * 64 + 64]) == good_cred
+    assert again.scrubber.bad_pages() == [admin]
+    assert again.resolve_credential("4321".ljust(16))[1] == user_page(db) - layout.users.start
+    assert again.log_ring.count() == logs + 1  # "pagina dañada"
@@ -0,0 +1,102 @@
+"""Cifrado por segmentos completos en secure_save/secure_decode [user-016]."""
+import time
+
+import pytest
+
+import cryptolib
+from CAT24C256 import EEPROMManager
+
+KEY16 = b'K' * 16
+KEY32 = bytes(range(32))
+SEGMENTS = [{'key': KEY16, 'start': 0, 'end': 32}, {'key': KEY32, 'start': 32, 'end': 64}]
+
+
+@pytest.fixture
+def eeprom(bus):
+    return EEPROMManager(0x50, 512, 1, 0, 0, i2c=bus)
+
+
+def legacy_secure_save(eeprom, keys, data, page):
+    """Referencia del codigo anterior: un cifrado por bloque y una escritura por segmento"""
+    data = data.encode('utf-8')
+    consumed = 0
+    for segment in keys:
+        aes = cryptolib.aes(segment['key'], 1)
+        length = segment['end'] - segment['start']
+        chunk = data[consumed:consumed + length]
+        consumed += length
+        encrypted = bytearray()
+        for i in range(0, length, 16):
+            block = chunk[i:i + 16]
+            block += b'\x00' * (16 - len(block))
+            encrypted.extend(aes.encrypt(block))
+        eeprom.partial_data(page, segment['start'], encrypted)
+
+
+class Counting:
+    """Cuenta las llamadas a encrypt/decrypt de cryptolib.aes"""
+
+    def __init__(self, monkeypatch):
+        self.calls = 0
+        real = cryptolib.aes
+        counter = self
+
+        class aes(real):
+            def encrypt(self, data, out=None):
+                counter.calls += 1
+                return real.encrypt(self, data, out)
+
+            decrypt = encrypt
+
+        monkeypatch.setattr(cryptolib, 'aes', aes)
+
+
+def test_round_trip_across_two_segments(eeprom, bus):
+    text = "Departamento 101" + "Torre Norte" + "Llave maestra 32 bytes ok"
+    eeprom.secure_save(SEGMENTS, text, 7)
+    raw = bytes(bus.mem[7 * 64:8 * 64])
+    assert text.encode() not in raw
+    assert raw[:16] != raw[32:48]  # Cada segmento con su llave
+    assert eeprom.secure_read(SEGMENTS, 7).rstrip('\x00') == text
+    # Lo mismo descifrando una pagina ya leida con read_range
+    pages = eeprom.read_range(6, 3)
+    assert eeprom.secure_decode(SEGMENTS, pages[64:128]).rstrip('\x00') == text
+
+
+def test_segment_offsets_are_page_offsets(eeprom, bus):
+    keys = [{'key': KEY16, 'start': 16, 'end': 32}, {'key': KEY16, 'start': 48, 'end': 64}]
+    eeprom.save(b'P' * 64, 3)
+    eeprom.secure_save(keys, "A" * 16 + "B" * 16, 3)
+    raw = bytes(bus.mem[3 * 64:4 * 64])
+    assert raw[:16] == b'P' * 16 and raw[32:48] == b'P' * 16
+    assert eeprom.secure_read(keys, 3) == "A" * 16 + "B" * 16
+
+
+def test_wrong_key_drops_invalid_blocks(eeprom):
+    eeprom.secure_save(SEGMENTS[:1], "secreto de prueba 32 bytes......", 9)
+    wrong = [{'key': b'X' * 16, 'start': 0, 'end': 32}]
+    assert eeprom.secure_read(wrong, 9) != "secreto de prueba 32 bytes......"
+
+
+def test_bench_per_page_cost(eeprom, bus, monkeypatch, capsys):
+    counting = Counting(monkeypatch)
+    text = "u" * 64
+    pages = range(10, 42)
+    results = {}
+    for name, save in (("antes", lambda p: legacy_secure_save(eeprom, SEGMENTS, text, p)),
+                       ("despues", lambda p: eeprom.secure_save(SEGMENTS, text, p))):
+        counting.calls = 0
+        writes = bus.writes
+        start = time.perf_counter()
+        for page in pages:
+            save(page)
+        elapsed = (time.perf_counter() - start) / len(pages)
+        results[name] = ((bus.writes - writes) / len(pages), counting.calls / len(pages), elapsed)
+        for page in pages:
+            assert eeprom.secure_read(SEGMENTS, page) == text
+    with capsys.disabled():
+        for name, (writes, calls, elapsed) in results.items():
+            print(f"\nsecure_save {name}: {writes:.0f} escrituras, {calls:.0f} llamadas AES, "
+                  f"{elapsed * 1e6:.0f} us por pagina")
+    assert results["antes"][:2] == (2, 4)
+    assert results["despues"][:2] == (1, 2)
@@ -0,0 +1,129 @@
+"""Lectura de texto UTF-8 de las paginas [user-017]."""
+import os
+import random
+import time
+import tracemalloc
+
+import pytest
+
+from CAT24C256 import decode_text, utf8_prefix
+
+
+def strict_prefix(data):
+    # Referencia: el decodificador estricto de CPython
+    try:
+        data.decode('utf-8')
+        return len(data)
+    except UnicodeDecodeError as e:
+        return e.start
+
+
+@pytest.mark.parametrize("data", [
+    b'\xc0\xaf',              # '/' demasiado largo (2 bytes)
+    b'\xc1\xbf',
+    b'\xe0\x80\xaf',          # '/' demasiado largo (3 bytes)
+    b'\xe0\x9f\xbf',
+    b'\xf0\x80\x80\xaf',      # '/' demasiado largo (4 bytes)
+    b'\xf0\x8f\xbf\xbf',
+    b'\xed\xa0\x80',          # Sustituto D800
+    b'\xed\xbf\xbf',          # Sustituto DFFF
+    b'\xf4\x90\x80\x80',      # Mayor que U+10FFFF
+    b'\xf5\x80\x80\x80',
+    b'\xe2\x28\xa1',          # Continuacion invalida
+    b'\xe2\x82',              # Secuencia cortada
+])
+def test_rejects_invalid_sequences(data):
+    page = b'Depto ' + data + b'A'
+    assert utf8_prefix(page) == 6
+    assert decode_text(page) == 'Depto '
+
+
+def test_accepts_valid_boundaries():
+    text = 'ñࠀ퟿￿\U00010000\U0010ffff'
+    data = text.encode('utf-8')
+    assert utf8_prefix(data) == len(data)
+    assert decode_text(data) == text
+
+
+def test_matches_strict_decoder_on_random_pages():
+    rnd = random.Random(17)
+    alphabet = [b'a', b'\xc3\xb1', b'\xe2\x82\xac', b'\xf0\x9f\x94\x91']
+    for _ in range(3000):
+        if rnd.random() < 0.5:
+            data = os.urandom(rnd.randrange(1, 65))
+        else:
+            # Texto valido con un byte cambiado en algun lugar
+            data = bytearray(b''.join(rnd.choice(alphabet) for _ in range(20)))
+            data[rnd.randrange(len(data))] = rnd.randrange(256)
+            data = bytes(data)
+        assert utf8_prefix(data) == strict_prefix(data), data
+        assert decode_text(data) == data[:strict_prefix(data)].decode('utf-8')
+
+
+def test_validation_does_not_allocate():
+    page = memoryview(bytearray('Torre 3 - Depto 101 ñandú'.encode('utf-8').ljust(64)))
+    utf8_prefix(page)
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(1000):
+        utf8_prefix(page, 0, 64)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"\nutf8_prefix: {elapsed * 1e3:.3f} us por pagina, pico {peak} bytes")
+    assert peak < 1024
+
+
+def legacy_read(eeprom, page):
+    # Referencia del read() anterior: un objeto bytes y un decode por cada byte
+    decoded_string = ''
+    temp_data = b''
+    for byte in bytes(eeprom.cache.read(page)):
+        temp_data += bytes([byte])
+        try:
+            decoded_string += temp_data.decode('utf-8')
+            temp_data = b''
+        except Exception:
+            pass
+    return decoded_string if decoded_string else None
+
+
+def peak_per_call(fn, n=50):
+    """Pico de memoria (bytes) de una llamada, con la pagina ya en cache"""
+    fn()
+    tracemalloc.start()
+    worst = 0
+    start = time.perf_counter()
+    for _ in range(n):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        worst = max(worst, tracemalloc.get_traced_memory()[1] - base)
+    elapsed = (time.perf_counter() - start) / n
+    tracemalloc.stop()
+    return worst, elapsed
+
+
+def test_reader_paths_allocations(database, capsys):
+    eeprom = database.eeprom
+    page = database.gral_start_page
+    text = 'Torre 3 - Depto 101 ñandú'.encode('utf-8')
+    eeprom.save(text + b'\xff' * (64 - len(text)), 40)  # Texto con basura al final
+    assert eeprom.read(40) == legacy_read(eeprom, 40) == text.decode('utf-8')
+    results = {
+        'read() anterior': peak_per_call(lambda: legacy_read(eeprom, 40)),
+        'read()': peak_per_call(lambda: eeprom.read(40)),
+        'read_fields': peak_per_call(lambda: eeprom.read_fields(page, '18s32s', 14)),
+        'read_general_info': peak_per_call(database.read_general_info),
+    }
+    capsys.readouterr()  # read_general_info imprime los campos
+    with capsys.disabled():
+        print()
+        for name, (peak, elapsed) in results.items():
+            print(f"{name}: pico {peak} bytes, {elapsed * 1e6:.1f} us por llamada")
+    # El read() anterior libera sus objetos de inmediato: el pico es moderado pero
+    # crea dos bytes y un decode por cada byte de la pagina
+    assert results['read()'][0] < results['read() anterior'][0]
+    assert results['read()'][1] * 5 < results['read() anterior'][1]
+    assert results['read_fields'][0] < 256
+    assert results['read_general_info'][0] < 4096
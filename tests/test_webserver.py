@@ -0,0 +1,175 @@
+"""Servidor web con uasyncio.start_server [user-025]."""
+import asyncio
+import sys
+import time
+
+from webserver import WebServer
+
+REQUEST = b"GET /nada HTTP/1.1\r\nHost: pico\r\n\r\n"
+
+
+class Wifi:
+    timeout = 3600
+
+    def check_clients(self):
+        return True
+
+    def stop_ap(self):
+        pass
+
+
+class Db:
+    flags = b'1'
+
+
+def make_server(monkeypatch):
+    ws = WebServer(Wifi(), [{}, {}], 0, database=Db())
+    ws.PORT = 0
+    ws.POLL_MS = 10
+    monkeypatch.setattr('builtins.print', lambda *a, **k: None)
+    return ws
+
+
+async def serve(ws):
+    task = asyncio.ensure_future(ws.start_server())
+    while ws.server is None:
+        await asyncio.sleep(0)
+    return task, ws.server.sockets[0].getsockname()[1]
+
+
+async def stop(ws, task):
+    ws.continue_flag = False
+    await asyncio.wait_for(task, 2)
+
+
+async def get(reader, writer):
+    writer.write(REQUEST)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+    await reader.readexactly(length)
+    return head
+
+
+def test_load_keep_alive(monkeypatch, capsys):
+    ws = make_server(monkeypatch)
+    peak = [0]
+    handle = ws.handle_request
+
+    def counted(request):
+        peak[0] = max(peak[0], ws.clients)
+        return handle(request)
+    ws.handle_request = counted
+
+    async def client(port, n, times):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        served = 0
+        while served < n:
+            start = time.perf_counter()
+            head = await get(reader, writer)
+            times.append(time.perf_counter() - start)
+            served += 1
+            if b"Connection: close" in head:
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    async def main():
+        task, port = await serve(ws)
+        times = []
+        start = time.perf_counter()
+        await asyncio.gather(*[client(port, 50, times) for _ in range(ws.MAX_CLIENTS)])
+        elapsed = time.perf_counter() - start
+        await stop(ws, task)
+        return times, elapsed
+
+    times, elapsed = asyncio.run(main())
+    times.sort()
+    p99 = times[int(len(times) * 0.99) - 1] * 1000
+    with capsys.disabled():
+        sys.stdout.write(f"\nweb: {len(times) / elapsed:.0f} req/s, p99 {p99:.1f} ms, {ws.MAX_CLIENTS} clientes\n")
+    assert len(times) == 50 * ws.MAX_CLIENTS
+    assert peak[0] <= ws.MAX_CLIENTS
+
+
+def test_waiting_client_gets_freed_slot_without_polling(monkeypatch):
+    ws = make_server(monkeypatch)
+
+    async def main():
+        task, port = await serve(ws)
+        held = [await asyncio.open_connection('127.0.0.1', port) for _ in range(ws.MAX_CLIENTS)]
+        while ws.clients < ws.MAX_CLIENTS:
+            await asyncio.sleep(0.001)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(REQUEST)
+        await writer.drain()
+        while not ws.waiting:
+            await asyncio.sleep(0.001)
+        start = time.perf_counter()
+        held[0][1].close()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 1)
+        waited = time.perf_counter() - start
+        writer.close()
+        for r, w in held[1:]:
+            w.close()
+        await stop(ws, task)
+        return head, waited
+
+    head, waited = asyncio.run(main())
+    assert not head.startswith(b"HTTP/1.1 503")
+    assert waited < 0.1
+
+
+def test_full_server_answers_503(monkeypatch):
+    ws = make_server(monkeypatch)
+    ws.REQUEST_TIMEOUT_MS = 50
+
+    async def main():
+        task, port = await serve(ws)
+        ws.clients = ws.MAX_CLIENTS  # Todos los lugares ocupados
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 1)
+        writer.close()
+        ws.clients = 0
+        await stop(ws, task)
+        return head
+
+    assert asyncio.run(main()).startswith(b"HTTP/1.1 503")
+
+
+def test_idle_keep_alive_gives_up_its_slot(monkeypatch):
+    ws = make_server(monkeypatch)
+    ws.KEEPALIVE_MS = 5000  # Mucho mayor que lo que debe esperar el cliente nuevo
+
+    async def main():
+        task, port = await serve(ws)
+        held = []
+        for _ in range(ws.MAX_CLIENTS):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            head = await get(reader, writer)
+            assert b"Connection: keep-alive" in head
+            held.append((reader, writer))
+        while len(ws.idle) < ws.MAX_CLIENTS:
+            await asyncio.sleep(0.001)
+        assert ws.clients == ws.MAX_CLIENTS
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        head = await asyncio.wait_for(get(reader, writer), 1)
+        waited = time.perf_counter() - start
+        # Solo se cerro una de las conexiones inactivas
+        closed = 0
+        for r, w in held:
+            try:
+                closed += await asyncio.wait_for(r.read(1), 0.05) == b""
+            except asyncio.TimeoutError:
+                pass
+        writer.close()
+        for r, w in held:
+            w.close()
+        await stop(ws, task)
+        return head, waited, closed
+
+    head, waited, closed = asyncio.run(main())
+    assert not head.startswith(b"HTTP/1.1 503")
+    assert waited < 0.2
+    assert closed == 1
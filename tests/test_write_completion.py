@@ -0,0 +1,98 @@
+"""Fin de escritura por sondeo de ACK con tWR variable [user-003]."""
+import random
+
+import pytest
+
+import CAT24C256 as eeprom_module
+from CAT24C256 import CAT24C256, AckPollCompletion, SleepCompletion
+from fake_i2c import FakeEEPROM
+
+
+class Clock:
+    """Reloj falso en microsegundos; dormir lo adelanta"""
+
+    def __init__(self, monkeypatch):
+        self.us = 0
+        t = eeprom_module.time
+        monkeypatch.setattr(t, 'ticks_us', lambda: self.us)
+        monkeypatch.setattr(t, 'sleep_us', self.sleep_us)
+        monkeypatch.setattr(t, 'sleep_ms', lambda ms: self.sleep_us(ms * 1000))
+
+    def sleep_us(self, us):
+        self.us += us
+
+
+class TimedEEPROM(FakeEEPROM):
+    """EEPROM que no responde hasta que pasa su tWR; cada sondeo cuesta poll_us"""
+
+    def __init__(self, clock, t_wr_us, poll_us=100):
+        FakeEEPROM.__init__(self)
+        self.clock = clock
+        self.t_wr_us = t_wr_us
+        self.poll_us = poll_us
+        self.ready_at = 0
+
+    def writeto_mem(self, addr, mem, buf, addrsize=16):
+        if self.clock.us < self.ready_at:
+            raise OSError(5)
+        FakeEEPROM.writeto_mem(self, addr, mem, buf, addrsize)
+        self.ready_at = self.clock.us + self.t_wr_us()
+
+    def writeto(self, addr, buf, stop=True):
+        self.polls += 1
+        self.clock.us += self.poll_us
+        if self.clock.us < self.ready_at:
+            raise OSError(5)
+        return 0
+
+
+def test_ack_poll_waits_for_busy_chip():
+    bus = FakeEEPROM(busy_polls=3)
+    chip = CAT24C256(bus, 0x50, completion=AckPollCompletion())
+    for page in range(10):
+        chip.write(page * 64, b'A' * 64)
+    stats = chip.write_stats()
+    assert bus.polls == 10 * 4  # 3 sin ACK y el que responde
+    assert stats['count'] == 10
+    assert stats['timeouts'] == 0
+
+
+def test_ack_poll_falls_back_when_chip_never_answers(monkeypatch):
+    clock = Clock(monkeypatch)
+    bus = TimedEEPROM(clock, lambda: 50000)
+    chip = CAT24C256(bus, 0x50, completion=AckPollCompletion(timeout_ms=10, fallback_ms=5))
+    chip.write(0, b'A' * 64)
+    stats = chip.write_stats()
+    assert stats['timeouts'] == 1
+    assert stats['last_us'] >= 15000
+
+
+def test_ack_poll_beats_fixed_sleep_with_variable_twr(monkeypatch):
+    clock = Clock(monkeypatch)
+    rnd = random.Random(3)
+
+    def t_wr():
+        return rnd.randrange(1500, 5000)  # tWR real: normalmente bastante menos que el maximo
+
+    results = {}
+    for name, completion in (('ack', AckPollCompletion()), ('sleep', SleepCompletion())):
+        bus = TimedEEPROM(clock, t_wr)
+        chip = CAT24C256(bus, 0x50, completion=completion)
+        start = clock.us
+        for page in range(100):
+            chip.write(page * 64, bytes([page]) * 64)
+        results[name] = (clock.us - start) / 100
+        assert chip.write_stats()['count'] == 100
+        assert bytes(bus.mem[99 * 64:100 * 64]) == bytes([99]) * 64
+    print(f"\ntWR variable: sondeo ACK {results['ack']:.0f} us/escritura, "
+          f"espera fija {results['sleep']:.0f} us/escritura")
+    assert results['ack'] < results['sleep']
+
+
+@pytest.mark.parametrize("profile", sorted(eeprom_module.CHIP_PROFILES))
+def test_profiles_complete_writes(profile):
+    bus = FakeEEPROM(busy_polls=2)
+    chip = CAT24C256.from_profile(bus, 0x50, profile)
+    chip.write(64, b'P' * 64)
+    assert bytes(bus.mem[64:128]) == b'P' * 64
+    assert chip.write_stats()['count'] == 1
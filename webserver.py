@@ -1,11 +1,10 @@
 import network
-import socket
 import ure
 import time
 import utime
 import uasyncio as asyncio
 from machine import Pin
-import mfrc522
+from rfid_reader import RFIDReader
 from ucryptolib import aes
 import random
 from DatabaseManager import DatabaseManager as db
@@ -14,8 +13,8 @@ import rtc_config
 
 class NFCReader:
     def __init__(self):
-        # Inicializa el lector MFRC522 solo una vez
-        self.rdr = mfrc522.MFRC522(sck=6, miso=4, mosi=7, cs=5, rst=8)
+        # El lector MFRC522 se comparte con main.py y se inicializa una sola vez
+        self.rdr = RFIDReader.shared()
     
     def random_shuffle(self, cadena, semilla=None):
         """
@@ -72,22 +71,12 @@ class NFCReader:
         :param block: Bloque donde se escribirán los datos (default: 8).
         :return: True si se escribió con éxito, False en caso contrario.
         """
-        self.rdr = mfrc522.MFRC522(sck=6, miso=4, mosi=7, cs=5, rst=8)
-        (stat, tag_type) = self.rdr.request(self.rdr.REQIDL)
+        # Se escribe en la tarjeta que dejo seleccionada ReadData (o se busca de nuevo)
+        (stat, data) = self.rdr.transact(block, databytes)
         if stat == self.rdr.OK:
-            (stat, raw_uid) = self.rdr.anticoll()
-            if stat == self.rdr.OK:
-                if self.rdr.select_tag(raw_uid) == self.rdr.OK:
-                    key = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]  # Clave de autenticación
-                    if self.rdr.auth(self.rdr.AUTHENT1A, 12, key, raw_uid) == self.rdr.OK:
-                        stat = self.rdr.write(12, databytes)
-                        self.rdr.stop_crypto1()
-                        if stat == self.rdr.OK:
-                            return True
-                        else:
-                            print("FAILED")
-                else:
-                    print("Failed to select tag")
+            return True
+        elif stat == self.rdr.ERR:
+            print("FAILED")
         print("")
         return False
 
@@ -96,19 +85,14 @@ class NFCReader:
         Lee los datos de la tarjeta RFID.
         
         """
-        (stat, tag_type) = self.rdr.request(self.rdr.REQIDL)
+        (stat, raw_uid) = self.rdr.poll()
         if stat == self.rdr.OK:
-            (stat, raw_uid) = self.rdr.anticoll()
+            uid = "%02x%02x%02x%02x" % (raw_uid[0], raw_uid[1], raw_uid[2], raw_uid[3])
+            (stat, data) = self.rdr.transact(block)
             if stat == self.rdr.OK:
-                uid = "%02x%02x%02x%02x" % (raw_uid[0], raw_uid[1], raw_uid[2], raw_uid[3])
-                if self.rdr.select_tag(raw_uid) == self.rdr.OK:
-                    key = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]  # Clave de autenticación
-                    if self.rdr.auth(self.rdr.AUTHENT1A, block, key, raw_uid) == self.rdr.OK:
-                        return uid
-                    else:
-                        print("AUTH ERR")
-                else:
-                    print("Failed to select tag")
+                return uid
+        elif stat == self.rdr.ERR:
+            print("Failed to select tag")
 
 nfc = NFCReader()
 
@@ -184,12 +168,27 @@ class WiFiManager:
 
 class WebServer:
 
-    def __init__(self, wifi_manager, routes, modo_setup):
+    PORT = 80
+    MAX_CLIENTS = 4  # Conexiones atendidas a la vez; las demas esperan lugar (o reciben 503)
+    REQUEST_TIMEOUT_MS = 5000  # Tiempo maximo para recibir una solicitud completa
+    KEEPALIVE_MS = 2000  # Tiempo que se espera la siguiente solicitud en la misma conexion
+    KEEPALIVE_MAX = 20  # Solicitudes por conexion antes de cerrarla
+    MAX_HEADER = 2048
+    MAX_BODY = 2048
+    POLL_MS = 200  # Revision del tiempo de espera y de la señal de salida
+
+    def __init__(self, wifi_manager, routes, modo_setup, database=None):
         self.wifi_manager = wifi_manager
         self.routes_map = routes[modo_setup]
-        self.db=db()
-        self.db.read_general_info()
-        self.server_socket = None
+        if database is None:
+            database = db()
+            database.read_general_info()
+        self.db = database
+        self.server = None
+        self.clients = 0  # Conexiones abiertas
+        self.waiting = 0  # Conexiones esperando lugar
+        self.slot_free = asyncio.Event()  # Se activa al cerrar una conexion si alguien espera
+        self.idle = {}  # reader -> tarea que espera la siguiente solicitud en keep-alive
         self.continue_flag = True
     
     def url_get(self, request, parametro):
@@ -211,10 +210,10 @@ class WebServer:
         print(f"Padded Data: {padded_data}")
         return padded_data.decode('latin-1')
 
-    async def handle_request(self, client_socket):
+    def handle_request(self, request):
+        """Atiende una solicitud ya leida completa y regresa la respuesta"""
         try:
             prim_config = 1 if self.db.flags[0] == 49 else 0
-            request = client_socket.recv(1024).decode('utf-8')
             route_get = ure.search(r"GET (/[^ ]*)", request)
             route_post = ure.search(r"POST (/[^ ]*)", request)
 
@@ -236,13 +235,18 @@ class WebServer:
                     
                     elif path == '/log':
                         print(f"Request: {route_get.group(1)}")
-                        print(f"Request split: {route_get.group(1).split("?", 1)[1]}")
-                        req_split = route_get.group(1).split("?", 1)[1]
+                        req_split = route_get.group(1).split("?", 1)
+                        req_split = req_split[1] if len(req_split) > 1 else ""
                         log_type = self.url_get(req_split,'type')
-                        print(f"Log type: {type}")
-                        log = self.db.create_log_array(number=10,kindof = log_type)
+                        cursor = self.url_get(req_split,'cursor')
+                        print(f"Log type: {log_type} cursor: {cursor}")
+                        cursor = int(cursor) if cursor else None
+                        log = self.db.create_log_array(number=10,kindof = log_type, cursor=cursor)
                         print(f"Log Array: {log}")
-                        response = self.generate_web_page(html_template, log=log)
+                        next_link = ""
+                        if self.db.log_cursor is not None:
+                            next_link = f"/log?type={log_type or ''}&cursor={self.db.log_cursor}"
+                        response = self.generate_web_page(html_template, log=log, next_link=next_link)
                     
                     elif path == '/baja':
                         print(f"Request: {route_get.group(1)}")
@@ -273,7 +277,7 @@ class WebServer:
                     numdep = self.url_get(request,'numdep')
                     dat_depto = self.pad_data(f"{torre}-{numdep}",10)
                     key = nfc.bytes_random(16)
-                    raw_key = RS.pseudo_encrypt(key)
+                    raw_key = RS.pseudo_encrypt(key, 32)
                     raw_key = bytes(raw_key)
                     self.db.save_general_info(dat_depto, raw_key)
                     response = 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"status": "success", "message": "Configuracion incial exitosa"}'
@@ -283,9 +287,11 @@ class WebServer:
                     password = self.url_get(request,'password')
                     password = self.pad_data(password, 16)
                     apikey = self.url_get(request,'apikey')
-                    self.db.save_phone(phone, True)
-                    self.db.save_api(apikey, 10)
-                    self.db.save_admin_pswd(password)
+                    # Telefono, apikey y contraseña se guardan en una sola transaccion
+                    with self.db.transaction():
+                        self.db.save_phone(phone, True)
+                        self.db.save_api(apikey, self.db.api_key_page)
+                        self.db.save_admin_pswd(password)
                     response = 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"status": "success", "message": "Alta de admin realizada con éxito."}'
             
                 elif path == "/nfc-scan":
@@ -299,25 +305,141 @@ class WebServer:
                     phone = self.url_get(request, 'phone')
                     password = self.url_get(request,'password')
                     password = self.pad_data(password,16)
-                    self.db.save_phone(phone)
                     apikey = self.url_get(request,'apikey')
                     uid = self.url_get(request,'uid')
                     uid = self.pad_data(uid,16)
-                    self.db.save_user_info(password, uid, apikey)
+                    # Telefono y datos del usuario se guardan en una sola transaccion
+                    with self.db.transaction():
+                        self.db.save_phone(phone)
+                        self.db.save_user_info(password, uid, apikey)
                     response = 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{"status": "success", "message": "Alta de usuario realizada con éxito."}'
             
             else:
                 response = self.http_response(400, "Bad Request")
             
-            client_socket.send(response)
+            return response
 
         except Exception as e:
             print(f"Error al manejar la solicitud: {e}")
-            client_socket.send(self.http_response(500, "Internal Server Error"))
+            return self.http_response(500, "Internal Server Error")
+
+    async def read_request(self, reader):
+        """
+        Lee encabezados y cuerpo de una solicitud.
+
+        Returns:
+        - (request, keep_alive), o (None, False) si el cliente cerro la conexion
+        """
+        line = await reader.readline()
+        self.idle.pop(reader, None)  # Ya llego una solicitud: la conexion deja de estar inactiva
+        if not line:
+            return None, False
+        lines = [line]
+        size = len(line)
+        length = 0
+        keep_alive = b"HTTP/1.1" in line
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None, False
+            size += len(line)
+            if size > self.MAX_HEADER:
+                raise ValueError("Encabezados demasiado grandes")
+            lines.append(line)
+            if line in (b"\r\n", b"\n"):
+                break
+            header = line.lower()
+            if header.startswith(b"content-length:"):
+                length = int(header[15:])
+            elif header.startswith(b"connection:"):
+                keep_alive = b"keep-alive" in header
+        if length > self.MAX_BODY:
+            raise ValueError("Cuerpo demasiado grande")
+        if length:
+            lines.append(await reader.readexactly(length))
+        return b"".join(lines).decode('utf-8'), keep_alive
+
+    def frame_response(self, response, keep_alive):
+        """Agrega Content-Length y Connection a la respuesta (para poder reusar la conexion)"""
+        if response.startswith("HTTP/"):
+            head, sep, body = response.partition("\r\n\r\n")
+            status = head.split("\r\n")[0]
+            headers = [h for h in head.split("\r\n")[1:]
+                       if not h.lower().startswith(("content-length", "connection"))]
+        else:
+            status, headers, body = "HTTP/1.1 200 OK", ["Content-Type: text/html"], response
+        body = body.encode('utf-8')
+        headers.append(f"Content-Length: {len(body)}")
+        headers.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        return (status + "\r\n" + "\r\n".join(headers) + "\r\n\r\n").encode('utf-8') + body
 
+    async def handle_client(self, reader, writer):
+        """Tarea de un cliente: atiende sus solicitudes mientras pida keep-alive"""
+        if self.clients >= self.MAX_CLIENTS:
+            # Sin lugar: se espera a que se libere una conexion. Las que estan
+            # inactivas en keep-alive se cierran para dejar su lugar
+            self.waiting += 1
+            deadline = utime.ticks_add(utime.ticks_ms(), self.REQUEST_TIMEOUT_MS)
+            while self.clients >= self.MAX_CLIENTS:
+                self.release_idle()
+                left = utime.ticks_diff(deadline, utime.ticks_ms())
+                if left <= 0:
+                    break
+                # Si otro que esperaba tomo el lugar se vuelve a esperar
+                self.slot_free.clear()
+                try:
+                    await asyncio.wait_for_ms(self.slot_free.wait(), left)
+                except asyncio.TimeoutError:
+                    break
+            self.waiting -= 1
+            if self.clients >= self.MAX_CLIENTS:
+                writer.write(self.frame_response(self.http_response(503, "Servidor ocupado"), False))
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+                return
+        self.clients += 1
+        try:
+            served = 0
+            keep_alive = True
+            while keep_alive and self.continue_flag:
+                timeout = self.REQUEST_TIMEOUT_MS if served == 0 else self.KEEPALIVE_MS
+                read = asyncio.create_task(self.read_request(reader))
+                if served:
+                    self.idle[reader] = read  # Un cliente que espera lugar la puede cancelar
+                try:
+                    request, keep_alive = await asyncio.wait_for_ms(read, timeout)
+                except asyncio.TimeoutError:
+                    break  # Cliente lento o conexion inactiva
+                except asyncio.CancelledError:
+                    break  # Conexion inactiva cerrada para dejar lugar a otro cliente
+                except (ValueError, EOFError) as e:
+                    print(f"Solicitud invalida: {e}")
+                    writer.write(self.frame_response(self.http_response(400, "Bad Request"), False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                served += 1
+                keep_alive = keep_alive and served < self.KEEPALIVE_MAX and not self.waiting
+                response = self.handle_request(request)
+                writer.write(self.frame_response(response, keep_alive))
+                await writer.drain()
+        except OSError as e:
+            print(f"Error de conexion: {e}")
         finally:
-            await asyncio.sleep(0)  # Cede el control para otras tareas
-            client_socket.close()  # Asegurar que el socket siempre se cierra
+            self.idle.pop(reader, None)
+            self.clients -= 1
+            if self.waiting:
+                self.slot_free.set()
+            writer.close()
+            await writer.wait_closed()
+
+    def release_idle(self):
+        """Cierra la conexion inactiva en keep-alive mas antigua (si hay) para liberar su lugar"""
+        for reader in self.idle:
+            self.idle.pop(reader).cancel()
+            return
 
     def load_html_template(self, file_path):
         try:
@@ -326,7 +448,7 @@ class WebServer:
         except OSError:
             return "<html><body><h1>Error 404: Archivo no encontrado</h1></body></html>"
 
-    def generate_web_page(self, html, networks=None, api=None, log=None):
+    def generate_web_page(self, html, networks=None, api=None, log=None, next_link=None):
         """Reemplaza los marcadores {{}} en la plantilla HTML si existe"""
         # Procesar los logs
         if log is not None:
@@ -336,6 +458,14 @@ class WebServer:
                 log_array = "".join([f"<tr><td>{logs}</td></tr>" for logs in log])
             html = html.replace("{{LOG_LIST}}", log_array)
     
+        # Enlace a la siguiente pagina de la bitacora
+        if next_link is not None:
+            if next_link:
+                next_html = f"<a class='back-button' href='{next_link}'>Registros anteriores</a>"
+            else:
+                next_html = ""
+            html = html.replace("{{NEXT_PAGE}}", next_html)
+    
         # Procesar las redes WiFi
         if networks is not None:
             if not networks:  # Si networks está vacío
@@ -368,30 +498,30 @@ class WebServer:
         return result
     
     def kill_webserver(self):
-        self.server_socket.close()
+        self.continue_flag = False
+        if self.server is not None:
+            self.server.close()
         print("Servidor cerrado")
 
     def http_response(self, status_code, content):
-        status_messages = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
-        return f"HTTP/1.1 {status_code} {status_messages.get(status_code, '')}\\r\\nConnection: close\\n\\n\\r\\n{content}"
+        status_messages = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+                           503: "Service Unavailable"}
+        return f"HTTP/1.1 {status_code} {status_messages.get(status_code, '')}\r\nContent-Type: text/html\r\n\r\n{content}"
 
     async def start_server(self):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind(('0.0.0.0', 80))
-        self.server_socket.listen(5)
+        # Cada cliente se atiende en su propia tarea; el ciclo solo revisa el tiempo
+        # sin estaciones conectadas y la señal de salida (/exit)
+        self.server = await asyncio.start_server(self.handle_client, '0.0.0.0', self.PORT,
+                                                 backlog=self.MAX_CLIENTS)
         start_time = utime.time()
         print("Servidor web iniciado, esperando conexiones...")
 
         while self.continue_flag:
-            if self.wifi_manager.check_clients():
-                client_socket, addr = self.server_socket.accept()
-                #print(f"Conexión desde {addr[0]}")
-                await self.handle_request(client_socket)
-            elif (utime.time() - start_time >= self.wifi_manager.timeout) :
-                    self.continue_flag = False
-                    
-        self.server_socket.close()
-        print("Servidor cerrado")
+            if (not self.wifi_manager.check_clients()
+                    and utime.time() - start_time >= self.wifi_manager.timeout):
+                self.continue_flag = False
+            await asyncio.sleep_ms(self.POLL_MS)
+
+        self.kill_webserver()
+        await self.server.wait_closed()
         self.wifi_manager.stop_ap()
-        print("AP finalizado")
\ No newline at end of file